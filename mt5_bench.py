@@ -0,0 +1,372 @@
+#!/usr/bin/env python3
+"""
+Latency/throughput benchmark for the MT5 bridge.
+
+Starts MT5Service in-process on a free port, backed by the simulator in
+mt5_sim/ (or the real terminal with --real), or targets a running server
+with --host/--port. N client threads, each with its own RPyC connection,
+pick calls from a weighted mix. For every endpoint it reports p50/p95/p99
+latency, calls/sec and bytes on the wire (both directions, measured on the
+client socket), writes the results as JSON and optionally compares them
+with a stored baseline (exit code 1 on regression).
+
+    python mt5_bench.py --duration 10 --concurrency 4 --out bench.json
+    python mt5_bench.py --mix tick=8,order_send=2 --baseline bench.json
+
+Latency includes materialising the reply on the client (obtain/json.loads),
+since that is what callers pay for netref results.
+"""
+import argparse
+import contextlib
+import json
+import math
+import os
+import platform
+import random
+import sys
+import threading
+import time
+
+import rpyc
+from rpyc.utils.classic import obtain
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+DEFAULT_MIX = "tick=5,snapshot=2,positions=1,history=1,order_send=1"
+DEFAULT_SYMBOLS = ("EURUSD", "GBPUSD", "USDJPY")
+DEFAULT_TOLERANCE = 0.25
+HISTORY_HOURS = 24
+
+
+class CountingStream:
+    """Wraps an RPyC SocketStream and counts the bytes going through it."""
+
+    def __init__(self, stream):
+        self._stream = stream
+        self.sent = 0
+        self.received = 0
+
+    def read(self, count):
+        data = self._stream.read(count)
+        self.received += len(data)
+        return data
+
+    def write(self, data):
+        self._stream.write(data)
+        self.sent += len(data)
+
+    def __getattr__(self, name):
+        return getattr(self._stream, name)
+
+    @property
+    def total(self):
+        return self.sent + self.received
+
+
+# --- Call mix ---
+# Each op takes a Worker and returns once the reply is fully on the client.
+
+def op_tick(w):
+    return obtain(w.conn.root.get_tick(w.next_symbol()))
+
+def op_snapshot(w):
+    return json.loads(w.conn.root.get_snapshot(w.symbols, None))
+
+def op_account(w):
+    return obtain(w.conn.root.get_account_info())
+
+def op_positions(w):
+    return obtain(w.conn.root.get_positions())
+
+def op_history(w):
+    now = int(time.time())
+    return w.conn.root.history_deals_columns(now - HISTORY_HOURS * 3600, now + 86400, None)
+
+def _order_request(w):
+    """Alternate open/close so positions don't pile up over a long run."""
+    request = {
+        "action": 1,            # TRADE_ACTION_DEAL
+        "symbol": w.symbols[0],
+        "volume": 0.01,
+        "type": 0,              # ORDER_TYPE_BUY
+        "deviation": 20,
+        "magic": w.magic,
+        "comment": "bench",
+        "type_filling": 1,      # ORDER_FILLING_IOC
+    }
+    if w.open_ticket:
+        request.update(type=1, position=w.open_ticket)
+    return request
+
+def _track(w, result):
+    if result.get("success"):
+        w.open_ticket = None if w.open_ticket else result.get("order")
+    return result
+
+def op_order_send(w):
+    # Netref dict, as test_scenario.py sends it (server unboxes field by field;
+    # needs allow_public_attrs on this side, see Worker)
+    return _track(w, obtain(w.conn.root.order_send(_order_request(w))))
+
+def op_order_send_json(w):
+    return _track(w, obtain(w.conn.root.order_send_json(json.dumps(_order_request(w)))))
+
+def op_order_send_many(w):
+    reply = json.loads(w.conn.root.order_send_many(json.dumps([_order_request(w)]), False))
+    return _track(w, reply["results"][0])
+
+OPS = {
+    "tick": op_tick,
+    "snapshot": op_snapshot,
+    "account": op_account,
+    "positions": op_positions,
+    "history": op_history,
+    "order_send": op_order_send,
+    "order_send_json": op_order_send_json,
+    "order_send_many": op_order_send_many,
+}
+
+def parse_mix(spec):
+    """'tick=5,snapshot=2' -> [('tick', 5.0), ('snapshot', 2.0)]"""
+    mix = []
+    for part in spec.split(","):
+        name, _, weight = part.strip().partition("=")
+        if name not in OPS:
+            raise SystemExit(f"Unknown op {name!r}; choose from {', '.join(OPS)}")
+        mix.append((name, float(weight or 1)))
+    return mix
+
+
+# --- Running ---
+
+class Worker(threading.Thread):
+    def __init__(self, index, host, port, mix, symbols, seed, start_at, record_from, stop_at):
+        super().__init__(daemon=True, name=f"bench-{index}")
+        # allow_public_attrs: the server reads the order_send netref dict back
+        # through this connection (keys(), __getitem__)
+        self.conn = rpyc.connect(host, port, config={"allow_pickle": True, "allow_public_attrs": True,
+                                                     "sync_request_timeout": 60})
+        self.stream = CountingStream(self.conn._channel.stream)
+        self.conn._channel.stream = self.stream
+        self.names = [name for name, _ in mix]
+        self.weights = [weight for _, weight in mix]
+        self.symbols = tuple(symbols)
+        self.rng = random.Random(seed + index)
+        self.magic = 990000 + index
+        self.open_ticket = None
+        self.start_at, self.record_from, self.stop_at = start_at, record_from, stop_at
+        self.samples = {name: [] for name in self.names}     # latency in ns
+        self.bytes = dict.fromkeys(self.names, 0)
+        self.errors = dict.fromkeys(self.names, 0)
+        self._symbol_index = index
+
+    def next_symbol(self):
+        self._symbol_index += 1
+        return self.symbols[self._symbol_index % len(self.symbols)]
+
+    def run(self):
+        while time.monotonic() < self.start_at:
+            time.sleep(0.001)
+        while True:
+            now = time.monotonic()
+            if now >= self.stop_at:
+                break
+            name = self.rng.choices(self.names, self.weights)[0]
+            before = self.stream.total
+            t0 = time.perf_counter_ns()
+            try:
+                result = OPS[name](self)
+                # Order ops answer failures with a result, not an exception
+                failed = isinstance(result, dict) and result.get("success") is False
+            except Exception:
+                failed = True
+            elapsed = time.perf_counter_ns() - t0
+            if now < self.record_from:
+                continue
+            if failed:
+                self.errors[name] += 1
+            else:
+                self.samples[name].append(elapsed)
+                self.bytes[name] += self.stream.total - before
+
+    def cleanup(self):
+        if self.open_ticket:
+            with contextlib.suppress(Exception):
+                self.conn.root.position_close(self.open_ticket)
+        self.conn.close()
+
+def percentile(sorted_values, q):
+    """Nearest-rank percentile of an already sorted list."""
+    if not sorted_values:
+        return 0.0
+    index = max(0, min(len(sorted_values) - 1, math.ceil(q / 100.0 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+def summarize(workers, duration):
+    endpoints = {}
+    for name in workers[0].names:
+        samples = sorted(s for w in workers for s in w.samples[name])
+        calls = len(samples)
+        total_bytes = sum(w.bytes[name] for w in workers)
+        ms = [s / 1e6 for s in samples]
+        endpoints[name] = {
+            "calls": calls,
+            "errors": sum(w.errors[name] for w in workers),
+            "calls_per_sec": round(calls / duration, 1),
+            "p50_ms": round(percentile(ms, 50), 3),
+            "p95_ms": round(percentile(ms, 95), 3),
+            "p99_ms": round(percentile(ms, 99), 3),
+            "mean_ms": round(sum(ms) / calls, 3) if calls else 0.0,
+            "max_ms": round(ms[-1], 3) if ms else 0.0,
+            "bytes_per_call": round(total_bytes / calls) if calls else 0,
+            "bytes_total": total_bytes,
+        }
+    calls = sum(e["calls"] for e in endpoints.values())
+    return endpoints, {"calls": calls, "errors": sum(e["errors"] for e in endpoints.values()),
+                       "calls_per_sec": round(calls / duration, 1)}
+
+def start_local_server(real=False, verbose=False):
+    """Run MT5Service in this process on a free port. Returns (server, port)."""
+    if not real:
+        sys.path.insert(0, os.path.join(HERE, "mt5_sim"))
+    sys.path.insert(0, HERE)
+    from rpyc.utils.server import ThreadedServer
+    import mt5_server_fixed
+    from mt5_log import LEVELS, logger
+    if not verbose:
+        # The server logs every order to stdout; keep the report readable
+        logger.level = LEVELS["WARNING"]
+    if not mt5_server_fixed.session.start():
+        raise SystemExit(f"MT5 not ready: {mt5_server_fixed.session.last_error}")
+    server = ThreadedServer(mt5_server_fixed.MT5Service, hostname="127.0.0.1", port=0,
+                            protocol_config={"allow_pickle": True, "allow_public_attrs": True})
+    server._listen()    # listen before returning so clients can connect straight away
+    threading.Thread(target=server.start, daemon=True, name="bench-server").start()
+    return server, server.port
+
+def run(args):
+    mix = parse_mix(args.mix)
+    host, port = args.host, args.port
+    if host is None:
+        _, port = start_local_server(real=args.real, verbose=args.verbose)
+        host = "127.0.0.1"
+        target = "real terminal (in-process)" if args.real else "simulator (in-process)"
+    else:
+        target = f"{host}:{port}"
+
+    start_at = time.monotonic() + 0.5
+    record_from = start_at + args.warmup
+    stop_at = record_from + args.duration
+    workers = [Worker(i, host, port, mix, args.symbols, args.seed, start_at, record_from, stop_at)
+               for i in range(args.concurrency)]
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    for w in workers:
+        w.cleanup()
+    # The in-process server runs on daemon threads and goes away with the
+    # process; closing it here would race the per-connection serve loops.
+
+    endpoints, total = summarize(workers, args.duration)
+    return {
+        "meta": {
+            "timestamp": int(time.time()),
+            "target": target,
+            "duration_s": args.duration,
+            "warmup_s": args.warmup,
+            "concurrency": args.concurrency,
+            "mix": dict(mix),
+            "symbols": list(args.symbols),
+            "python": platform.python_version(),
+            "rpyc": rpyc.__version__ if isinstance(rpyc.__version__, str) else ".".join(map(str, rpyc.__version__)),
+            "platform": platform.platform(),
+        },
+        "endpoints": endpoints,
+        "total": total,
+    }
+
+
+# --- Reporting ---
+
+def compare(results, baseline, tolerance):
+    """List of regression messages: p95 up or calls/sec down by more than `tolerance`."""
+    regressions = []
+    for name, current in results["endpoints"].items():
+        base = baseline.get("endpoints", {}).get(name)
+        if not base or not current["calls"]:
+            continue
+        if base["p95_ms"] and current["p95_ms"] > base["p95_ms"] * (1 + tolerance):
+            regressions.append(f"{name}: p95 {base['p95_ms']:.3f} -> {current['p95_ms']:.3f} ms")
+        if base["calls_per_sec"] and current["calls_per_sec"] < base["calls_per_sec"] * (1 - tolerance):
+            regressions.append(f"{name}: calls/sec {base['calls_per_sec']} -> {current['calls_per_sec']}")
+        if base["bytes_per_call"] and current["bytes_per_call"] > base["bytes_per_call"] * (1 + tolerance):
+            regressions.append(f"{name}: bytes/call {base['bytes_per_call']} -> {current['bytes_per_call']}")
+    return regressions
+
+def print_report(results, baseline=None):
+    meta = results["meta"]
+    print("=" * 88)
+    print(f"  MT5 Bridge Benchmark - {meta['target']}, {meta['concurrency']} clients, {meta['duration_s']}s")
+    print("=" * 88)
+    print(f"{'endpoint':<18}{'calls':>8}{'err':>6}{'calls/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'bytes/call':>12}")
+    for name, e in results["endpoints"].items():
+        line = (f"{name:<18}{e['calls']:>8}{e['errors']:>6}{e['calls_per_sec']:>10}"
+                f"{e['p50_ms']:>10.3f}{e['p95_ms']:>10.3f}{e['p99_ms']:>10.3f}{e['bytes_per_call']:>12}")
+        base = (baseline or {}).get("endpoints", {}).get(name)
+        if base and base["p95_ms"]:
+            line += f"  (p95 {(e['p95_ms'] / base['p95_ms'] - 1) * 100:+.0f}%)"
+        print(line)
+    total = results["total"]
+    print(f"{'TOTAL':<18}{total['calls']:>8}{total['errors']:>6}{total['calls_per_sec']:>10}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="MT5 bridge latency/throughput benchmark")
+    parser.add_argument("--host", help="benchmark a running server instead of an in-process one")
+    parser.add_argument("--port", type=int, default=18812)
+    parser.add_argument("--real", action="store_true", help="in-process server on the real MetaTrader5 package")
+    parser.add_argument("--duration", type=float, default=10.0, help="measured seconds")
+    parser.add_argument("--warmup", type=float, default=1.0, help="unrecorded seconds before measuring")
+    parser.add_argument("--concurrency", type=int, default=4, help="client threads (one connection each)")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help=f"weighted ops, default {DEFAULT_MIX!r}; ops: {', '.join(OPS)}")
+    parser.add_argument("--symbols", nargs="+", default=list(DEFAULT_SYMBOLS))
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", help="write results JSON here")
+    parser.add_argument("--baseline", help="compare against this results JSON")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                        help="allowed relative regression vs baseline (default 0.25)")
+    parser.add_argument("--verbose", action="store_true", help="show the in-process server's order log while running")
+    args = parser.parse_args(argv)
+
+    results = run(args)
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    print_report(results, baseline)
+
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\n💾 Results written to {args.out}")
+
+    status = 0
+    if baseline is not None:
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print(f"\n❌ {len(regressions)} regression(s) vs {args.baseline} (tolerance {args.tolerance:.0%}):")
+            for message in regressions:
+                print(f"   {message}")
+            status = 1
+        else:
+            print(f"\n✅ No regressions vs {args.baseline} (tolerance {args.tolerance:.0%})")
+
+    # A failing call is cheap and would flatter the latency numbers
+    errors = results["total"]["errors"]
+    if errors:
+        print(f"\n❌ {errors} failed call(s) out of {results['total']['calls'] + errors}; see the err column")
+        status = 1
+    return status
+
+if __name__ == "__main__":
+    sys.exit(main())
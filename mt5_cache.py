@@ -0,0 +1,107 @@
+"""
+In-process TTL cache for MT5 terminal reads.
+
+Every RPyC connection runs on its own ThreadedServer thread, but the MT5
+terminal API is effectively single-threaded. Caching reads for a short,
+per-data-type TTL lets many clients share one terminal call:
+
+- entries expire after the TTL configured for their kind (tick, account, ...)
+- concurrent misses for the same key are coalesced (single-flight): one
+  thread calls the terminal and the others wait for its result
+- invalidate() drops entries (e.g. account/positions after order_send), and a
+  load that was already running when invalidate() was called is not stored
+- hit/miss/coalesced counters are kept per kind
+"""
+import threading
+import time
+
+# Seconds. Ticks move constantly; symbol specs almost never change.
+DEFAULT_TTLS = {
+    'tick': 0.01,
+    'account': 0.1,
+    'positions': 0.1,
+    'orders': 0.1,
+    'symbol_info': 300.0,
+    'symbol_spec': 60.0,
+}
+
+class _Flight:
+    __slots__ = ('event', 'value', 'error')
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class TTLCache:
+    def __init__(self, ttls=None):
+        self.ttls = dict(DEFAULT_TTLS)
+        if ttls:
+            self.ttls.update(ttls)
+        self._lock = threading.Lock()
+        self._data = {}
+        self._inflight = {}
+        self._generation = {}
+        self._stats = {}
+
+    def _count(self, kind, field):
+        stats = self._stats.get(kind)
+        if stats is None:
+            stats = self._stats[kind] = {'hits': 0, 'misses': 0, 'coalesced': 0, 'invalidations': 0}
+        stats[field] += 1
+
+    def get(self, kind, key, loader):
+        """
+        Return the cached value for (kind, key), calling `loader()` on a miss.
+        None results are returned but not cached, so failures are retried.
+        """
+        ttl = self.ttls.get(kind, 0)
+        full_key = (kind, key)
+        with self._lock:
+            entry = self._data.get(full_key)
+            if entry is not None and entry[0] > time.monotonic():
+                self._count(kind, 'hits')
+                return entry[1]
+            flight = self._inflight.get(full_key)
+            leader = flight is None
+            if leader:
+                flight = self._inflight[full_key] = _Flight()
+                generation = self._generation.get(kind, 0)
+                self._count(kind, 'misses')
+            else:
+                self._count(kind, 'coalesced')
+
+        if not leader:
+            flight.event.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+
+        try:
+            value = loader()
+            flight.value = value
+            return value
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._inflight[full_key]
+                if (flight.error is None and flight.value is not None and ttl > 0
+                        and self._generation.get(kind, 0) == generation):
+                    self._data[full_key] = (time.monotonic() + ttl, flight.value)
+            flight.event.set()
+
+    def invalidate(self, *kinds):
+        """Drop cached entries of the given kinds (all kinds if none given)."""
+        with self._lock:
+            kinds = kinds or tuple(set(self.ttls) | {k for k, _ in self._data})
+            for kind in kinds:
+                self._generation[kind] = self._generation.get(kind, 0) + 1
+                self._count(kind, 'invalidations')
+            self._data = {k: v for k, v in self._data.items() if k[0] not in kinds}
+
+    def stats(self):
+        with self._lock:
+            return {kind: dict(counts) for kind, counts in self._stats.items()}
@@ -0,0 +1,81 @@
+"""
+Server-side cursors for chunked, resumable history pulls.
+
+open() runs the terminal query once (the MetaTrader5 API has no paging)
+and keeps the result; the client then fetches it chunk by chunk, each chunk
+encoded on demand, so neither side ever serialises or holds the whole
+response as one message. Cursors belong to the registry, not to a
+connection: after a dropped link the client reconnects and carries on with
+the next chunk index. Idle cursors expire after `ttl` seconds and at most
+`max_cursors` are kept (least recently used go first); a client that finds
+its cursor gone simply opens a new one and resumes at the same index.
+"""
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+
+class Cursor:
+    def __init__(self, records, encode, chunk):
+        self.id = uuid.uuid4().hex
+        self.records = records
+        self.encode = encode        # encode(records_slice) -> by-value payload
+        self.chunk = max(1, int(chunk))
+        self.total = len(records)
+        self.chunks = (self.total + self.chunk - 1) // self.chunk
+        self.last_used = time.monotonic()
+
+    def fetch(self, index):
+        start = int(index) * self.chunk
+        return self.encode(self.records[start:start + self.chunk])
+
+
+class CursorRegistry:
+    def __init__(self, ttl=300.0, max_cursors=64):
+        self.ttl = ttl
+        self.max_cursors = max_cursors
+        self._lock = threading.Lock()
+        self._cursors = OrderedDict()
+        self.opened = 0
+        self.expired = 0
+
+    def open(self, records, encode, chunk):
+        """Register a query result; returns (cursor_id, total, chunks)."""
+        cursor = Cursor(records if records is not None else (), encode, chunk)
+        with self._lock:
+            self._expire()
+            self._cursors[cursor.id] = cursor
+            while len(self._cursors) > self.max_cursors:
+                self._cursors.popitem(last=False)
+                self.expired += 1
+            self.opened += 1
+        return cursor.id, cursor.total, cursor.chunks
+
+    def fetch(self, cursor_id, index):
+        """Chunk `index` of a cursor, or None if the cursor is unknown or expired."""
+        with self._lock:
+            cursor = self._cursors.get(cursor_id)
+            if cursor is None:
+                return None
+            cursor.last_used = time.monotonic()
+            self._cursors.move_to_end(cursor_id)
+        return cursor.fetch(index)
+
+    def close(self, cursor_id):
+        with self._lock:
+            return self._cursors.pop(cursor_id, None) is not None
+
+    def _expire(self):
+        deadline = time.monotonic() - self.ttl
+        for cursor_id in [c.id for c in self._cursors.values() if c.last_used < deadline]:
+            del self._cursors[cursor_id]
+            self.expired += 1
+
+    def stats(self):
+        with self._lock:
+            self._expire()
+            return {'open': len(self._cursors), 'opened': self.opened, 'expired': self.expired}
+
+
+cursors = CursorRegistry()
@@ -0,0 +1,155 @@
+"""
+Order execution tracing and per-symbol execution-quality stats for the bridge server.
+
+Every order result from mt5_server_fixed.py carries `request_id` and a
+`timing` dict of time.perf_counter_ns() stamps, one per stage:
+
+    server_recv   request arrived
+    validated     unboxed, normalised and validated
+    mt5_start     order_send handed to the terminal
+    mt5_end       terminal answered
+    server_send   result about to be returned
+
+The client adds client_send / client_recv around the call and derives the
+round trip and transport share itself (openclaw_skill/mt5_client.py);
+perf_counter_ns is a per-process clock, so stamps are only compared with
+stamps from the same process. In a batch (order_send_many, close_positions)
+server_send is stamped once for the whole batch, so "respond" includes the
+orders executed after this one.
+"""
+import threading
+from collections import deque
+
+# (name, from stamp, to stamp)
+STAGES = (
+    ("unbox_validate", "server_recv", "validated"),
+    ("queue", "validated", "mt5_start"),
+    ("mt5", "mt5_start", "mt5_end"),
+    ("respond", "mt5_end", "server_send"),
+    ("server", "server_recv", "server_send"),
+)
+
+# Latency samples kept per symbol and stage for percentiles
+WINDOW = 1000
+
+
+def stage_durations(timing):
+    """{stage: ms} for every stage whose two stamps are present."""
+    out = {}
+    for name, start, end in STAGES:
+        if timing.get(start) is not None and timing.get(end) is not None:
+            out[name] = (timing[end] - timing[start]) / 1e6
+    return out
+
+
+def slippage_points(side, requested, filled, point):
+    """Fill vs requested price in points; positive is adverse (paid more / received less)."""
+    if not (requested and filled and point):
+        return None
+    diff = (filled - requested) if side == "buy" else (requested - filled)
+    return round(diff / point, 1)
+
+
+def _percentile(sorted_values, q):
+    return sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))]
+
+
+class SymbolStats:
+    def __init__(self):
+        self.orders = 0
+        self.filled = 0
+        self.rejected = 0
+        self.local_rejects = 0
+        self.slippage = deque(maxlen=WINDOW)
+        self.slippage_total = 0.0
+        self.slippage_samples = 0
+        self.adverse = 0
+        self.improved = 0
+        self.latency = {}
+
+    def record(self, res):
+        self.orders += 1
+        if res.get("success"):
+            self.filled += 1
+        else:
+            self.rejected += 1
+            if res.get("local"):
+                self.local_rejects += 1
+        slip = res.get("slippage_points")
+        if slip is not None:
+            self.slippage.append(slip)
+            self.slippage_total += slip
+            self.slippage_samples += 1
+            if slip > 0:
+                self.adverse += 1
+            elif slip < 0:
+                self.improved += 1
+        for stage, ms in (res.get("latency_ms") or {}).items():
+            self.latency.setdefault(stage, deque(maxlen=WINDOW)).append(ms)
+
+    def summary(self):
+        slippage = sorted(self.slippage)
+        out = {
+            "orders": self.orders,
+            "filled": self.filled,
+            "rejected": self.rejected,
+            "local_rejects": self.local_rejects,
+            "fill_rate": self.filled / self.orders if self.orders else None,
+            "slippage_points": {
+                "samples": self.slippage_samples,
+                "mean": self.slippage_total / self.slippage_samples if self.slippage_samples else None,
+                "p95": _percentile(slippage, 0.95) if slippage else None,
+                "max_adverse": max(slippage[-1], 0.0) if slippage else None,
+                "adverse": self.adverse,
+                "improved": self.improved,
+                "zero": self.slippage_samples - self.adverse - self.improved,
+            },
+            "latency_ms": {},
+        }
+        for stage, samples in self.latency.items():
+            values = sorted(samples)
+            out["latency_ms"][stage] = {
+                "mean": sum(values) / len(values),
+                "p50": _percentile(values, 0.5),
+                "p95": _percentile(values, 0.95),
+                "max": values[-1],
+            }
+        return out
+
+
+class ExecutionStats:
+    """Thread-safe per-symbol aggregation of traced order results."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._symbols = {}
+
+    def record(self, res):
+        symbol = res.get("symbol")
+        if not symbol:
+            return
+        with self._lock:
+            stats = self._symbols.get(symbol)
+            if stats is None:
+                stats = self._symbols[symbol] = SymbolStats()
+            stats.record(res)
+
+    def summary(self, symbol=None):
+        """{symbol: {orders, filled, rejected, fill_rate, slippage_points, latency_ms}}."""
+        with self._lock:
+            items = [(s, st) for s, st in self._symbols.items() if symbol is None or s == symbol]
+            return {s: st.summary() for s, st in sorted(items)}
+
+    def field(self, name):
+        """{symbol: value} of one top-level counter, e.g. for a metrics gauge."""
+        with self._lock:
+            return {s: getattr(st, name) for s, st in self._symbols.items()}
+
+    def mean_slippage(self):
+        with self._lock:
+            return {s: st.slippage_total / st.slippage_samples
+                    for s, st in self._symbols.items() if st.slippage_samples}
+
+    def reset(self):
+        with self._lock:
+            self._symbols.clear()
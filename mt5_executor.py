@@ -0,0 +1,178 @@
+"""
+Single-owner executor for the MetaTrader5 terminal API.
+
+The MetaTrader5 module is not safe to drive from many threads at once, but
+ThreadedServer runs one thread per client. All terminal calls are therefore
+queued to one owner thread:
+
+- a priority queue runs trade/lifecycle calls before account reads and
+  market data
+- queued reads of one priority are drained in batches, and identical reads
+  in a batch (same function and arguments) hit the terminal only once
+- callers get a concurrent.futures.Future, or block on it via the proxy
+
+`mt5` below is a drop-in stand-in for the module: attribute access returns
+constants unchanged, and calling a function runs it on the owner thread.
+last_error() returns the error captured right after the caller's own failed
+call, so another thread's call in between cannot overwrite it.
+"""
+import heapq
+import itertools
+import threading
+import time
+from concurrent.futures import Future
+
+import MetaTrader5
+
+from mt5_metrics import add_mt5_time
+
+PRIORITY_TRADE = 0
+PRIORITY_ACCOUNT = 1
+PRIORITY_DATA = 2
+
+# Anything not listed runs at PRIORITY_DATA
+FUNCTION_PRIORITIES = {
+    'initialize': PRIORITY_TRADE,
+    'login': PRIORITY_TRADE,
+    'shutdown': PRIORITY_TRADE,
+    'order_send': PRIORITY_TRADE,
+    'order_check': PRIORITY_TRADE,
+    'account_info': PRIORITY_ACCOUNT,
+    'positions_get': PRIORITY_ACCOUNT,
+    'positions_total': PRIORITY_ACCOUNT,
+    'orders_get': PRIORITY_ACCOUNT,
+    'orders_total': PRIORITY_ACCOUNT,
+}
+
+_STOP = object()
+
+class MT5Executor:
+    def __init__(self, module=MetaTrader5, max_batch=64):
+        self.module = module
+        self.max_batch = max_batch
+        self.calls_total = 0
+        self.calls_deduplicated = 0
+        self._queue = []
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._thread = None
+        self._local = threading.local()
+
+    def start(self):
+        with self._cond:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, daemon=True, name="mt5-executor")
+                self._thread.start()
+
+    def stop(self):
+        with self._cond:
+            if self._thread is None:
+                return
+            # Lowest priority, so everything already queued still runs
+            heapq.heappush(self._queue, (99, next(self._seq), _STOP, (), {}, None))
+            self._cond.notify()
+            thread, self._thread = self._thread, None
+        thread.join()
+
+    def queue_depth(self):
+        with self._cond:
+            return len(self._queue)
+
+    def submit(self, name, *args, priority=None, **kwargs):
+        """Queue module.<name>(*args, **kwargs) and return a Future."""
+        if priority is None:
+            priority = FUNCTION_PRIORITIES.get(name, PRIORITY_DATA)
+        future = Future()
+        self.start()
+        with self._cond:
+            heapq.heappush(self._queue, (priority, next(self._seq), name, args, kwargs, future))
+            self._cond.notify()
+        return future
+
+    def call(self, name, *args, **kwargs):
+        """Run module.<name> on the owner thread and wait for the result."""
+        if threading.current_thread() is self._thread:
+            # Already on the owner thread (e.g. nested call): run inline
+            return self._invoke(name, args, kwargs)[0]
+        t0 = time.perf_counter_ns()
+        result, error = self.submit(name, *args, **kwargs).result()
+        add_mt5_time(time.perf_counter_ns() - t0)
+        self._local.last_error = error
+        return result
+
+    def last_error(self):
+        """Error recorded after this thread's last failed call, else the live value."""
+        error = getattr(self._local, 'last_error', None)
+        if error is not None:
+            return error
+        return self.call('last_error')
+
+    def _invoke(self, name, args, kwargs):
+        # Capture last_error() immediately, before any other queued call can run
+        self.calls_total += 1
+        result = getattr(self.module, name)(*args, **kwargs)
+        error = self.module.last_error() if result is None and name != 'last_error' else None
+        return result, error
+
+    def _next_batch(self):
+        with self._cond:
+            while not self._queue:
+                self._cond.wait()
+            batch = [heapq.heappop(self._queue)]
+            priority = batch[0][0]
+            if priority != PRIORITY_TRADE:
+                # Drain queued reads so duplicates can share one terminal call
+                while (self._queue and self._queue[0][0] == priority
+                       and len(batch) < self.max_batch):
+                    batch.append(heapq.heappop(self._queue))
+            return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            done = {}
+            for priority, seq, name, args, kwargs, future in batch:
+                if name is _STOP:
+                    return
+                if not future.set_running_or_notify_cancel():
+                    continue
+                try:
+                    key = (name, args, tuple(sorted(kwargs.items())))
+                    hash(key)
+                except TypeError:
+                    key = None
+                try:
+                    if key is not None and key in done:
+                        self.calls_deduplicated += 1
+                        outcome = done[key]
+                    else:
+                        outcome = self._invoke(name, args, kwargs)
+                        if key is not None:
+                            done[key] = outcome
+                    future.set_result(outcome)
+                except BaseException as e:
+                    future.set_exception(e)
+
+
+class TerminalProxy:
+    """Module-like facade over an MT5Executor."""
+
+    def __init__(self, executor):
+        self._executor = executor
+
+    def __getattr__(self, name):
+        attr = getattr(self._executor.module, name)
+        if not callable(attr) or isinstance(attr, type):
+            return attr
+        if name == 'last_error':
+            return self._executor.last_error
+        executor = self._executor
+
+        def call(*args, **kwargs):
+            return executor.call(name, *args, **kwargs)
+        call.__name__ = name
+        return call
+
+
+executor = MT5Executor()
+mt5 = TerminalProxy(executor)
@@ -0,0 +1,383 @@
+"""
+Server-side incremental indicators for the MT5 RPyC bridge.
+
+State is kept per (symbol, timeframe) series, with one indicator object per
+(indicator, params) on it. Each indicator folds closed bars in O(1)
+(Wilder averages for RSI/ATR, running sums over a ring for SMA/Bollinger),
+so a query only pulls the bars that closed since the previous query -
+usually none or one - instead of recomputing over a fresh history window.
+The still-forming bar is applied on a scratch copy of the state (peek), so
+`value` tracks the live price while `closed` is the value at the last
+closed bar. A new indicator on a series is warmed up once from history.
+
+Bars never leave the server: clients get numbers back
+(exposed_indicators in mt5_server_fixed.py).
+"""
+import threading
+import time
+from collections import deque
+
+from mt5_executor import mt5
+
+# Bars fed to a new indicator before its first value. Exponential/Wilder
+# averages carry their seed for a while, so they get a longer history.
+WARMUP_FACTOR = 10
+MIN_WARMUP = 100
+MAX_WARMUP = 5000
+# Future buffer on range requests, to cover broker server-time offsets
+FUTURE_BUFFER = 86400
+
+
+class SMA:
+    def __init__(self, length=20):
+        self.length = int(length)
+        self.window = deque(maxlen=self.length)
+        self.total = 0.0
+
+    def warmup(self):
+        return self.length
+
+    def _next(self, close):
+        dropped = self.window[0] if len(self.window) == self.length else 0.0
+        count = min(len(self.window) + 1, self.length)
+        return self.total - dropped + close, count
+
+    def update(self, bar):
+        self.total, _ = self._next(bar['close'])
+        self.window.append(bar['close'])
+        return self.value()
+
+    def peek(self, bar):
+        total, count = self._next(bar['close'])
+        return total / count if count == self.length else None
+
+    def value(self):
+        return self.total / self.length if len(self.window) == self.length else None
+
+
+class EMA:
+    def __init__(self, length=20):
+        self.length = int(length)
+        self.alpha = 2.0 / (self.length + 1)
+        self.seed = SMA(self.length)   # first value is the SMA of the first `length` closes
+        self.ema = None
+
+    def warmup(self):
+        return max(MIN_WARMUP, self.length * WARMUP_FACTOR)
+
+    def _next(self, close):
+        if self.ema is None:
+            return self.seed.peek({'close': close})
+        return self.ema + self.alpha * (close - self.ema)
+
+    def update(self, bar):
+        if self.ema is None:
+            self.ema = self.seed.update(bar)
+        else:
+            self.ema = self._next(bar['close'])
+        return self.ema
+
+    def peek(self, bar):
+        return self._next(bar['close'])
+
+    def value(self):
+        return self.ema
+
+
+class RSI:
+    """Wilder's RSI (as in MT5's iRSI and pandas_ta's rsi)."""
+
+    def __init__(self, length=14):
+        self.length = int(length)
+        self.prev_close = None
+        self.count = 0
+        self.avg_gain = 0.0
+        self.avg_loss = 0.0
+
+    def warmup(self):
+        return max(MIN_WARMUP, self.length * WARMUP_FACTOR)
+
+    def _next(self, close):
+        if self.prev_close is None:
+            return None, 0, 0.0, 0.0
+        change = close - self.prev_close
+        gain, loss = max(change, 0.0), max(-change, 0.0)
+        count = self.count + 1
+        if count <= self.length:
+            # Simple average over the first `length` changes
+            avg_gain = self.avg_gain + (gain - self.avg_gain) / count
+            avg_loss = self.avg_loss + (loss - self.avg_loss) / count
+        else:
+            avg_gain = (self.avg_gain * (self.length - 1) + gain) / self.length
+            avg_loss = (self.avg_loss * (self.length - 1) + loss) / self.length
+        return self._rsi(count, avg_gain, avg_loss), count, avg_gain, avg_loss
+
+    def _rsi(self, count, avg_gain, avg_loss):
+        if count < self.length:
+            return None
+        if avg_loss == 0:
+            return 100.0 if avg_gain > 0 else 50.0
+        return 100.0 - 100.0 / (1.0 + avg_gain / avg_loss)
+
+    def update(self, bar):
+        value, count, avg_gain, avg_loss = self._next(bar['close'])
+        if self.prev_close is not None:
+            self.count, self.avg_gain, self.avg_loss = count, avg_gain, avg_loss
+        self.prev_close = bar['close']
+        return value
+
+    def peek(self, bar):
+        return self._next(bar['close'])[0]
+
+    def value(self):
+        return self._rsi(self.count, self.avg_gain, self.avg_loss)
+
+
+class ATR:
+    """Wilder's average true range."""
+
+    def __init__(self, length=14):
+        self.length = int(length)
+        self.prev_close = None
+        self.count = 0
+        self.atr = 0.0
+
+    def warmup(self):
+        return max(MIN_WARMUP, self.length * WARMUP_FACTOR)
+
+    def _next(self, bar):
+        high, low = bar['high'], bar['low']
+        if self.prev_close is None:
+            tr = high - low
+        else:
+            tr = max(high - low, abs(high - self.prev_close), abs(low - self.prev_close))
+        count = self.count + 1
+        if count <= self.length:
+            atr = self.atr + (tr - self.atr) / count
+        else:
+            atr = (self.atr * (self.length - 1) + tr) / self.length
+        return (atr if count >= self.length else None), count, atr
+
+    def update(self, bar):
+        value, self.count, self.atr = self._next(bar)
+        self.prev_close = bar['close']
+        return value
+
+    def peek(self, bar):
+        return self._next(bar)[0]
+
+    def value(self):
+        return self.atr if self.count >= self.length else None
+
+
+class Bollinger:
+    """Middle/upper/lower bands: SMA(length) +/- mult * population std dev."""
+
+    def __init__(self, length=20, mult=2.0):
+        self.length = int(length)
+        self.mult = float(mult)
+        self.window = deque(maxlen=self.length)
+        self.total = 0.0
+        self.total_sq = 0.0
+        self.updates = 0
+
+    def warmup(self):
+        return self.length
+
+    def _bands(self, total, total_sq, count):
+        if count < self.length:
+            return None
+        mean = total / count
+        std = max(total_sq / count - mean * mean, 0.0) ** 0.5
+        return {'middle': mean, 'upper': mean + self.mult * std, 'lower': mean - self.mult * std}
+
+    def _next(self, close):
+        dropped = self.window[0] if len(self.window) == self.length else None
+        total, total_sq = self.total + close, self.total_sq + close * close
+        if dropped is not None:
+            total, total_sq = total - dropped, total_sq - dropped * dropped
+        return total, total_sq, min(len(self.window) + 1, self.length)
+
+    def update(self, bar):
+        self.total, self.total_sq, _ = self._next(bar['close'])
+        self.window.append(bar['close'])
+        self.updates += 1
+        if self.updates % (self.length * 100) == 0:
+            # Re-sum now and then so add/subtract rounding cannot build up
+            self.total = sum(self.window)
+            self.total_sq = sum(c * c for c in self.window)
+        return self.value()
+
+    def peek(self, bar):
+        return self._bands(*self._next(bar['close']))
+
+    def value(self):
+        return self._bands(self.total, self.total_sq, len(self.window))
+
+
+INDICATORS = {
+    'sma': SMA,
+    'ema': EMA,
+    'rsi': RSI,
+    'atr': ATR,
+    'bbands': Bollinger,
+}
+
+
+def timeframe_value(timeframe):
+    """Accept 'H1' or mt5.TIMEFRAME_H1."""
+    if isinstance(timeframe, str):
+        value = getattr(mt5, f"TIMEFRAME_{timeframe.upper()}", None)
+        if value is None:
+            raise ValueError(f"Unknown timeframe {timeframe!r}")
+        return value
+    return int(timeframe)
+
+
+def _bar(rates, i):
+    row = rates[i]
+    return {'time': int(row['time']), 'open': float(row['open']), 'high': float(row['high']),
+            'low': float(row['low']), 'close': float(row['close'])}
+
+
+class Series:
+    """Indicators on one (symbol, timeframe), fed from the same closed bars."""
+
+    def __init__(self, symbol, timeframe):
+        self.symbol = symbol
+        self.timeframe = timeframe
+        self.lock = threading.Lock()
+        self.indicators = {}
+        self.last_closed = None    # time of the newest bar folded into the indicators
+        self.forming = None        # newest bar seen, still open
+        self.bars_fetched = 0
+
+    def _fetch(self, rates):
+        if rates is not None:
+            self.bars_fetched += len(rates)
+        return rates
+
+    def add(self, key, indicator):
+        """Warm a new indicator up on the bars the others already consumed."""
+        if self.last_closed is not None:
+            rates = self._fetch(mt5.copy_rates_from_pos(self.symbol, self.timeframe, 0, indicator.warmup() + 1))
+            if rates is not None:
+                for i in range(len(rates)):
+                    if int(rates[i]['time']) <= self.last_closed:
+                        indicator.update(_bar(rates, i))
+        self.indicators[key] = indicator
+
+    def refresh(self, warmup):
+        """Fold bars closed since the last refresh into every indicator."""
+        if self.last_closed is None:
+            rates = self._fetch(mt5.copy_rates_from_pos(self.symbol, self.timeframe, 0, warmup + 1))
+        else:
+            rates = self._fetch(mt5.copy_rates_range(self.symbol, self.timeframe, self.last_closed,
+                                                     int(time.time()) + FUTURE_BUFFER))
+        if rates is None or not len(rates):
+            return False
+        # The newest bar is still forming; everything before it is closed
+        for i in range(len(rates) - 1):
+            bar = _bar(rates, i)
+            if self.last_closed is not None and bar['time'] <= self.last_closed:
+                continue
+            for indicator in self.indicators.values():
+                indicator.update(bar)
+            self.last_closed = bar['time']
+        self.forming = _bar(rates, len(rates) - 1)
+        if self.last_closed is not None and self.forming['time'] <= self.last_closed:
+            self.forming = None
+        return True
+
+
+class IndicatorEngine:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._series = {}
+        self.queries = 0
+
+    def _series_for(self, symbol, timeframe):
+        key = (symbol, timeframe)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = Series(symbol, timeframe)
+            return series
+
+    @staticmethod
+    def _make(name, params):
+        cls = INDICATORS.get(name)
+        if cls is None:
+            raise ValueError(f"Unknown indicator {name!r} (have {sorted(INDICATORS)})")
+        return cls(**params)
+
+    def query(self, symbol, timeframe, name, params=None):
+        """
+        Current value of one indicator: {"value", "closed", "time", "closed_time"}.
+        `value` includes the forming bar, `closed` is at the last closed bar;
+        multi-output indicators (bbands) give a dict for each.
+        """
+        return self.query_many([(symbol, timeframe, name, params)])[0]
+
+    def query_many(self, queries):
+        """
+        Batch of (symbol, timeframe, indicator, params) queries. Each series
+        is refreshed once per batch however many indicators ask for it.
+        Failed queries come back as {"error": ...} in place.
+        """
+        self.queries += len(queries)
+        resolved, results = [], []
+        for symbol, timeframe, name, params in queries:
+            try:
+                params = dict(params or {})
+                series = self._series_for(str(symbol), timeframe_value(timeframe))
+                key = (str(name).lower(), tuple(sorted(params.items())))
+                resolved.append((series, key, params))
+            except Exception as e:
+                resolved.append(e)
+
+        refreshed = {}
+        for item in resolved:
+            if isinstance(item, Exception):
+                results.append({'error': str(item)})
+                continue
+            series, key, params = item
+            try:
+                with series.lock:
+                    indicator = series.indicators.get(key)
+                    if indicator is None:
+                        indicator = self._make(key[0], params)
+                        series.add(key, indicator)
+                    if id(series) not in refreshed:
+                        warmup = max(i.warmup() for i in series.indicators.values())
+                        refreshed[id(series)] = series.refresh(warmup)
+                    if not refreshed[id(series)] and series.last_closed is None:
+                        results.append({'error': f"No bars for {series.symbol}"})
+                        continue
+                    forming = series.forming
+                    results.append({
+                        'value': indicator.peek(forming) if forming else indicator.value(),
+                        'closed': indicator.value(),
+                        'time': forming['time'] if forming else series.last_closed,
+                        'closed_time': series.last_closed,
+                    })
+            except Exception as e:
+                results.append({'error': str(e)})
+        return results
+
+    def stats(self):
+        with self._lock:
+            series = list(self._series.values())
+        return {
+            'series': len(series),
+            'indicators': sum(len(s.indicators) for s in series),
+            'bars_fetched': sum(s.bars_fetched for s in series),
+            'queries': self.queries,
+        }
+
+    def reset(self):
+        with self._lock:
+            self._series.clear()
+
+
+engine = IndicatorEngine()
@@ -0,0 +1,137 @@
+"""
+Background structured logger for the MT5 bridge server.
+
+Callers only check the level (and sampling), then put a tuple on a queue;
+a daemon thread turns entries into JSON lines and writes them in batches.
+Nothing on the request path formats strings or touches the console, and
+fields are serialised on the writer thread, so they must be plain values -
+never pass an RPyC netref (its repr would be a remote call).
+
+Configuration (environment):
+    MT5_LOG_LEVEL   DEBUG / INFO / WARNING / ERROR (default INFO)
+    MT5_LOG_SAMPLE  fraction of sampled events kept, 0..1 (default 1.0);
+                    only events logged with sampled=True are affected,
+                    warnings and errors are always kept
+    MT5_LOG_FILE    append JSON lines to this file instead of stdout
+
+Each line: {"ts": ..., "level": ..., "event": ..., "rid": ..., <fields>}
+"""
+import itertools
+import json
+import os
+import queue
+import random
+import sys
+import threading
+import time
+
+LEVELS = {'DEBUG': 10, 'INFO': 20, 'WARNING': 30, 'ERROR': 40}
+
+_STOP = object()
+_request_ids = itertools.count(1)
+_RID_PREFIX = f"{os.getpid():x}"
+
+
+def new_request_id():
+    """Process-unique request ID, cheap enough to mint for every order."""
+    return f"{_RID_PREFIX}-{next(_request_ids):x}"
+
+
+class BackgroundLogger:
+    def __init__(self, stream=None, level='INFO', sample_rate=1.0, queue_size=10000, batch=256):
+        self.stream = stream
+        self.level = LEVELS.get(str(level).upper(), LEVELS['INFO'])
+        self.sample_rate = float(sample_rate)
+        self.batch = batch
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._thread = None
+        self._lock = threading.Lock()
+        self.dropped = 0          # queue full
+        self.sampled_out = 0
+
+    def enabled(self, level):
+        return LEVELS[level] >= self.level
+
+    def log(self, level, event, rid=None, sampled=False, **fields):
+        if LEVELS[level] < self.level:
+            return
+        if sampled and self.sample_rate < 1.0 and LEVELS[level] < LEVELS['WARNING'] \
+                and random.random() >= self.sample_rate:
+            self.sampled_out += 1
+            return
+        self._ensure_started()
+        try:
+            self._queue.put_nowait((time.time(), level, event, rid, fields))
+        except queue.Full:
+            # Never block a request on logging
+            self.dropped += 1
+
+    def debug(self, event, **fields):
+        self.log('DEBUG', event, **fields)
+
+    def info(self, event, **fields):
+        self.log('INFO', event, **fields)
+
+    def warning(self, event, **fields):
+        self.log('WARNING', event, **fields)
+
+    def error(self, event, **fields):
+        self.log('ERROR', event, **fields)
+
+    def stats(self):
+        return {'queued': self._queue.qsize(), 'dropped': self.dropped, 'sampled_out': self.sampled_out}
+
+    def _ensure_started(self):
+        if self._thread is not None:
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, daemon=True, name='mt5-log')
+                self._thread.start()
+
+    def close(self, timeout=2.0):
+        """Flush what is queued and stop the writer thread."""
+        if self._thread is None:
+            return
+        self._queue.put(_STOP)
+        self._thread.join(timeout)
+        self._thread = None
+
+    @staticmethod
+    def _line(entry):
+        ts, level, event, rid, fields = entry
+        record = {'ts': round(ts, 6), 'level': level, 'event': event}
+        if rid is not None:
+            record['rid'] = rid
+        record.update(fields)
+        return json.dumps(record, default=str)
+
+    def _run(self):
+        stream = self.stream or sys.stdout
+        while True:
+            entries = [self._queue.get()]
+            while len(entries) < self.batch:
+                try:
+                    entries.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            stop = any(e is _STOP for e in entries)
+            lines = [self._line(e) for e in entries if e is not _STOP]
+            if lines:
+                try:
+                    stream.write("\n".join(lines) + "\n")
+                    stream.flush()
+                except Exception:
+                    self.dropped += len(lines)
+            if stop:
+                return
+
+
+def _from_env():
+    path = os.environ.get('MT5_LOG_FILE')
+    stream = open(path, 'a', encoding='utf-8', buffering=1 << 16) if path else None
+    return BackgroundLogger(stream=stream,
+                            level=os.environ.get('MT5_LOG_LEVEL', 'INFO'),
+                            sample_rate=float(os.environ.get('MT5_LOG_SAMPLE', 1.0)))
+
+logger = _from_env()
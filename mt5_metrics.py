@@ -0,0 +1,331 @@
+"""
+Thread-safe request metrics for the MT5 bridge servers.
+
+instrument_service(cls) wraps every exposed_* method of an RPyC service so
+each endpoint gets a call counter, an error counter, an in-flight gauge and
+three latency histograms:
+
+- request: wall time inside the handler
+- mt5:     time spent waiting on the terminal (executor calls, or code run
+           under mt5_timer()), accumulated per request on a thread-local
+- marshal: the rest - unboxing netref arguments, building dicts/JSON, ...
+
+Histograms are HDR-style (log-linear, 16 sub-buckets per power of two, so
+about 6% relative error at any magnitude) over microseconds. Exposure is
+the Prometheus text format on http://127.0.0.1:<port>/metrics
+(start_http_server) and plain dicts for the TUI (metrics.snapshot()).
+Only the standard library is used.
+"""
+import functools
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+SUB_BITS = 4
+SUB_COUNT = 1 << SUB_BITS
+MAX_BITS = 40                      # ~12.7 days in microseconds, plenty
+BUCKET_COUNT = (MAX_BITS - SUB_BITS + 1) * SUB_COUNT
+
+# `le` boundaries (seconds) used when exporting histograms to Prometheus
+EXPORT_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025,
+                  0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUANTILES = (0.5, 0.95, 0.99)
+
+DEFAULT_METRICS_PORT = 18814
+
+_local = threading.local()
+
+
+def _bucket_index(us):
+    if us < SUB_COUNT:
+        return us
+    shift = us.bit_length() - SUB_BITS - 1
+    return min((shift + 1) * SUB_COUNT + (us >> shift) - SUB_COUNT, BUCKET_COUNT - 1)
+
+def _bucket_upper(index):
+    """Largest value (microseconds) that lands in bucket `index`."""
+    if index < SUB_COUNT:
+        return index
+    shift = index // SUB_COUNT - 1
+    return ((index % SUB_COUNT + SUB_COUNT + 1) << shift) - 1
+
+
+class Histogram:
+    """Log-linear latency histogram. record() takes nanoseconds."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counts = [0] * BUCKET_COUNT
+        self.count = 0
+        self.sum_ns = 0
+        self.max_ns = 0
+
+    def record(self, ns):
+        index = _bucket_index(max(0, ns) // 1000)
+        with self._lock:
+            self.counts[index] += 1
+            self.count += 1
+            self.sum_ns += ns
+            if ns > self.max_ns:
+                self.max_ns = ns
+
+    def _copy(self):
+        with self._lock:
+            return list(self.counts), self.count, self.sum_ns, self.max_ns
+
+    def percentiles(self, quantiles=QUANTILES):
+        """{q: seconds} using bucket upper bounds (never under-reports)."""
+        counts, count, _, max_ns = self._copy()
+        result = {}
+        targets = sorted(quantiles)
+        seen, i = 0, 0
+        for index, n in enumerate(counts):
+            if not n:
+                continue
+            seen += n
+            while i < len(targets) and seen >= targets[i] * count:
+                result[targets[i]] = min(_bucket_upper(index) * 1e-6, max_ns / 1e9)
+                i += 1
+            if i == len(targets):
+                break
+        for q in targets[i:]:
+            result[q] = 0.0
+        return result
+
+    def summary(self):
+        counts, count, sum_ns, max_ns = self._copy()
+        p = self.percentiles()
+        return {
+            'count': count,
+            'mean_ms': sum_ns / count / 1e6 if count else 0.0,
+            'max_ms': max_ns / 1e6,
+            'p50_ms': p[0.5] * 1000,
+            'p95_ms': p[0.95] * 1000,
+            'p99_ms': p[0.99] * 1000,
+        }
+
+    def cumulative(self, bounds=EXPORT_BUCKETS):
+        """[(le_seconds, cumulative_count)] for Prometheus, plus count and sum."""
+        counts, count, sum_ns, _ = self._copy()
+        out, running, index = [], 0, 0
+        for le in bounds:
+            limit_us = le * 1e6
+            while index < BUCKET_COUNT and _bucket_upper(index) <= limit_us:
+                running += counts[index]
+                index += 1
+            out.append((le, running))
+        return out, count, sum_ns / 1e9
+
+
+class EndpointStats:
+    def __init__(self, name):
+        self.name = name
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.errors = 0
+        self.in_flight = 0
+        self.request = Histogram()
+        self.mt5 = Histogram()
+        self.marshal = Histogram()
+
+    def enter(self):
+        with self._lock:
+            self.calls += 1
+            self.in_flight += 1
+
+    def exit(self, elapsed_ns, mt5_ns, failed):
+        with self._lock:
+            self.in_flight -= 1
+            if failed:
+                self.errors += 1
+        self.request.record(elapsed_ns)
+        self.mt5.record(mt5_ns)
+        self.marshal.record(max(0, elapsed_ns - mt5_ns))
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.endpoints = {}
+        self.gauges = {}             # name -> (help, fn)
+        self.connections = 0
+        self.started = time.time()
+
+    def connection_opened(self):
+        with self._lock:
+            self.connections += 1
+
+    def connection_closed(self):
+        with self._lock:
+            self.connections = max(0, self.connections - 1)
+
+    def endpoint(self, name):
+        stats = self.endpoints.get(name)
+        if stats is None:
+            with self._lock:
+                stats = self.endpoints.setdefault(name, EndpointStats(name))
+        return stats
+
+    def gauge(self, name, help_text, fn):
+        """Register a callback gauge; fn() returns a number or {label: number}."""
+        self.gauges[name] = (help_text, fn)
+
+    def wrap(self, name, fn):
+        """Instrument fn as endpoint `name`."""
+        stats = self.endpoint(name)
+
+        @functools.wraps(fn)
+        def timed(*args, **kwargs):
+            # Save the outer request's accounting so nested endpoints add up
+            outer_mt5, outer_failed = getattr(_local, 'mt5_ns', None), getattr(_local, 'failed', False)
+            _local.mt5_ns, _local.failed = 0, False
+            stats.enter()
+            t0 = time.perf_counter_ns()
+            failed = True
+            try:
+                result = fn(*args, **kwargs)
+                failed = False
+                return result
+            finally:
+                elapsed = time.perf_counter_ns() - t0
+                mt5_ns, failed = _local.mt5_ns, failed or _local.failed
+                _local.mt5_ns = None if outer_mt5 is None else outer_mt5 + mt5_ns
+                _local.failed = outer_failed
+                stats.exit(elapsed, mt5_ns, failed)
+        return timed
+
+    def snapshot(self):
+        """Plain-dict view for the TUI: {endpoint: {calls, errors, in_flight, request/mt5/marshal summaries}}."""
+        with self._lock:
+            endpoints = list(self.endpoints.values())
+        return {
+            e.name: {
+                'calls': e.calls,
+                'errors': e.errors,
+                'in_flight': e.in_flight,
+                'request': e.request.summary(),
+                'mt5': e.mt5.summary(),
+                'marshal': e.marshal.summary(),
+            }
+            for e in endpoints
+        }
+
+    def totals(self):
+        with self._lock:
+            endpoints = list(self.endpoints.values())
+        return {
+            'calls': sum(e.calls for e in endpoints),
+            'errors': sum(e.errors for e in endpoints),
+            'in_flight': sum(e.in_flight for e in endpoints),
+        }
+
+    def render(self, prefix='mt5_bridge'):
+        """Prometheus text exposition format."""
+        with self._lock:
+            endpoints = sorted(self.endpoints.values(), key=lambda e: e.name)
+        lines = []
+
+        def family(name, kind, help_text):
+            lines.append(f"# HELP {prefix}_{name} {help_text}")
+            lines.append(f"# TYPE {prefix}_{name} {kind}")
+
+        family('requests_total', 'counter', 'Calls per endpoint.')
+        lines += [f'{prefix}_requests_total{{endpoint="{e.name}"}} {e.calls}' for e in endpoints]
+        family('errors_total', 'counter', 'Failed calls per endpoint (exceptions or failed results).')
+        lines += [f'{prefix}_errors_total{{endpoint="{e.name}"}} {e.errors}' for e in endpoints]
+        family('in_flight', 'gauge', 'Calls currently being handled.')
+        lines += [f'{prefix}_in_flight{{endpoint="{e.name}"}} {e.in_flight}' for e in endpoints]
+
+        # Histograms only for endpoints that have been called, to keep scrapes small
+        active = [e for e in endpoints if e.calls]
+        for part, help_text in (('request', 'Time inside the handler.'),
+                                ('mt5', 'Time spent waiting on the MT5 terminal.'),
+                                ('marshal', 'Handler time not spent in MT5 (unboxing, conversion).')):
+            family(f'{part}_seconds', 'histogram', help_text)
+            for e in active:
+                buckets, count, total = getattr(e, part).cumulative()
+                label = f'endpoint="{e.name}"'
+                for le, n in buckets:
+                    lines.append(f'{prefix}_{part}_seconds_bucket{{{label},le="{le}"}} {n}')
+                lines.append(f'{prefix}_{part}_seconds_bucket{{{label},le="+Inf"}} {count}')
+                lines.append(f'{prefix}_{part}_seconds_sum{{{label}}} {total:.9f}')
+                lines.append(f'{prefix}_{part}_seconds_count{{{label}}} {count}')
+
+        family('request_quantile_seconds', 'gauge', 'Request latency quantiles from the HDR histogram.')
+        for e in active:
+            for q, value in e.request.percentiles().items():
+                lines.append(f'{prefix}_request_quantile_seconds{{endpoint="{e.name}",quantile="{q}"}} {value:.6f}')
+
+        for name, (help_text, fn) in sorted(self.gauges.items()):
+            try:
+                value = fn()
+            except Exception:
+                continue
+            family(name, 'gauge', help_text)
+            if isinstance(value, dict):
+                lines += [f'{prefix}_{name}{{key="{k}"}} {v}' for k, v in value.items()]
+            else:
+                lines.append(f'{prefix}_{name} {value}')
+
+        family('connections', 'gauge', 'Open client connections.')
+        lines.append(f'{prefix}_connections {self.connections}')
+        family('uptime_seconds', 'gauge', 'Seconds since the server started.')
+        lines.append(f'{prefix}_uptime_seconds {time.time() - self.started:.0f}')
+        return "\n".join(lines) + "\n"
+
+
+metrics = MetricsRegistry()
+
+
+def add_mt5_time(ns):
+    """Credit `ns` of terminal time to the request running on this thread."""
+    if getattr(_local, 'mt5_ns', None) is not None:
+        _local.mt5_ns += ns
+
+@contextmanager
+def mt5_timer():
+    """Time a block of direct MetaTrader5 calls as terminal time."""
+    t0 = time.perf_counter_ns()
+    try:
+        yield
+    finally:
+        add_mt5_time(time.perf_counter_ns() - t0)
+
+def mark_failed():
+    """Count the current request as an error even though it returned normally."""
+    _local.failed = True
+
+def instrument_service(cls, registry=metrics):
+    """Class decorator: wrap every exposed_* method defined on cls."""
+    for attr, fn in list(vars(cls).items()):
+        if attr.startswith('exposed_') and callable(fn):
+            setattr(cls, attr, registry.wrap(attr[len('exposed_'):], fn))
+    return cls
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    registry = metrics
+
+    def do_GET(self):
+        if self.path.split('?')[0] != '/metrics':
+            self.send_error(404)
+            return
+        body = self.registry.render().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_http_server(port=DEFAULT_METRICS_PORT, host='127.0.0.1', registry=metrics):
+    """Serve /metrics on a daemon thread. Returns the HTTP server."""
+    handler = type('MetricsHandler', (_MetricsHandler,), {'registry': registry})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True, name='mt5-metrics').start()
+    return server
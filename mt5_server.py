@@ -1,178 +1,248 @@
 # mt5_server.py
+import json
+import os
+import sys
 import MetaTrader5
 import rpyc
 from rpyc.utils.server import ThreadedServer
+import itertools
 import threading
 import time
 from datetime import datetime
 from collections import deque
-from rich.console import Console
-from rich.layout import Layout
-from rich.panel import Panel
-from rich.live import Live
-from rich.table import Table
-from rich.text import Text
-from rich.box import ROUNDED
+from mt5_metrics import DEFAULT_METRICS_PORT, instrument_service, mark_failed, metrics, mt5_timer, start_http_server
+from mt5_session import SharedTerminal, TerminalSession
+
+# --- Event log ---
+class EventLog:
+    """
+    Fixed-size ring buffer of raw events. Writers never lock or format: they
+    store (seq, time, status, fmt, args) in a slot picked by an atomic
+    counter. The message is only built (fmt % args) when someone reads it,
+    i.e. when the TUI draws or headless mode prints.
+    """
+
+    def __init__(self, size=256):
+        self.size = size
+        self._slots = [None] * size
+        self._seq = itertools.count()
+        self.head = -1       # seq of the newest event
+
+    def log(self, status, fmt, *args):
+        seq = next(self._seq)
+        self._slots[seq % self.size] = (seq, time.time(), status, fmt, args)
+        self.head = seq
+
+    def since(self, seq, limit=None):
+        """Events newer than seq as (seq, time, status, message), oldest first."""
+        entries = sorted(e for e in list(self._slots) if e is not None and e[0] > seq)
+        if limit is not None:
+            entries = entries[-limit:]
+        return [(s, when, status, self._format(fmt, args)) for s, when, status, fmt, args in entries]
+
+    def recent(self, n):
+        return [(when, status, message) for _, when, status, message in self.since(-1, n)]
+
+    @staticmethod
+    def _format(fmt, args):
+        try:
+            return fmt % args if args else fmt
+        except Exception as e:
+            return f"{fmt} {args!r} (format error: {e})"
+
+
+# --- Rate / latency sparklines ---
+class Sparkline:
+    """Last `width` values as block characters, updated one value at a time."""
+
+    BLOCKS = "▁▂▃▄▅▆▇█"
+
+    def __init__(self, width=30):
+        self.values = deque(maxlen=width)
+        self.chars = deque(maxlen=width)
+        self.peak = 0.0
+
+    def _char(self, value):
+        if self.peak <= 0:
+            return self.BLOCKS[0]
+        return self.BLOCKS[min(len(self.BLOCKS) - 1, int(value / self.peak * (len(self.BLOCKS) - 1)))]
+
+    def push(self, value):
+        evicted = self.values[0] if len(self.values) == self.values.maxlen else None
+        self.values.append(value)
+        if value > self.peak or (evicted is not None and evicted >= self.peak):
+            # Scale changed: rebuild (rare); otherwise just add one char
+            self.peak = max(self.values)
+            self.chars = deque((self._char(v) for v in self.values), maxlen=self.values.maxlen)
+        else:
+            self.chars.append(self._char(value))
+
+    def render(self):
+        return "".join(self.chars)
+
+class MetricsSampler:
+    """
+    Turns cumulative counters from mt5_metrics into per-interval request rate
+    and mean latency. Runs on the draw loop, so the request path pays nothing.
+    """
+
+    def __init__(self, registry, width=30):
+        self.registry = registry
+        self.rate = Sparkline(width)
+        self.latency = Sparkline(width)
+        self.last_rate = 0.0
+        self.last_latency_ms = 0.0
+        self._prev = None
+
+    def _totals(self):
+        endpoints = list(self.registry.endpoints.values())
+        return (time.monotonic(), sum(e.request.count for e in endpoints),
+                sum(e.request.sum_ns for e in endpoints))
+
+    def sample(self):
+        now, count, sum_ns = self._totals()
+        if self._prev is not None:
+            t0, count0, sum0 = self._prev
+            calls = count - count0
+            self.last_rate = calls / max(now - t0, 1e-6)
+            self.last_latency_ms = (sum_ns - sum0) / calls / 1e6 if calls else 0.0
+            self.rate.push(self.last_rate)
+            self.latency.push(self.last_latency_ms)
+        self._prev = (now, count, sum_ns)
+
 
 # --- Server State for TUI ---
+# Request/error/connection counts live in mt5_metrics (thread-safe)
 class ServerState:
     def __init__(self):
-        self.logs = deque(maxlen=20)
-        self.connections = 0
-        self.requests_total = 0
-        self.errors_total = 0
+        self.events = EventLog()
         self.mt5_connected = False
         self.mt5_login = "N/A"
         self.server_start_time = datetime.now()
-        self.last_update = datetime.now()
 
-    def log(self, message, status="INFO"):
-        self.logs.append({
-            "time": datetime.now().strftime("%H:%M:%S"),
-            "message": message,
-            "status": status
-        })
+    def log(self, status, fmt, *args):
+        self.events.log(status, fmt, *args)
 
 state = ServerState()
 
+def on_session_change(status_name, status):
+    state.mt5_connected = status['connected']
+    if status['login'] is not None:
+        state.mt5_login = status['login']
+    if status['connected']:
+        state.log("INFO", "MT5 %s. Login: %s", status_name, status['login'])
+    else:
+        state.log("ERR", "MT5 %s: %s", status_name, status['last_error'])
+
+# Initialised once at startup, monitored and re-initialised in the background
+session = TerminalSession(MetaTrader5, path=os.environ.get("MT5_TERMINAL_PATH"), on_change=on_session_change)
+shared_mt5 = SharedTerminal(MetaTrader5, session)
+
+# Local Prometheus endpoint; MT5_METRICS_PORT=0 disables it
+METRICS_PORT = int(os.environ.get("MT5_METRICS_PORT", DEFAULT_METRICS_PORT))
+
 # --- MT5 Service ---
+@instrument_service
 class MT5Service(rpyc.Service):
     def on_connect(self, conn):
-        state.connections += 1
-        state.log(f"New Connection: {conn}", "INFO")
-    
+        session.acquire()
+        metrics.connection_opened()
+        state.log("INFO", "New Connection: %s", conn)
+
     def on_disconnect(self, conn):
-        state.connections = max(0, state.connections - 1)
-        state.log(f"Disconnected: {conn}", "WARN")
+        session.release()
+        metrics.connection_closed()
+        state.log("WARN", "Disconnected: %s", conn)
 
     def exposed_get_mt5(self):
-        # Expose the MetaTrader5 library methods
-        return MetaTrader5
-    
+        # Expose the MetaTrader5 library methods (initialize/shutdown belong to the session)
+        return shared_mt5
+
+    def exposed_session_status(self):
+        # JSON string, so the whole status arrives in one round trip
+        return json.dumps(session.status())
+
     def exposed_order_send(self, request):
-        state.requests_total += 1
-        start = time.time()
+        # Stage stamps, so slow orders can be pinned on unboxing or on the terminal/broker
+        received = time.perf_counter_ns()
         try:
             # Use rpyc generic obtain to get the object by value
             native_request = rpyc.utils.classic.obtain(request)
-            state.log(f"Order Request: {native_request}", "REQ")
-            
-            result = MetaTrader5.order_send(native_request)
-            
-            duration = (time.time() - start) * 1000
+            # Stored as-is; the dict is only stringified if the TUI shows it
+            state.log("REQ", "Order Request: %r", native_request)
+
+            mt5_start = time.perf_counter_ns()
+            with mt5_timer():
+                result = MetaTrader5.order_send(native_request)
+            mt5_end = time.perf_counter_ns()
+
             status = "OK" if result.retcode == MetaTrader5.TRADE_RETCODE_DONE else "FAIL"
-            state.log(f"Order Result: retcode={result.retcode} ({duration:.1f}ms)", status)
-            
-            if status == "FAIL": state.errors_total += 1
+            state.log(status, "Order Result: retcode=%s price=%s (unbox %.2fms, mt5 %.1fms, total %.1fms)",
+                      result.retcode, result.price, (mt5_start - received) / 1e6,
+                      (mt5_end - mt5_start) / 1e6, (mt5_end - received) / 1e6)
+
+            if status == "FAIL": mark_failed()
             return result
-            
+
         except Exception as e:
-            state.errors_total += 1
-            state.log(f"Error processing order: {e}", "ERR")
+            mark_failed()
+            state.log("ERR", "Error processing order: %s", e)
             return None
 
-# --- TUI Components ---
-
-def make_layout() -> Layout:
-    layout = Layout(name="root")
-    layout.split(
-        Layout(name="header", size=3),
-        Layout(name="main", ratio=1),
-        Layout(name="footer", size=3)
-    )
-    layout["main"].split_row(
-        Layout(name="logs", ratio=2),
-        Layout(name="stats", ratio=1),
-    )
-    return layout
-
-def render_header():
-    grid = Table.grid(expand=True)
-    grid.add_column(justify="left", ratio=1)
-    grid.add_column(justify="right")
-    grid.add_row(
-        Text("MT5 RPyC Bridge Server", style="bold white"),
-        datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-    )
-    return Panel(grid, style="white on blue")
-
-def render_stats():
-    table = Table(box=ROUNDED, expand=True)
-    table.add_column("Metric", style="dim")
-    table.add_column("Value", justify="right", style="bold")
-    
-    status_style = "green" if state.mt5_connected else "red"
-    status_text = "CONNECTED" if state.mt5_connected else "DISCONNECTED"
-    
-    table.add_row("MT5 Status", f"[{status_style}]{status_text}[/{status_style}]")
-    if state.mt5_login != "N/A":
-        table.add_row("Login", str(state.mt5_login))
-    
-    table.add_row("Active Connections", str(state.connections))
-    table.add_row("Total Requests", str(state.requests_total))
-    table.add_row("Errors", f"[red]{state.errors_total}[/red]" if state.errors_total > 0 else "0")
-    
-    uptime = datetime.now() - state.server_start_time
-    table.add_row("Uptime", str(uptime).split('.')[0])
-    
-    return Panel(table, title="Server Stats", border_style="blue")
-
-def render_logs():
-    table = Table(box=None, expand=True, show_header=False)
-    table.add_column("Time", width=10, style="dim")
-    table.add_column("Status", width=6)
-    table.add_column("Message")
-    
-    for log in list(state.logs):
-        color = "green"
-        if log['status'] in ["WARN", "FAIL"]: color = "yellow"
-        if log['status'] == "ERR": color = "red"
-        if log['status'] == "REQ": color = "cyan"
-        
-        table.add_row(
-            log['time'],
-            f"[{color}]{log['status']}[/{color}]",
-            str(log['message'])
-        )
-        
-    return Panel(table, title="Event Log", border_style="white")
-
-def run_tui(event_stop):
-    console = Console()
-    layout = make_layout()
-    
-    with Live(layout, refresh_per_second=4, screen=True) as live:
-        while not event_stop.is_set():
-            layout["header"].update(render_header())
-            layout["logs"].update(render_logs())
-            layout["stats"].update(render_stats())
-            layout["footer"].update(Panel(f"Listening on [bold]0.0.0.0:18812[/bold] (RPyC). Press Ctrl+C to stop.", style="dim"))
-            time.sleep(0.25)
+# --- Headless mode ---
+def run_headless(event_stop, interval=10.0):
+    """Plain-text output (no Rich): new events as they come, a summary line every `interval` seconds."""
+    sampler = MetricsSampler(metrics)
+    sampler.sample()
+    last_seq = -1
+    next_summary = time.monotonic() + interval
+    while not event_stop.is_set():
+        for seq, when, status, message in state.events.since(last_seq):
+            print(f"{time.strftime('%H:%M:%S', time.localtime(when))} {status:<5} {message}")
+            last_seq = seq
+        if time.monotonic() >= next_summary:
+            sampler.sample()
+            totals = metrics.totals()
+            print(f"-- {sampler.last_rate:.1f} req/s, mean {sampler.last_latency_ms:.2f} ms, "
+                  f"{totals['calls']} requests, {totals['errors']} errors, "
+                  f"{metrics.connections} connections")
+            next_summary += interval
+        event_stop.wait(1.0)
 
 # --- Main Entry Point ---
 if __name__ == "__main__":
-    # Initialize MT5
-    if not MetaTrader5.initialize():
-        state.log(f"MT5 Init Failed: {MetaTrader5.last_error()}", "ERR")
-    else:
-        state.mt5_connected = True
-        info = MetaTrader5.account_info()
-        if info:
-            state.mt5_login = info.login
-            state.log(f"MT5 Initialized. Login: {info.login}", "INFO")
+    # Headless: --headless, MT5_SERVER_HEADLESS=1, or no terminal attached
+    headless = ("--headless" in sys.argv or os.environ.get("MT5_SERVER_HEADLESS") == "1"
+                or not sys.stdout.isatty())
+
+    # Initialize MT5 once; the session logs state changes and retries on failure
+    session.start()
+
+    if METRICS_PORT:
+        start_http_server(METRICS_PORT)
 
     # Start RPyC Server in a Thread
     server = ThreadedServer(MT5Service, port=18812, protocol_config={"allow_public_attrs": True, "allow_pickle": True})
     t_server = threading.Thread(target=server.start)
     t_server.daemon = True # Allow exit when main thread exits
     t_server.start()
-    
+
     stop_event = threading.Event()
     try:
-        run_tui(stop_event)
+        if headless:
+            print(f"MT5 RPyC server listening on 0.0.0.0:18812 (headless)"
+                  + (f", metrics on 127.0.0.1:{METRICS_PORT}/metrics" if METRICS_PORT else ""))
+            run_headless(stop_event)
+        else:
+            # Rich is only needed (and imported) for the TUI
+            from mt5_tui import run_tui
+            footer = "Listening on [bold]0.0.0.0:18812[/bold] (RPyC)"
+            if METRICS_PORT:
+                footer += f", metrics on [bold]127.0.0.1:{METRICS_PORT}/metrics[/bold]"
+            run_tui(stop_event, state, metrics, MetricsSampler(metrics), footer + ". Press Ctrl+C to stop.")
     except KeyboardInterrupt:
         stop_event.set()
         # RPyC server.close() isn't clean always, but daemon thread helps
         server.close()
-        MetaTrader5.shutdown()
-        print("Server Stopped")
\ No newline at end of file
+        session.stop()
+        print("Server Stopped")
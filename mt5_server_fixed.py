@@ -8,196 +8,860 @@ casts all numerical and string values to their native Python types
 (int, float, str). This prevents `mt5.order_send` returning `None`
 when passing Numpy-types or RPyC proxy objects.
 """
-import MetaTrader5 as mt5
+import json
+import os
+import sys
+import threading
+import time
+from array import array
 from rpyc.utils.server import ThreadedServer
+from rpyc.utils.classic import obtain
 import rpyc
+from mt5_cache import TTLCache
+from mt5_cursors import cursors
+# Every terminal call goes through the single-owner executor (see mt5_executor)
+from mt5_executor import executor, mt5
+from mt5_indicators import engine as indicators
+from mt5_log import logger, new_request_id
+from mt5_metrics import instrument_service, mark_failed, metrics, start_http_server
+from mt5_session import SharedTerminal, TerminalSession
+from mt5_stream import streamer
+from mt5_validate import BUY_TYPES, Rejected, symbol_spec, validate
+from mt5_execution import ExecutionStats, slippage_points, stage_durations
 
+SNAPSHOT_SECTIONS = ('account', 'positions', 'orders', 'ticks')
+
+def account_to_dict(info):
+    return {
+        'login': info.login,
+        'balance': info.balance,
+        'equity': info.equity,
+        'profit': info.profit,
+        'margin': info.margin,
+        'margin_free': info.margin_free,
+        'leverage': info.leverage,
+        'currency': info.currency,
+        'server': info.server,
+        'company': info.company,
+        'trade_allowed': info.trade_allowed
+    }
+
+def position_to_dict(p):
+    return {
+        'ticket': p.ticket,
+        'symbol': p.symbol,
+        'type': p.type,
+        'volume': p.volume,
+        'price_open': p.price_open,
+        'price_current': p.price_current,
+        'sl': p.sl,
+        'tp': p.tp,
+        'profit': p.profit,
+        'swap': p.swap,
+        'magic': p.magic,
+        'comment': p.comment,
+        'time': p.time
+    }
+
+def order_to_dict(o):
+    return {
+        'ticket': o.ticket,
+        'symbol': o.symbol,
+        'type': o.type,
+        'state': o.state,
+        'volume_initial': o.volume_initial,
+        'volume_current': o.volume_current,
+        'price_open': o.price_open,
+        'price_current': o.price_current,
+        'sl': o.sl,
+        'tp': o.tp,
+        'magic': o.magic,
+        'comment': o.comment,
+        'time_setup': o.time_setup
+    }
+
+def tick_to_dict(tick):
+    return {
+        'bid': tick.bid,
+        'ask': tick.ask,
+        'spread': tick.ask - tick.bid,
+        'time': tick.time
+    }
+
+# Column schemas for columnar history export: (field, array typecode).
+# 'q' = int64, 'd' = float64, 's' = string (sent as a tuple of str).
+DEAL_COLUMNS = (
+    ('ticket', 'q'), ('order', 'q'), ('time', 'q'), ('time_msc', 'q'),
+    ('type', 'q'), ('entry', 'q'), ('magic', 'q'), ('position_id', 'q'),
+    ('reason', 'q'), ('volume', 'd'), ('price', 'd'), ('commission', 'd'),
+    ('swap', 'd'), ('profit', 'd'), ('fee', 'd'), ('symbol', 's'),
+    ('comment', 's'), ('external_id', 's')
+)
+
+ORDER_COLUMNS = (
+    ('ticket', 'q'), ('time_setup', 'q'), ('time_setup_msc', 'q'),
+    ('time_done', 'q'), ('time_done_msc', 'q'), ('time_expiration', 'q'),
+    ('type', 'q'), ('type_time', 'q'), ('type_filling', 'q'), ('state', 'q'),
+    ('magic', 'q'), ('position_id', 'q'), ('position_by_id', 'q'),
+    ('reason', 'q'), ('volume_initial', 'd'), ('volume_current', 'd'),
+    ('price_open', 'd'), ('sl', 'd'), ('tp', 'd'), ('price_current', 'd'),
+    ('price_stoplimit', 'd'), ('symbol', 's'), ('comment', 's'),
+    ('external_id', 's')
+)
+
+def to_columns(records, schema, fields=None):
+    """
+    Pack MT5 namedtuple records into columns. Numeric columns become raw
+    array bytes, so the result is a nested tuple of primitives that RPyC
+    sends by value in one message:
+        (byteorder, count, ((field, typecode, data), ...))
+    """
+    records = records or ()
+    if fields:
+        known = dict(schema)
+        unknown = [f for f in fields if f not in known]
+        if unknown:
+            raise ValueError(f"Unknown fields: {unknown}")
+        schema = [(f, known[f]) for f in fields]
+    
+    columns = []
+    for name, typecode in schema:
+        values = [getattr(r, name) for r in records]
+        if typecode == 's':
+            columns.append((name, typecode, tuple(str(v) for v in values)))
+        else:
+            columns.append((name, typecode, array(typecode, values).tobytes()))
+    return (sys.byteorder, len(records), tuple(columns))
+
+def array_payload(arr):
+    """
+    Structured numpy array (rates/ticks) as (dtype_descr_json, raw_bytes).
+    Both travel by value, and the client rebuilds the array with
+    np.frombuffer - no per-row work on either side. None stays None.
+    """
+    if arr is None:
+        return None
+    return (json.dumps(arr.dtype.descr), arr.tobytes())
+
+# Bytes per chunk read by the client from an ArrayExport
+EXPORT_CHUNK_BYTES = 4 << 20
+
+class ArrayExport:
+    """
+    A large structured array (e.g. millions of ticks) held on the server
+    and read by the client chunk by chunk as raw bytes. Each read is one
+    round trip returning `bytes` by value; the client copies the chunks
+    straight into a preallocated array. Handed to the client as a netref
+    and dropped when the client releases it (or calls close()).
+    """
+    
+    def __init__(self, arr, chunk_bytes=EXPORT_CHUNK_BYTES):
+        self._arr = arr
+        self.chunk_rows = max(1, int(chunk_bytes) // max(1, arr.dtype.itemsize))
+        self.chunks = (len(arr) + self.chunk_rows - 1) // self.chunk_rows
+    
+    def header(self):
+        """(dtype_descr_json, count, chunk_rows, chunks, self) - primitives travel by value."""
+        return (json.dumps(self._arr.dtype.descr), len(self._arr), self.chunk_rows, self.chunks, self)
+    
+    def exposed_read(self, index):
+        start = int(index) * self.chunk_rows
+        return self._arr[start:start + self.chunk_rows].tobytes()
+    
+    def exposed_close(self):
+        self._arr = self._arr[:0]
+
+def by_value(payload):
+    """
+    Serialize a payload to a JSON string. RPyC passes dicts/lists back as
+    netrefs (one round trip per access), but strings travel by value, so the
+    client gets the whole payload in the same round trip as the call.
+    """
+    return json.dumps(payload, separators=(',', ':'))
+
+FLOAT_FIELDS = ['volume', 'price', 'stoplimit', 'sl', 'tp', 'deviation']
+INT_FIELDS = ['action', 'magic', 'order', 'type', 'type_time', 'type_filling', 'position', 'position_by', 'expiration']
+STRING_FIELDS = ['symbol', 'comment']
+
+# Held for a whole batch so other clients' orders cannot interleave with it
+trade_lock = threading.RLock()
+
+def to_native(request):
+    """Cast a (local) request dict to the native types MT5 requires, dropping None values."""
+    native_request = {}
+    for k, v in request.items():
+        if v is None:
+            continue
+        if k in FLOAT_FIELDS:
+            native_request[k] = float(v)
+        elif k in INT_FIELDS:
+            native_request[k] = int(v)
+        elif k in STRING_FIELDS:
+            native_request[k] = str(v)
+        else:
+            native_request[k] = v
+    return native_request
+
+def failed_result(comment, retcode=-1):
+    return {
+        'success': False,
+        'retcode': retcode,
+        'comment': comment,
+        'deal': 0, 'order': 0, 'volume': 0, 'price': 0
+    }
+
+def rejected_result(rejected):
+    """Result for an order stopped by pre-trade validation (never sent to the broker)."""
+    res = failed_result(f'Rejected locally: {rejected.comment}', rejected.retcode)
+    res['local'] = True
+    return res
+
+def result_to_dict(result):
+    return {
+        'success': result.retcode == 10009,
+        'retcode': result.retcode,
+        'comment': result.comment or '',
+        'deal': int(result.deal or 0),
+        'order': result.order or 0,
+        'volume': result.volume or 0,
+        'price': result.price or 0
+    }
+
+def log_result(rid, res):
+    """Queue the outcome of one order for the background logger (successes are sampled)."""
+    if res['success']:
+        logger.log('INFO', 'order_result', rid=rid, sampled=True, retcode=res['retcode'],
+                   order=res['order'], volume=res['volume'], price=res['price'],
+                   elapsed_ms=round(res['elapsed_ms'], 3))
+    else:
+        logger.warning('order_failed', rid=rid, retcode=res['retcode'], comment=res['comment'],
+                       elapsed_ms=round(res['elapsed_ms'], 3))
+
+def send_order(native_request, rid, endpoint, timing):
+    """
+    Execute one order for a single-order endpoint; logging happens off-thread.
+    `timing` arrives with the server_recv stamp and collects the other stages.
+    """
+    # A copy: the writer thread formats it later, after validation has normalised the request in place
+    logger.log('INFO', 'order_request', rid=rid, sampled=True, endpoint=endpoint, request=dict(native_request))
+    start = time.perf_counter()
+    try:
+        check_order(native_request)
+    except Rejected as e:
+        timing['validated'] = time.perf_counter_ns()
+        reply = rejected_result(e)
+        reply['elapsed_ms'] = (time.perf_counter() - start) * 1000
+        reply['request_id'] = rid
+        reply['timing'] = timing
+        mark_failed()
+        log_result(rid, reply)
+        return finish_orders([describe_order(reply, native_request)])[0]
+    timing['validated'] = time.perf_counter_ns()
+    requested_price = quoted_price(native_request)
+    with trade_lock:
+        timing['mt5_start'] = time.perf_counter_ns()
+        result = mt5.order_send(native_request)
+        timing['mt5_end'] = time.perf_counter_ns()
+        cache.invalidate('account', 'positions', 'orders')
+    if result is None:
+        reply = failed_result(f'MT5 returned None (Invalid Params). Error: {mt5.last_error()}')
+    else:
+        reply = result_to_dict(result)
+    reply['elapsed_ms'] = (time.perf_counter() - start) * 1000
+    reply['request_id'] = rid
+    reply['timing'] = timing
+    if not reply['success']:
+        mark_failed()
+    log_result(rid, reply)
+    return finish_orders([describe_order(reply, native_request, requested_price)])[0]
+
+def execute_batch(native_requests, timing=None):
+    """
+    Send already-normalised requests back to back under the trade lock; returns
+    result dicts with timing. `timing` holds the batch's server_recv/validated
+    stamps, copied into every result; callers pass the results to finish_orders().
+    """
+    results = []
+    with trade_lock:
+        for native_request in native_requests:
+            rid = new_request_id()
+            logger.log('DEBUG', 'order_request', rid=rid, sampled=True, endpoint='batch', request=dict(native_request))
+            requested_price = quoted_price(native_request)
+            start = time.perf_counter()
+            stamps = dict(timing or {}, mt5_start=time.perf_counter_ns())
+            result = mt5.order_send(native_request)
+            stamps['mt5_end'] = time.perf_counter_ns()
+            if result is None:
+                res = failed_result(f'MT5 returned None. Error: {mt5.last_error()}')
+            else:
+                res = result_to_dict(result)
+            res['elapsed_ms'] = (time.perf_counter() - start) * 1000
+            res['request_id'] = rid
+            res['timing'] = stamps
+            describe_order(res, native_request, requested_price)
+            log_result(rid, res)
+            results.append(res)
+        if results:
+            cache.invalidate('account', 'positions', 'orders')
+    return results
+
+def matches_filter(record, flt):
+    """
+    True if a position/order matches every given filter key. symbol, magic,
+    type and ticket accept a single value or a list; comment matches as a
+    prefix (the terminal truncates long comments).
+    """
+    for field in ('symbol', 'magic', 'type', 'ticket'):
+        wanted = flt.get(field)
+        if wanted is None:
+            continue
+        if not isinstance(wanted, (list, tuple, set)):
+            wanted = (wanted,)
+        if getattr(record, field) not in wanted:
+            return False
+    comment = flt.get('comment')
+    if comment is not None and not str(record.comment).startswith(str(comment)):
+        return False
+    return True
+
+def load_filter(flt):
+    if flt is None:
+        return {}
+    return json.loads(flt) if isinstance(flt, str) else dict(obtain(flt))
+
+# Shared across all connections so concurrent clients reuse terminal reads
+cache = TTLCache()
+
+def on_session_change(state, status):
+    # Anything cached before the link dropped may be stale
+    cache.invalidate()
+    level = 'INFO' if status['connected'] else 'WARNING'
+    logger.log(level, 'terminal_session', state=state, login=status['login'],
+               reconnects=status['reconnects'], error=status['last_error'])
+
+# The terminal is initialised once and monitored by the session; MT5_TERMINAL_PATH
+# picks the terminal when several are installed side by side
+session = TerminalSession(mt5, path=os.environ.get('MT5_TERMINAL_PATH'), on_change=on_session_change)
+# Clients get the terminal without lifecycle control (initialize/shutdown defer to the session)
+shared_mt5 = SharedTerminal(mt5, session)
+
+def cached_account():
+    return cache.get('account', None, mt5.account_info)
+
+def cached_positions():
+    return cache.get('positions', None, mt5.positions_get)
+
+def cached_orders():
+    return cache.get('orders', None, mt5.orders_get)
+
+def cached_tick(symbol):
+    return cache.get('tick', symbol, lambda: mt5.symbol_info_tick(symbol))
+
+def cached_symbol_info(symbol):
+    return cache.get('symbol_info', symbol, lambda: mt5.symbol_info(symbol))
+
+def cached_symbol_spec(symbol):
+    """Validation fields of symbol_info, refreshed every 'symbol_spec' TTL."""
+    return cache.get('symbol_spec', symbol, lambda: symbol_spec(mt5.symbol_info(symbol)))
+
+def cached_position(ticket):
+    for p in cached_positions() or ():
+        if p.ticket == ticket:
+            return p
+    return None
+
+# Per-symbol fill quality and stage latency of every order this server executes
+execution = ExecutionStats()
+
+def quoted_price(native_request):
+    """
+    The price an order is requested at. A market order (DEAL) fills at the
+    market whatever price the client sent, so it is measured against the
+    ask/bid taken here, at submit time, before order_send; any other order
+    at its own price.
+    """
+    if native_request.get('action') != mt5.TRADE_ACTION_DEAL:
+        return native_request.get('price') or 0.0
+    tick = cached_tick(native_request.get('symbol'))
+    if tick is None:
+        return 0.0
+    return float(tick.ask if native_request.get('type') in BUY_TYPES else tick.bid)
+
+def describe_order(res, native_request, requested_price=None):
+    """
+    Tag a result with symbol, side and requested price (see quoted_price;
+    defaults to the request's price), and slippage for market fills. The
+    price a market order was sent with, if any, is kept as client_price.
+    """
+    symbol = native_request.get('symbol')
+    if symbol is None:
+        return res
+    otype = native_request.get('type')
+    side = None if otype is None else ('buy' if otype in BUY_TYPES else 'sell')
+    res.setdefault('symbol', symbol)
+    res['side'] = side
+    res['requested_price'] = native_request.get('price', 0.0) if requested_price is None else requested_price
+    is_deal = native_request.get('action') == mt5.TRADE_ACTION_DEAL
+    if is_deal and native_request.get('price'):
+        res['client_price'] = native_request['price']
+    if is_deal and res['success'] and side:
+        spec = cached_symbol_spec(symbol)
+        res['slippage_points'] = slippage_points(side, res['requested_price'], res['price'],
+                                                 spec.point if spec else None)
+    return res
+
+def finish_orders(results):
+    """Stamp server_send and stage durations on traced results and add them to the execution stats."""
+    now = time.perf_counter_ns()
+    for res in results:
+        if res.get('timing') is not None:
+            res['timing']['server_send'] = now
+            res['latency_ms'] = stage_durations(res['timing'])
+        execution.record(res)
+    return results
+
+def check_order(native_request):
+    """Normalise a request against cached symbol specs and ticks; raises Rejected (see mt5_validate)."""
+    return validate(native_request, cached_symbol_spec, cached_tick, cached_position)
+
+@instrument_service
 class MT5Service(rpyc.Service):
     """RPyC Service for MT5 - Fixed for order execution"""
     
     ALIASES = ["mt5"]
     
     def on_connect(self, conn):
-        if not mt5.initialize():
-            print(f"⚠️ MT5 initialize failed: {mt5.last_error()}")
+        # The terminal session is shared; connecting only takes a reference
+        self._subscriptions = []
+        session.acquire()
+        metrics.connection_opened()
     
     def on_disconnect(self, conn):
-        mt5.shutdown()
+        # Never shut the terminal down here: other clients are still using it
+        session.release()
+        metrics.connection_closed()
+        for sub in self._subscriptions:
+            sub.close()
+    
+    def exposed_executor_stats(self):
+        """Terminal call counters and current queue depth (JSON string)."""
+        return by_value({
+            'calls_total': executor.calls_total,
+            'calls_deduplicated': executor.calls_deduplicated,
+            'queue_depth': executor.queue_depth()
+        })
+    
+    def exposed_metrics(self):
+        """Per-endpoint counters and latency summaries (JSON string), as served on /metrics."""
+        return by_value({'totals': metrics.totals(), 'connections': metrics.connections,
+                         'endpoints': metrics.snapshot()})
     
     def exposed_get_mt5(self):
-        return mt5
+        return shared_mt5
+    
+    def exposed_session_status(self):
+        """Terminal readiness in one call (JSON string): state, ready, connected, login, ..."""
+        return by_value(session.status())
     
     def exposed_get_account_info(self):
-        info = mt5.account_info()
+        info = cached_account()
         if info is None:
             return None
-        return {
-            'login': info.login,
-            'balance': info.balance,
-            'equity': info.equity,
-            'profit': info.profit,
-            'margin': info.margin,
-            'margin_free': info.margin_free,
-            'leverage': info.leverage,
-            'currency': info.currency,
-            'server': info.server,
-            'company': info.company,
-            'trade_allowed': info.trade_allowed
-        }
+        return account_to_dict(info)
     
     def exposed_get_positions(self):
-        positions = mt5.positions_get()
+        positions = cached_positions()
         if positions is None:
             return []
-        return [
-            {
-                'ticket': p.ticket,
-                'symbol': p.symbol,
-                'type': p.type,
-                'volume': p.volume,
-                'price_open': p.price_open,
-                'price_current': p.price_current,
-                'sl': p.sl,
-                'tp': p.tp,
-                'profit': p.profit,
-                'swap': p.swap,
-                'comment': p.comment,
-                'time': p.time
-            }
-            for p in positions
-        ]
+        return [position_to_dict(p) for p in positions]
+    
+    def exposed_get_orders(self):
+        orders = cached_orders()
+        if orders is None:
+            return []
+        return [order_to_dict(o) for o in orders]
     
     def exposed_get_tick(self, symbol):
-        tick = mt5.symbol_info_tick(symbol)
+        tick = cached_tick(symbol)
         if tick is None:
             return None
-        return {
-            'bid': tick.bid,
-            'ask': tick.ask,
-            'spread': tick.ask - tick.bid,
-            'time': tick.time
-        }
+        return tick_to_dict(tick)
+    
+    def exposed_get_symbol_info(self, symbol):
+        info = cached_symbol_info(symbol)
+        if info is None:
+            return None
+        return info._asdict()
+    
+    def exposed_cache_stats(self):
+        """Hit/miss/coalesced/invalidation counters per data type (JSON string)."""
+        return by_value(cache.stats())
+    
+    def exposed_get_snapshot(self, symbols=None, include=None):
+        """
+        Collect account, positions, pending orders and ticks in one call.
+        `include` selects sections (default: all of SNAPSHOT_SECTIONS).
+        Ticks are returned for `symbols`, or for every symbol with an open
+        position/order when no symbols are given. Returns a JSON string.
+        """
+        symbols = [str(s) for s in obtain(symbols)] if symbols else []
+        include = set(obtain(include)) if include else set(SNAPSHOT_SECTIONS)
+        
+        snapshot = {'server_time': time.time()}
+        positions = orders = None
+        
+        if 'account' in include:
+            info = cached_account()
+            snapshot['account'] = account_to_dict(info) if info is not None else None
+        if 'positions' in include or ('ticks' in include and not symbols):
+            positions = cached_positions() or ()
+        if 'orders' in include or ('ticks' in include and not symbols):
+            orders = cached_orders() or ()
+        if 'positions' in include:
+            snapshot['positions'] = [position_to_dict(p) for p in positions]
+        if 'orders' in include:
+            snapshot['orders'] = [order_to_dict(o) for o in orders]
+        if 'ticks' in include:
+            if not symbols:
+                symbols = sorted({p.symbol for p in positions} | {o.symbol for o in orders})
+            ticks = {}
+            for symbol in symbols:
+                tick = cached_tick(symbol)
+                ticks[symbol] = tick_to_dict(tick) if tick is not None else None
+            snapshot['ticks'] = ticks
+        
+        return by_value(snapshot)
+    
+    def exposed_subscribe_ticks(self, symbols, callback, throttle_ms=0, coalesce=True, max_pending=1000):
+        """
+        Push changed ticks for `symbols` to `callback(batch)`, where batch is a
+        tuple of (symbol, time, bid, ask, last, volume, time_msc, flags).
+        coalesce=True sends only the latest tick per symbol; False sends every
+        tick (via copy_ticks_from), keeping up to `max_pending` per symbol.
+        `throttle_ms` is the minimum gap between pushes. Returns a handle with
+        close() and stats().
+        """
+        sub = streamer.subscribe(
+            obtain(symbols), callback,
+            throttle_ms=float(throttle_ms), coalesce=bool(coalesce), max_pending=int(max_pending)
+        )
+        self._subscriptions.append(sub)
+        return sub
+    
+    def exposed_history_deals_columns(self, from_ts, to_ts, fields=None):
+        """History deals in [from_ts, to_ts] as packed columns (see to_columns)."""
+        fields = tuple(obtain(fields)) if fields else None
+        deals = mt5.history_deals_get(int(from_ts), int(to_ts))
+        return to_columns(deals, DEAL_COLUMNS, fields)
+    
+    def exposed_history_orders_columns(self, from_ts, to_ts, fields=None):
+        """History orders in [from_ts, to_ts] as packed columns (see to_columns)."""
+        fields = tuple(obtain(fields)) if fields else None
+        orders = mt5.history_orders_get(int(from_ts), int(to_ts))
+        return to_columns(orders, ORDER_COLUMNS, fields)
+    
+    def exposed_rates_from_pos(self, symbol, timeframe, start_pos, count):
+        """copy_rates_from_pos as an array payload (see array_payload)."""
+        return array_payload(mt5.copy_rates_from_pos(str(symbol), int(timeframe), int(start_pos), int(count)))
+    
+    def exposed_rates_range(self, symbol, timeframe, from_ts, to_ts):
+        """copy_rates_range as an array payload; bars opening in [from_ts, to_ts]."""
+        return array_payload(mt5.copy_rates_range(str(symbol), int(timeframe), int(from_ts), int(to_ts)))
+    
+    def exposed_copy_ticks_range(self, symbol, from_ts, to_ts, flags=mt5.COPY_TICKS_ALL, chunk_bytes=EXPORT_CHUNK_BYTES):
+        """
+        Tick history in [from_ts, to_ts] (unix seconds) for bulk export. Returns
+        (dtype_descr_json, count, chunk_rows, chunks, export), where
+        export.read(i) gives chunk i as raw bytes (see ArrayExport), or None if
+        the terminal returned nothing (see last_error).
+        """
+        ticks = mt5.copy_ticks_range(str(symbol), int(from_ts), int(to_ts), int(flags))
+        if ticks is None:
+            return None
+        return ArrayExport(ticks, chunk_bytes).header()
+    
+    def exposed_open_cursor(self, kind, args, chunk=5000):
+        """
+        Run a history query once and return (cursor_id, total, chunks) for
+        chunked reads with cursor_fetch (see mt5_cursors). `args` is a dict or
+        JSON string:
+            deals / orders: {"from_ts", "to_ts", "fields"} -> to_columns chunks
+            rates:          {"symbol", "timeframe", "from_ts", "to_ts"} -> array payload chunks
+        """
+        args = json.loads(args) if isinstance(args, str) else obtain(args)
+        if kind in ('deals', 'orders'):
+            get, schema = ((mt5.history_deals_get, DEAL_COLUMNS) if kind == 'deals'
+                           else (mt5.history_orders_get, ORDER_COLUMNS))
+            fields = tuple(args.get('fields') or ()) or None
+            to_columns((), schema, fields)   # reject unknown fields before querying
+            records = get(int(args['from_ts']), int(args['to_ts']))
+            return cursors.open(records, lambda part: to_columns(part, schema, fields), chunk)
+        if kind == 'rates':
+            rates = mt5.copy_rates_range(str(args['symbol']), int(args['timeframe']),
+                                         int(args['from_ts']), int(args['to_ts']))
+            return cursors.open(rates, array_payload, chunk)
+        raise ValueError(f"Unknown cursor kind {kind!r}")
+    
+    def exposed_cursor_fetch(self, cursor_id, index):
+        """Chunk `index` of an open cursor, or None if it expired (reopen and resume)."""
+        return cursors.fetch(str(cursor_id), int(index))
+    
+    def exposed_close_cursor(self, cursor_id):
+        return cursors.close(str(cursor_id))
+    
+    def exposed_indicator(self, symbol, timeframe, name, params=None):
+        """
+        One indicator from the server's incremental engine (see mt5_indicators).
+        `params` is a dict or JSON string, e.g. {"length": 14}. Returns a JSON
+        string: {"value", "closed", "time", "closed_time"} or {"error"}.
+        """
+        params = json.loads(params) if isinstance(params, str) else obtain(params)
+        return by_value(indicators.query(str(symbol), obtain(timeframe), str(name), params))
+    
+    def exposed_indicators(self, queries):
+        """
+        Batch of indicator queries in one round trip: a list (or JSON string)
+        of {"symbol", "timeframe", "indicator", "params"}. Each series is
+        refreshed once per batch. Returns a JSON list of results in order.
+        """
+        queries = json.loads(queries) if isinstance(queries, str) else obtain(queries)
+        return by_value(indicators.query_many([
+            (q.get('symbol'), q.get('timeframe', 'H1'), q.get('indicator'), q.get('params'))
+            for q in queries
+        ]))
+    
+    def exposed_indicator_stats(self):
+        """Series/indicator counts and bars pulled by the indicator engine (JSON string)."""
+        return by_value(indicators.stats())
     
-    def exposed_order_send(self, request):
+    def exposed_order_send(self, request, request_id=None):
         """KEY FIX: Unbox Netref locally, enforce native types, return as dict"""
-        print(f"[SERVER] order_send received proxy: {request}")
+        timing = {'server_recv': time.perf_counter_ns()}
+        rid = str(request_id) if request_id else new_request_id()
+        # `request` is a netref: never format or log it, its repr is a call back to the client
         
         # 1. MT5 C-API requires a PURE dictionary, not an RPyC Netref string/dict representation
         # 2. MT5 C-API requires native Python types (int, float, str), NOT numpy.float64 or numpy.int64
         # We manually build a pure local dictionary out of the RPyC Netref object
-        
-        FLOAT_FIELDS = ['volume', 'price', 'stoplimit', 'sl', 'tp', 'deviation']
-        INT_FIELDS = ['action', 'magic', 'order', 'type', 'type_time', 'type_filling', 'position', 'position_by', 'expiration']
-        STRING_FIELDS = ['symbol', 'comment']
-        
-        native_request = {}
         try:
             # Safely iterate through the RPyC Netref Dictionary
             keys = list(request.keys())
-            for k in keys:
-                v = request[k]
-                if v is None:
-                    continue
-                # Cast to strictly native python primitive types to satisfy MT5 python module
-                if k in FLOAT_FIELDS:
-                    native_request[k] = float(v)
-                elif k in INT_FIELDS:
-                    native_request[k] = int(v)
-                elif k in STRING_FIELDS:
-                    native_request[k] = str(v)
-                else:
-                    native_request[k] = v
+            native_request = to_native({k: request[k] for k in keys})
         except Exception as e:
-            return {
-                'success': False,
-                'retcode': -1,
-                'comment': f'Failed to unbox Netref dict. Error: {str(e)}',
-                'order': 0, 'volume': 0, 'price': 0
-            }
-            
-        print(f"[SERVER] Extracted Native dict: {native_request}")
+            mark_failed()
+            logger.error('order_unbox_failed', rid=rid, error=str(e))
+            return dict(failed_result(f'Failed to unbox Netref dict. Error: {str(e)}'), request_id=rid)
         
-        result = mt5.order_send(native_request)
-        print(f"[SERVER] Native MT5 result: {result}")
-        
-        if result is None:
-            error = mt5.last_error()
-            return {
-                'success': False,
-                'retcode': -1,
-                'comment': f'MT5 returned None (Invalid Params). Error: {error}',
-                'order': 0,
-                'volume': 0,
-                'price': 0
-            }
-        
-        return {
-            'success': result.retcode == 10009,
-            'retcode': result.retcode,
-            'comment': result.comment or '',
-            'order': result.order or 0,
-            'volume': result.volume or 0,
-            'price': result.price or 0
-        }
-    def exposed_order_send_json(self, request_json):
+        return send_order(native_request, rid, 'order_send', timing)
+    
+    def exposed_order_send_json(self, request_json, request_id=None):
         """Accept JSON string, convert to native dict, execute order"""
-        import json
-        
-        print(f"[SERVER] order_send_json received")
-        
+        timing = {'server_recv': time.perf_counter_ns()}
+        rid = str(request_id) if request_id else new_request_id()
         try:
             # Parse JSON to native Python dict
             request = json.loads(request_json)
-            print(f"[SERVER] Parsed request: {request}")
         except Exception as e:
-            return {
-                'success': False,
-                'retcode': -1,
-                'comment': f'JSON parse error: {str(e)}',
-                'order': 0, 'volume': 0, 'price': 0
-            }
+            mark_failed()
+            logger.error('order_json_invalid', rid=rid, error=str(e))
+            return dict(failed_result(f'JSON parse error: {str(e)}'), request_id=rid)
         
         # Build native request with proper types
-        FLOAT_FIELDS = ['volume', 'price', 'stoplimit', 'sl', 'tp', 'deviation']
-        INT_FIELDS = ['action', 'magic', 'order', 'type', 'type_time', 'type_filling', 'position', 'position_by', 'expiration']
-        STRING_FIELDS = ['symbol', 'comment']
+        try:
+            native_request = to_native(request)
+        except (AttributeError, TypeError, ValueError) as e:
+            mark_failed()
+            return dict(failed_result(f'Invalid request: {e}'), request_id=rid)
+        return send_order(native_request, rid, 'order_send_json', timing)
+    
+    def exposed_order_send_traced(self, request_json, request_id=None):
+        """
+        Like order_send_json, for clients that trace latency: takes the client's
+        request ID and returns the result as a JSON string, so `timing` arrives
+        with the call instead of as a netref (see mt5_execution.py).
+        """
+        timing = {'server_recv': time.perf_counter_ns()}
+        rid = str(request_id) if request_id else new_request_id()
+        try:
+            request = json.loads(request_json)
+        except Exception as e:
+            mark_failed()
+            logger.error('order_json_invalid', rid=rid, error=str(e))
+            return by_value(dict(failed_result(f'JSON parse error: {str(e)}'), request_id=rid))
+        try:
+            native_request = to_native(request)
+        except (AttributeError, TypeError, ValueError) as e:
+            mark_failed()
+            return by_value(dict(failed_result(f'Invalid request: {e}'), request_id=rid))
+        return by_value(send_order(native_request, rid, 'order_send_traced', timing))
+    
+    def exposed_execution_stats(self, symbol=None):
+        """Per-symbol fill rate, slippage vs requested price and stage latencies (JSON string)."""
+        return by_value(execution.summary(symbol))
+    
+    def exposed_order_send_many(self, requests, all_or_nothing=False):
+        """
+        Send many orders in one round trip. `requests` is a list of request
+        dicts (or a JSON string of one). Every request is validated and
+        normalised first; DEAL requests without a price get the current
+        ask/bid, with one tick fetched per symbol. Valid requests then run
+        back to back under the trade lock. With all_or_nothing=True nothing
+        is sent if any request is invalid.
+        Returns a JSON string: {'results': [...], 'sent', 'succeeded',
+        'failed', 'total_ms'}, where each result has 'index' and 'elapsed_ms'.
+        """
+        batch_start = time.perf_counter()
+        timing = {'server_recv': time.perf_counter_ns()}
+        requests = json.loads(requests) if isinstance(requests, str) else obtain(requests)
         
-        native_request = {}
-        for k, v in request.items():
-            if v is None:
-                continue
-            if k in FLOAT_FIELDS:
-                native_request[k] = float(v)
-            elif k in INT_FIELDS:
-                native_request[k] = int(v)
-            elif k in STRING_FIELDS:
-                native_request[k] = str(v)
-            else:
-                native_request[k] = v
+        prepared, results = self._prepare_batch(requests)
+        invalid = [r for r in results if r is not None]
+        timing['validated'] = time.perf_counter_ns()
+        for res in invalid:
+            res['timing'] = dict(timing)
         
-        print(f"[SERVER] Native dict: {native_request}")
+        if not (all_or_nothing and invalid):
+            for index, res in zip((i for i, _ in prepared), execute_batch((r for _, r in prepared), timing)):
+                results[index] = res
         
-        result = mt5.order_send(native_request)
-        print(f"[SERVER] MT5 result: {result}")
+        for index, res in enumerate(results):
+            if res is None:
+                res = results[index] = failed_result('Not sent: batch rejected (all_or_nothing)')
+            res['index'] = index
+        finish_orders(results)
+        
+        succeeded = sum(1 for r in results if r['success'])
+        return by_value({
+            'results': results,
+            'sent': len(prepared) if not (all_or_nothing and invalid) else 0,
+            'succeeded': succeeded,
+            'failed': len(results) - succeeded,
+            'total_ms': (time.perf_counter() - batch_start) * 1000
+        })
+    
+    def exposed_close_positions(self, flt=None, deviation=10, type_filling=None):
+        """
+        Close every open position matching `flt` (dict or JSON string, see
+        matches_filter; None/empty closes ALL positions). Positions are read
+        once and ticks once per symbol; each close is validated like any other
+        order (check_order picks a filling mode the symbol supports unless
+        `type_filling` is given), then they run back to back.
+        Returns a JSON report: {'matched', 'succeeded', 'failed', 'results', 'total_ms'}.
+        """
+        batch_start = time.perf_counter()
+        timing = {'server_recv': time.perf_counter_ns()}
+        flt = load_filter(flt)
+        
+        with trade_lock:
+            positions = [p for p in (mt5.positions_get() or ()) if matches_filter(p, flt)]
+            ticks = {sym: mt5.symbol_info_tick(sym) for sym in {p.symbol for p in positions}}
+            
+            requests, skipped, rejected = [], [], []
+            for p in positions:
+                tick = ticks[p.symbol]
+                if tick is None:
+                    skipped.append(p)
+                    continue
+                is_buy = p.type == mt5.POSITION_TYPE_BUY
+                request = {
+                    'action': mt5.TRADE_ACTION_DEAL,
+                    'position': int(p.ticket),
+                    'symbol': str(p.symbol),
+                    'volume': float(p.volume),
+                    'type': mt5.ORDER_TYPE_SELL if is_buy else mt5.ORDER_TYPE_BUY,
+                    'price': float(tick.bid if is_buy else tick.ask),
+                    'deviation': int(deviation),
+                    'magic': int(p.magic),
+                    'comment': 'Bulk Close',
+                    'type_time': mt5.ORDER_TIME_GTC,
+                }
+                if type_filling is not None:
+                    request['type_filling'] = int(type_filling)
+                try:
+                    check_order(request)
+                except Rejected as e:
+                    rejected.append((request, describe_order(dict(rejected_result(e), timing=dict(timing)), request)))
+                    continue
+                requests.append(request)
+            timing['validated'] = time.perf_counter_ns()
+            sent = list(zip(requests, execute_batch(requests, timing)))
+        
+        results = []
+        for req, res in sent + rejected:
+            res.update(ticket=req['position'], symbol=req['symbol'], requested_volume=req['volume'])
+            results.append(res)
+        for p in skipped:
+            res = failed_result(f'No tick for {p.symbol}')
+            res.update(ticket=int(p.ticket), symbol=str(p.symbol), requested_volume=float(p.volume))
+            results.append(res)
+        finish_orders(results)
+        return by_value(self._report(positions, results, batch_start))
+    
+    def exposed_cancel_orders(self, flt=None):
+        """
+        Delete every pending order matching `flt` (dict or JSON string, see
+        matches_filter; None/empty cancels ALL orders). Returns a JSON report
+        like exposed_close_positions.
+        """
+        batch_start = time.perf_counter()
+        timing = {'server_recv': time.perf_counter_ns()}
+        flt = load_filter(flt)
         
-        if result is None:
-            error = mt5.last_error()
-            return {
-                'success': False,
-                'retcode': -1,
-                'comment': f'MT5 returned None. Error: {error}',
-                'order': 0, 'volume': 0, 'price': 0
-            }
+        with trade_lock:
+            orders = [o for o in (mt5.orders_get() or ()) if matches_filter(o, flt)]
+            requests = [{'action': mt5.TRADE_ACTION_REMOVE, 'order': int(o.ticket)} for o in orders]
+            timing['validated'] = time.perf_counter_ns()
+            results = execute_batch(requests, timing)
         
+        for o, res in zip(orders, results):
+            res.update(ticket=int(o.ticket), symbol=str(o.symbol))
+        finish_orders(results)
+        return by_value(self._report(orders, results, batch_start))
+    
+    def _report(self, matched, results, batch_start):
+        succeeded = sum(1 for r in results if r['success'])
         return {
-            'success': result.retcode == 10009,
-            'retcode': result.retcode,
-            'comment': result.comment or '',
-            'order': result.order or 0,
-            'volume': result.volume or 0,
-            'price': result.price or 0
+            'matched': len(matched),
+            'succeeded': succeeded,
+            'failed': len(results) - succeeded,
+            'results': results,
+            'total_ms': (time.perf_counter() - batch_start) * 1000
         }
     
+    def _prepare_batch(self, requests):
+        """Validate/normalise requests. Returns ([(index, native_request)], results with errors filled in)."""
+        prepared = []
+        results = [None] * len(requests)
+        ticks = {}
+        for index, request in enumerate(requests):
+            try:
+                native_request = to_native(dict(request))
+            except (AttributeError, TypeError, ValueError) as e:
+                results[index] = failed_result(f'Invalid request: {e}')
+                continue
+            
+            # Unknown actions and missing fields are rejected by check_order below
+            if (native_request.get('action') == mt5.TRADE_ACTION_DEAL and not native_request.get('price')
+                    and 'symbol' in native_request and 'type' in native_request):
+                symbol = native_request['symbol']
+                if symbol not in ticks:
+                    ticks[symbol] = cached_tick(symbol)
+                tick = ticks[symbol]
+                if tick is None:
+                    results[index] = failed_result(f'Invalid request: no tick for {symbol}')
+                    continue
+                is_buy = native_request['type'] == mt5.ORDER_TYPE_BUY
+                native_request['price'] = float(tick.ask if is_buy else tick.bid)
+            
+            try:
+                check_order(native_request)
+            except Rejected as e:
+                results[index] = describe_order(rejected_result(e), native_request)
+                continue
+            
+            prepared.append((index, native_request))
+        return prepared, results
+    
     def exposed_order_delete(self, ticket):
         request = {
             'action': mt5.TRADE_ACTION_REMOVE,
@@ -231,32 +895,100 @@ class MT5Service(rpyc.Service):
             'deviation': 10,
             'comment': 'Adam Smith Close',
             'type_time': mt5.ORDER_TIME_GTC,
-            'type_filling': mt5.ORDER_FILLING_IOC
         }
+        # Filling is left to check_order, which picks one the symbol supports
         return self.exposed_order_send(request)
 
+def send_checked(request):
+    """One order for the wire server: validate, then send like a batch of one."""
+    timing = {'server_recv': time.perf_counter_ns()}
+    native_request = to_native(request)
+    try:
+        check_order(native_request)
+    except Rejected as e:
+        timing['validated'] = time.perf_counter_ns()
+        reply = dict(rejected_result(e), timing=timing)
+        return finish_orders([describe_order(reply, native_request)])[0]
+    timing['validated'] = time.perf_counter_ns()
+    return finish_orders(execute_batch([native_request], timing))[0]
+
+def start_wire_server(port):
+    """Serve the binary protocol (openclaw_skill/mt5_wire.py) on a second port, sharing cache and trade lock."""
+    from mt5_wire_server import WireServer
+    wire = WireServer(
+        port,
+        get_tick=cached_tick,
+        get_positions=cached_positions,
+        send_order=send_checked
+    )
+    threading.Thread(target=wire.serve_forever, daemon=True, name="wire-server").start()
+    return wire
+
+def start_metrics_server(port):
+    """Serve /metrics, including executor and cache gauges."""
+    metrics.gauge('executor_queue_depth', 'Terminal calls waiting for the owner thread.', executor.queue_depth)
+    metrics.gauge('executor_calls_total', 'Terminal calls made by the owner thread.', lambda: executor.calls_total)
+    metrics.gauge('executor_calls_deduplicated', 'Queued reads answered by an identical call.',
+                  lambda: executor.calls_deduplicated)
+    metrics.gauge('cache_hits', 'TTL cache hits per kind.',
+                  lambda: {kind: counts.get('hits', 0) for kind, counts in cache.stats().items()})
+    metrics.gauge('cache_misses', 'TTL cache misses per kind.',
+                  lambda: {kind: counts.get('misses', 0) for kind, counts in cache.stats().items()})
+    metrics.gauge('cursors', 'Open, opened and expired history cursors.', cursors.stats)
+    metrics.gauge('log', 'Background logger queue depth, dropped and sampled-out entries.', logger.stats)
+    metrics.gauge('execution_orders', 'Orders executed per symbol.', lambda: execution.field('orders'))
+    metrics.gauge('execution_rejected', 'Rejected orders per symbol (broker and local).',
+                  lambda: execution.field('rejected'))
+    metrics.gauge('execution_slippage_points', 'Mean fill vs requested price per symbol, in points (positive is adverse).',
+                  execution.mean_slippage)
+    metrics.gauge('session', 'Terminal readiness (1/0), connected clients, reconnects and failures.',
+                  lambda: {'ready': int(session.ready), 'clients': session.clients,
+                           'reconnects': session.reconnects, 'failures': session.failures})
+    return start_http_server(port)
+
 def main():
     print("=" * 50)
     print("  MT5 RPyC Server (FIXED WITH NATIVE TYPES)")
     print("=" * 50)
     
-    if not mt5.initialize():
-        print(f"❌ MT5 init failed: {mt5.last_error()}")
-        return
+    if not session.start():
+        # Serve anyway: the session keeps retrying and clients see the state
+        print(f"❌ MT5 not ready ({session.state}): {session.last_error}; retrying in the background")
     
-    account = mt5.account_info()
+    account = mt5.account_info() if session.status()['connected'] else None
     if account:
         print(f"✅ MT5: {account.login} @ {account.server}")
         print(f"   Balance: ${account.balance:.2f} | Equity: ${account.equity:.2f}")
     
-    print(f"\n🚀 Server on port 18812...\n")
+    # One server per terminal: run several on different MT5_BRIDGE_PORTs to shard
+    # accounts (openclaw_skill/mt5_router.py routes between them)
+    port = int(os.environ.get('MT5_BRIDGE_PORT', 18812))
+    print(f"\n🚀 Server on port {port}...")
+    
+    # Prometheus-style metrics on localhost; MT5_METRICS_PORT=0 disables them
+    metrics_port = int(os.environ.get('MT5_METRICS_PORT', 18814))
+    if metrics_port:
+        start_metrics_server(metrics_port)
+        print(f"📈 Metrics on http://127.0.0.1:{metrics_port}/metrics")
+    
+    # Binary protocol for hot paths; MT5_WIRE_PORT=0 disables it
+    wire_port = int(os.environ.get('MT5_WIRE_PORT', 18813))
+    if wire_port:
+        start_wire_server(wire_port)
+        print(f"⚡ Binary wire protocol on port {wire_port}")
+    print()
     
     server = ThreadedServer(
         MT5Service,
-        port=18812,
+        port=port,
         protocol_config={'allow_pickle': True, 'allow_public_attrs': True}
     )
-    server.start()
+    try:
+        server.start()
+    finally:
+        session.stop()
+        executor.stop()
+        logger.close()
 
 if __name__ == "__main__":
     main()
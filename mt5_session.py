@@ -0,0 +1,196 @@
+"""
+Terminal session manager for the MT5 RPyC bridge.
+
+The terminal link is owned by the server process, not by its clients:
+start() initialises it once, a monitor thread checks it every
+`check_interval` seconds with terminal_info() (a local IPC call, no broker
+round trip), and a lost link is re-initialised in the background with
+exponential backoff. Client connections are reference-counted (acquire /
+release) for reporting and so stop() can let them drain before the final
+shutdown(); a connect or disconnect never touches the terminal itself.
+
+status() is the one-call readiness check clients use instead of
+initialize(): {"state", "ready", "connected", "login", "server", ...}.
+States:
+    starting      first initialize() not done yet
+    ready         terminal link up and connected to the trade server
+    disconnected  terminal link up, trade server connection lost (the
+                  terminal reconnects to the broker by itself)
+    reconnecting  terminal link lost; re-initialising with backoff
+    stopped       stop() was called
+
+SharedTerminal is what clients receive instead of the raw module: the same
+functions, but initialize() only waits for readiness and shutdown() is a
+no-op, so a client can no longer tear the terminal down for everyone else.
+"""
+import threading
+import time
+
+STARTING = 'starting'
+READY = 'ready'
+DISCONNECTED = 'disconnected'
+RECONNECTING = 'reconnecting'
+STOPPED = 'stopped'
+
+
+class TerminalSession:
+    def __init__(self, terminal, path=None, check_interval=2.0, max_backoff=30.0, on_change=None):
+        """
+        terminal:  the MetaTrader5 module (or the executor's proxy for it)
+        path:      terminal executable, when several are installed
+        on_change: on_change(state, status) after every state transition
+        """
+        self.terminal = terminal
+        self.path = path
+        self.check_interval = check_interval
+        self.max_backoff = max_backoff
+        self.on_change = on_change
+        self.state = STARTING
+        self.clients = 0
+        self.reconnects = 0
+        self.failures = 0
+        self.login = None
+        self.server = None
+        self.last_error = None
+        self.last_check = None
+        self.check_ms = None
+        self.since = time.time()
+        self._lock = threading.Lock()
+        self._linked = threading.Event()
+        self._stop = threading.Event()
+        self._drained = threading.Condition(self._lock)
+        self._thread = None
+
+    def _initialize(self):
+        ok = self.terminal.initialize(self.path) if self.path else self.terminal.initialize()
+        if not ok:
+            self.last_error = str(self.terminal.last_error())
+            return False
+        self.last_error = None
+        account = self.terminal.account_info()
+        if account is not None:
+            self.login, self.server = int(account.login), str(account.server)
+        return True
+
+    def _set_state(self, state):
+        with self._lock:
+            if state == self.state or self.state == STOPPED:
+                return
+            self.state = state
+            self.since = time.time()
+        if state in (READY, DISCONNECTED):
+            self._linked.set()
+        else:
+            self._linked.clear()
+        if self.on_change is not None:
+            self.on_change(state, self.status())
+
+    def _check(self):
+        """One liveness probe; returns the state it implies."""
+        t0 = time.perf_counter()
+        info = self.terminal.terminal_info()
+        self.check_ms = (time.perf_counter() - t0) * 1000
+        self.last_check = time.time()
+        if info is None:
+            self.last_error = str(self.terminal.last_error())
+            return RECONNECTING
+        return READY if info.connected else DISCONNECTED
+
+    def start(self):
+        """Initialise the terminal and start the monitor. Returns True if ready."""
+        if self._initialize():
+            self._set_state(self._check())
+        else:
+            self.failures += 1
+            self._set_state(RECONNECTING)
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._monitor, daemon=True, name="mt5-session")
+            self._thread.start()
+        return self.ready
+
+    def _monitor(self):
+        backoff = self.check_interval
+        while not self._stop.wait(backoff if self.state == RECONNECTING else self.check_interval):
+            try:
+                if self.state == RECONNECTING:
+                    self.terminal.shutdown()
+                    if not self._initialize():
+                        self.failures += 1
+                        backoff = min(self.max_backoff, backoff * 2)
+                        continue
+                    self.reconnects += 1
+                    backoff = self.check_interval
+                self._set_state(self._check())
+            except Exception as e:
+                self.last_error = str(e)
+                self.failures += 1
+                self._set_state(RECONNECTING)
+
+    @property
+    def ready(self):
+        return self.state == READY
+
+    def wait_connected(self, timeout=None):
+        """Wait until the terminal link is up (ready, or waiting on the broker)."""
+        return self._linked.wait(timeout)
+
+    def acquire(self):
+        """A client connected."""
+        with self._lock:
+            self.clients += 1
+
+    def release(self):
+        """A client disconnected; the terminal stays up for everyone else."""
+        with self._lock:
+            self.clients = max(0, self.clients - 1)
+            self._drained.notify_all()
+
+    def status(self):
+        with self._lock:
+            return {
+                'state': self.state,
+                'ready': self.state == READY,
+                'connected': self.state in (READY, DISCONNECTED),
+                'login': self.login,
+                'server': self.server,
+                'since': self.since,
+                'clients': self.clients,
+                'reconnects': self.reconnects,
+                'failures': self.failures,
+                'last_check': self.last_check,
+                'check_ms': self.check_ms,
+                'last_error': self.last_error,
+            }
+
+    def stop(self, drain_timeout=2.0):
+        """Stop monitoring, give connected clients `drain_timeout` seconds, shut the terminal down."""
+        self._stop.set()
+        deadline = time.monotonic() + drain_timeout
+        with self._lock:
+            while self.clients and time.monotonic() < deadline:
+                self._drained.wait(max(0.0, deadline - time.monotonic()))
+        self._set_state(STOPPED)
+        self.terminal.shutdown()
+
+
+class SharedTerminal:
+    """The terminal as handed to clients: lifecycle calls defer to the session."""
+
+    def __init__(self, terminal, session, wait_timeout=10.0):
+        self._terminal = terminal
+        self._session = session
+        self._wait_timeout = wait_timeout
+
+    def __getattr__(self, name):
+        return getattr(self._terminal, name)
+
+    def initialize(self, *args, **kwargs):
+        """Already initialised by the server; just wait (briefly) for the link."""
+        return self._session.wait_connected(self._wait_timeout)
+
+    def login(self, login, *args, **kwargs):
+        # Switching accounts would switch them for every client: run one server per account
+        return self._session.wait_connected(self._wait_timeout) and int(login) == self._session.login
+
+    def shutdown(self):
+        return True
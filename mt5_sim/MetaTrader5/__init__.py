@@ -0,0 +1,426 @@
+"""
+Deterministic stand-in for the MetaTrader5 Python package.
+
+Lets mt5_server_fixed.py (and anything else that does `import MetaTrader5`)
+run on Linux/CI without a terminal:
+
+    PYTHONPATH=mt5_sim python mt5_server_fixed.py
+
+Same function names, constants, namedtuple field names, numpy dtypes,
+last_error() semantics and order_send retcodes as the real module. Prices
+come from a seeded model (see _market.py), so a given seed and time range
+always produce the same ticks and bars. Environment variables:
+
+    MT5_SIM_SEED             price/slippage seed (default 0)
+    MT5_SIM_FILL_LATENCY_MS  delay inside order_send (default 0)
+    MT5_SIM_SLIPPAGE_POINTS  max adverse slippage per fill (default 0)
+    MT5_SIM_RETCODE          force every order_send to return this retcode
+    MT5_SIM_REJECT_RATE      fraction of orders rejected (default 0)
+    MT5_SIM_START            simulated start time, epoch seconds (default now)
+    MT5_SIM_SPEED            simulated seconds per wall-clock second (default 1)
+    MT5_SIM_CLOCK=manual     freeze time; move it with sim.market.clock.advance()
+    MT5_SIM_LOGIN            account number (default 10000001), to tell
+                             several simulated terminals apart
+
+The same knobs can be changed at runtime with sim.configure(...).
+"""
+import os
+from collections import namedtuple
+
+import numpy as np
+
+from ._constants import *
+from . import _constants as c
+from ._market import RATES_DTYPE, SimClock, to_seconds
+from ._terminal import SimTerminal, timeframe_seconds
+
+__version__ = "5.0.4424"
+__author__ = "OpenClaw simulator"
+
+AccountInfo = namedtuple("AccountInfo", [
+    "login", "trade_mode", "leverage", "limit_orders", "margin_so_mode", "trade_allowed",
+    "trade_expert", "margin_mode", "currency_digits", "fifo_close", "balance", "credit",
+    "profit", "equity", "margin", "margin_free", "margin_level", "margin_so_call",
+    "margin_so_so", "margin_initial", "margin_maintenance", "assets", "liabilities",
+    "commission_blocked", "name", "server", "currency", "company"])
+
+TerminalInfo = namedtuple("TerminalInfo", [
+    "community_account", "community_connection", "connected", "dlls_allowed", "trade_allowed",
+    "tradeapi_disabled", "email_enabled", "ftp_enabled", "notifications_enabled", "mqid",
+    "build", "maxbars", "codepage", "ping_last", "community_balance", "retransmission",
+    "company", "name", "language", "path", "data_path", "commondata_path"])
+
+SymbolInfo = namedtuple("SymbolInfo", [
+    "custom", "chart_mode", "select", "visible", "session_deals", "session_buy_orders",
+    "session_sell_orders", "volume", "volumehigh", "volumelow", "time", "digits", "spread",
+    "spread_float", "ticks_bookdepth", "trade_calc_mode", "trade_mode", "start_time",
+    "expiration_time", "trade_stops_level", "trade_freeze_level", "trade_exemode",
+    "swap_mode", "swap_rollover3days", "margin_hedged_use_leg", "expiration_mode",
+    "filling_mode", "order_mode", "order_gtc_mode", "option_mode", "option_right",
+    "bid", "bidhigh", "bidlow", "ask", "askhigh", "asklow", "last", "lasthigh", "lastlow",
+    "volume_real", "volumehigh_real", "volumelow_real", "option_strike", "point",
+    "trade_tick_value", "trade_tick_value_profit", "trade_tick_value_loss", "trade_tick_size",
+    "trade_contract_size", "trade_accrued_interest", "trade_face_value", "trade_liquidity_rate",
+    "volume_min", "volume_max", "volume_step", "volume_limit", "swap_long", "swap_short",
+    "margin_initial", "margin_maintenance", "session_volume", "session_turnover",
+    "session_interest", "session_buy_orders_volume", "session_sell_orders_volume",
+    "session_open", "session_close", "session_aw", "session_price_settlement",
+    "session_price_limit_min", "session_price_limit_max", "margin_hedged", "price_change",
+    "price_volatility", "price_theoretical", "price_greeks_delta", "price_greeks_theta",
+    "price_greeks_gamma", "price_greeks_vega", "price_greeks_rho", "price_greeks_omega",
+    "price_sensitivity", "basis", "category", "currency_base", "currency_profit",
+    "currency_margin", "bank", "description", "exchange", "formula", "isin", "name", "page",
+    "path"])
+
+Tick = namedtuple("Tick", ["time", "bid", "ask", "last", "volume", "time_msc", "flags", "volume_real"])
+
+TradePosition = namedtuple("TradePosition", [
+    "ticket", "time", "time_msc", "time_update", "time_update_msc", "type", "magic",
+    "identifier", "reason", "volume", "price_open", "sl", "tp", "price_current", "swap",
+    "profit", "symbol", "comment", "external_id"])
+
+TradeOrder = namedtuple("TradeOrder", [
+    "ticket", "time_setup", "time_setup_msc", "time_done", "time_done_msc", "time_expiration",
+    "type", "type_time", "type_filling", "state", "magic", "position_id", "position_by_id",
+    "reason", "volume_initial", "volume_current", "price_open", "sl", "tp", "price_current",
+    "price_stoplimit", "symbol", "comment", "external_id"])
+
+TradeDeal = namedtuple("TradeDeal", [
+    "ticket", "order", "time", "time_msc", "type", "entry", "magic", "position_id", "reason",
+    "volume", "price", "commission", "swap", "profit", "fee", "symbol", "comment", "external_id"])
+
+TradeRequest = namedtuple("TradeRequest", [
+    "action", "magic", "order", "symbol", "volume", "price", "stoplimit", "sl", "tp",
+    "deviation", "type", "type_filling", "type_time", "expiration", "comment", "position",
+    "position_by"])
+
+OrderSendResult = namedtuple("OrderSendResult", [
+    "retcode", "deal", "order", "volume", "price", "bid", "ask", "comment", "request_id",
+    "retcode_external", "request"])
+
+OrderCheckResult = namedtuple("OrderCheckResult", [
+    "retcode", "balance", "equity", "profit", "margin", "margin_free", "margin_level",
+    "comment", "request"])
+
+
+def _env_float(name, default):
+    value = os.environ.get(name)
+    return float(value) if value not in (None, "") else default
+
+def _make_terminal():
+    clock = SimClock(start=_env_float("MT5_SIM_START", None),
+                     speed=_env_float("MT5_SIM_SPEED", 1.0),
+                     manual=os.environ.get("MT5_SIM_CLOCK") == "manual")
+    retcode = os.environ.get("MT5_SIM_RETCODE")
+    return SimTerminal(seed=int(_env_float("MT5_SIM_SEED", 0)), clock=clock,
+                       fill_latency_ms=_env_float("MT5_SIM_FILL_LATENCY_MS", 0.0),
+                       slippage_points=int(_env_float("MT5_SIM_SLIPPAGE_POINTS", 0)),
+                       force_retcode=int(retcode) if retcode else None,
+                       reject_rate=_env_float("MT5_SIM_REJECT_RATE", 0.0),
+                       login=int(_env_float("MT5_SIM_LOGIN", 10000001)))
+
+sim = _make_terminal()
+
+
+def _call(fn):
+    """Run fn under the terminal lock once the terminal is initialized; None otherwise."""
+    with sim.lock:
+        if not sim.require_init():
+            return None
+        return fn()
+
+def _invalid(message="Invalid arguments"):
+    return sim.fail(c.RES_E_INVALID_PARAMS, message)
+
+def _not_found(symbol):
+    return sim.fail(c.RES_E_NOT_FOUND, f"Terminal: Symbol {symbol!r} not found")
+
+def _filter_group(items, group):
+    """Subset of MT5 group syntax: comma-separated masks with '*' and '!' exclusions."""
+    if not group:
+        return items
+    from fnmatch import fnmatchcase
+    masks = [m.strip() for m in group.split(",") if m.strip()]
+    def keep(name):
+        result = False
+        for mask in masks:
+            if mask.startswith("!"):
+                if fnmatchcase(name, mask[1:]):
+                    return False
+            elif fnmatchcase(name, mask):
+                result = True
+        return result
+    return [item for item in items if keep(item["symbol"] if "symbol" in item else item["name"])]
+
+
+# --- Session ---
+
+def initialize(path=None, login=None, password=None, server=None, timeout=None, portable=False):
+    with sim.lock:
+        if login is not None and int(login) != sim.account["login"]:
+            sim.fail(c.RES_E_AUTH_FAILED, "Authorization failed")
+            return False
+        sim.initialized = True
+        sim.ok()
+        return True
+
+def login(login, password=None, server=None, timeout=None):
+    return initialize(login=login)
+
+def shutdown():
+    with sim.lock:
+        sim.initialized = False
+    return True
+
+def last_error():
+    return sim.error
+
+def version():
+    if not sim.initialized:
+        sim.fail(-10004, "No IPC connection")
+        return None
+    return (500, 4424, "01 Jan 2024")
+
+def terminal_info():
+    return _call(lambda: TerminalInfo(
+        False, False, True, False, True, False, False, False, False, 0, 4424, 100000, 0, 0, 0.0,
+        0.0, sim.account["company"], "MetaTrader 5 (simulator)", "English", os.getcwd(),
+        os.getcwd(), os.getcwd()))
+
+def account_info():
+    def build():
+        a = sim.account_state()
+        return AccountInfo(
+            a["login"], c.ACCOUNT_TRADE_MODE_DEMO, a["leverage"], 200, 0, True, True,
+            c.ACCOUNT_MARGIN_MODE_RETAIL_HEDGING, 2, False, a["balance"], 0.0, a["profit"],
+            a["equity"], a["margin"], a["margin_free"], a["margin_level"], 100.0, 50.0, 0.0, 0.0,
+            0.0, 0.0, 0.0, a["name"], a["server"], a["currency"], a["company"])
+    return _call(build)
+
+
+# --- Symbols / market data ---
+
+def _spec_or_fail(symbol):
+    spec = sim.spec(symbol)
+    if spec is None:
+        _not_found(symbol)
+    return spec
+
+def _symbol_info(spec):
+    bid, ask, t_msc = sim.quote(spec)
+    tick_value = spec["contract_size"] * spec["point"]
+    if spec["currency_profit"] != sim.account["currency"] and spec["currency_base"] == sim.account["currency"]:
+        tick_value /= bid
+    values = dict.fromkeys(SymbolInfo._fields, 0)
+    values.update(
+        custom=False, select=spec["name"] in sim.selected, visible=spec["name"] in sim.selected,
+        time=t_msc // 1000, digits=spec["digits"], spread=spec["spread"], spread_float=False,
+        trade_mode=spec["trade_mode"], trade_stops_level=spec["stops_level"],
+        trade_exemode=c.SYMBOL_TRADE_EXECUTION_MARKET, filling_mode=spec["filling_mode"],
+        expiration_mode=15, order_mode=127, bid=bid, bidhigh=bid, bidlow=bid, ask=ask,
+        askhigh=ask, asklow=ask, last=0.0, lasthigh=0.0, lastlow=0.0, volume_real=0.0,
+        volumehigh_real=0.0, volumelow_real=0.0, option_strike=0.0, point=spec["point"],
+        trade_tick_value=tick_value, trade_tick_value_profit=tick_value,
+        trade_tick_value_loss=tick_value, trade_tick_size=spec["point"],
+        trade_contract_size=spec["contract_size"], volume_min=spec["volume_min"],
+        volume_max=spec["volume_max"], volume_step=spec["volume_step"], volume_limit=0.0,
+        swap_long=0.0, swap_short=0.0, margin_hedged=spec["contract_size"] / 2,
+        currency_base=spec["currency_base"], currency_profit=spec["currency_profit"],
+        currency_margin=spec["currency_base"], description=spec["description"],
+        name=spec["name"], path=f"Sim\\{spec['name']}", category="", bank="", exchange="",
+        formula="", isin="", page="", basis="")
+    return SymbolInfo(**values)
+
+def symbol_info(symbol):
+    def build():
+        spec = _spec_or_fail(symbol)
+        return None if spec is None else _symbol_info(spec)
+    return _call(build)
+
+def symbol_info_tick(symbol):
+    def build():
+        spec = _spec_or_fail(symbol)
+        if spec is None:
+            return None
+        bid, ask, t_msc = sim.quote(spec)
+        return Tick(t_msc // 1000, bid, ask, 0.0, 0, t_msc, c.TICK_FLAG_BID | c.TICK_FLAG_ASK, 0.0)
+    return _call(build)
+
+def symbol_select(symbol, enable=True):
+    def run():
+        if _spec_or_fail(symbol) is None:
+            return False
+        (sim.selected.add if enable else sim.selected.discard)(symbol)
+        return True
+    return _call(run)
+
+def symbols_total():
+    return _call(lambda: len(sim.market.symbols))
+
+def symbols_get(group=None):
+    return _call(lambda: tuple(_symbol_info(spec) for spec in
+                               _filter_group(list(sim.market.symbols.values()), group)))
+
+def copy_rates_from(symbol, timeframe, date_from, count):
+    def run():
+        spec = _spec_or_fail(symbol)
+        if spec is None or count <= 0:
+            return None if spec is None else np.zeros(0, dtype=RATES_DTYPE)
+        return sim.rates(spec, timeframe, to_seconds(date_from), int(count))
+    return _call(run)
+
+def copy_rates_from_pos(symbol, timeframe, start_pos, count):
+    def run():
+        spec = _spec_or_fail(symbol)
+        if spec is None:
+            return None
+        if start_pos < 0 or count <= 0:
+            return _invalid()
+        rates = sim.rates(spec, timeframe, sim.now(), int(start_pos) + int(count))
+        return rates[:len(rates) - int(start_pos)]
+    return _call(run)
+
+def copy_rates_range(symbol, timeframe, date_from, date_to):
+    def run():
+        spec = _spec_or_fail(symbol)
+        if spec is None:
+            return None
+        start, end = to_seconds(date_from), min(to_seconds(date_to), sim.now())
+        if end < start:
+            return np.zeros(0, dtype=RATES_DTYPE)
+        count = int((end - start) // timeframe_seconds(timeframe)) + 2
+        rates = sim.rates(spec, timeframe, end, count)
+        return rates[(rates["time"] >= start) & (rates["time"] <= end)]
+    return _call(run)
+
+def _tick_filter(ticks, flags):
+    # Simulated ticks are pure bid/ask updates, so COPY_TICKS_TRADE yields nothing
+    if flags == c.COPY_TICKS_TRADE:
+        return ticks[:0]
+    return ticks
+
+def copy_ticks_from(symbol, date_from, count, flags):
+    def run():
+        spec = _spec_or_fail(symbol)
+        if spec is None:
+            return None
+        start = int(to_seconds(date_from) * 1000)
+        return _tick_filter(sim.market.ticks(spec, start, sim.market.now_msc(), limit=int(count)), flags)
+    return _call(run)
+
+def copy_ticks_range(symbol, date_from, date_to, flags):
+    def run():
+        spec = _spec_or_fail(symbol)
+        if spec is None:
+            return None
+        return _tick_filter(sim.market.ticks(spec, int(to_seconds(date_from) * 1000),
+                                             int(to_seconds(date_to) * 1000)), flags)
+    return _call(run)
+
+
+# --- Trading state ---
+
+def _select(items, symbol=None, group=None, ticket=None, key="ticket"):
+    if ticket is not None:
+        return [item for item in items if item[key] == ticket]
+    if symbol is not None:
+        return [item for item in items if item["symbol"] == symbol]
+    return _filter_group(items, group)
+
+def positions_get(symbol=None, group=None, ticket=None):
+    return _call(lambda: tuple(TradePosition(**p) for p in
+                               _select(list(sim.positions.values()), symbol, group, ticket)))
+
+def positions_total():
+    return _call(lambda: len(sim.positions))
+
+def orders_get(symbol=None, group=None, ticket=None):
+    return _call(lambda: tuple(TradeOrder(**o) for o in
+                               _select(list(sim.orders.values()), symbol, group, ticket)))
+
+def orders_total():
+    return _call(lambda: len(sim.orders))
+
+def _history(items, time_key, date_from, date_to, group, ticket, position, key):
+    if ticket is not None:
+        return [item for item in items if item[key] == ticket]
+    if position is not None:
+        return [item for item in items if item["position_id"] == position]
+    if date_from is None or date_to is None:
+        _invalid()
+        return None
+    start, end = to_seconds(date_from), to_seconds(date_to)
+    return _filter_group([item for item in items if start <= item[time_key] <= end], group)
+
+def history_orders_get(date_from=None, date_to=None, group=None, ticket=None, position=None):
+    def run():
+        items = _history(sim.history_orders, "time_setup", date_from, date_to, group, ticket, position, "ticket")
+        return None if items is None else tuple(TradeOrder(**o) for o in items)
+    return _call(run)
+
+def history_orders_total(date_from, date_to):
+    result = history_orders_get(date_from, date_to)
+    return None if result is None else len(result)
+
+def history_deals_get(date_from=None, date_to=None, group=None, ticket=None, position=None):
+    def run():
+        items = _history(sim.history_deals, "time", date_from, date_to, group, ticket, position, "order")
+        return None if items is None else tuple(TradeDeal(**d) for d in items)
+    return _call(run)
+
+def history_deals_total(date_from, date_to):
+    result = history_deals_get(date_from, date_to)
+    return None if result is None else len(result)
+
+
+# --- Trading ---
+
+def _trade_request(request):
+    values = dict.fromkeys(TradeRequest._fields, 0)
+    values.update(symbol="", comment="")
+    values.update({k: v for k, v in request.items() if k in values})
+    return TradeRequest(**values)
+
+def order_send(request):
+    result = sim.order_send(request)
+    if result is None:
+        return None
+    retcode, deal, order, volume, price, bid, ask, comment = result
+    return OrderSendResult(retcode, deal, order, volume, price, bid, ask, comment, 0, 0,
+                           _trade_request(request))
+
+def order_check(request):
+    if not hasattr(request, "get"):
+        return _invalid()
+    def run():
+        before = sim.account_state()
+        try:
+            retcode, _, _, volume, price = sim.execute(dict(request), dry_run=True)
+            spec = sim.spec(request.get("symbol"))
+            margin = sim.margin_for(spec, volume, price) if spec and request.get("action") == c.TRADE_ACTION_DEAL else 0.0
+            retcode, comment = 0, "Done"
+        except Exception as e:
+            retcode, comment, margin = getattr(e, "retcode", c.TRADE_RETCODE_INVALID), str(e), 0.0
+        used = before["margin"] + margin
+        free = before["equity"] - used
+        return OrderCheckResult(retcode, before["balance"], before["equity"], before["profit"],
+                                round(used, 2), round(free, 2),
+                                round(before["equity"] / used * 100, 2) if used else 0.0,
+                                comment, _trade_request(request))
+    return _call(run)
+
+def order_calc_margin(action, symbol, volume, price):
+    def run():
+        spec = _spec_or_fail(symbol)
+        return None if spec is None else round(sim.margin_for(spec, float(volume), float(price)), 2)
+    return _call(run)
+
+def order_calc_profit(action, symbol, volume, price_open, price_close):
+    def run():
+        spec = _spec_or_fail(symbol)
+        if spec is None:
+            return None
+        sign = 1 if action in (c.ORDER_TYPE_BUY, c.ORDER_TYPE_BUY_LIMIT, c.ORDER_TYPE_BUY_STOP) else -1
+        raw = (float(price_close) - float(price_open)) * sign * float(volume) * spec["contract_size"]
+        return round(sim.to_account_ccy(spec, raw, float(price_close)), 2)
+    return _call(run)
@@ -0,0 +1,190 @@
+"""
+Deterministic price model for the MetaTrader5 simulator.
+
+Prices are a pure function of (seed, symbol, time): a few slow sine waves
+plus hashed per-tick noise. Ticks sit on a fixed grid (`tick_interval_ms`),
+so asking for the same time range always gives the same ticks (replayable),
+whenever and in whatever order you ask. Bars are built from the same price
+function, so bars and ticks agree. The market trades 24/7 (no sessions or
+weekend gaps).
+"""
+import math
+import time
+import zlib
+from datetime import datetime, timezone
+
+import numpy as np
+
+TICK_DTYPE = np.dtype([
+    ('time', '<i8'), ('bid', '<f8'), ('ask', '<f8'), ('last', '<f8'),
+    ('volume', '<u8'), ('time_msc', '<i8'), ('flags', '<u4'), ('volume_real', '<f8')
+])
+
+RATES_DTYPE = np.dtype([
+    ('time', '<i8'), ('open', '<f8'), ('high', '<f8'), ('low', '<f8'), ('close', '<f8'),
+    ('tick_volume', '<u8'), ('spread', '<i4'), ('real_volume', '<u8')
+])
+
+TICK_FLAG_BID = 2
+TICK_FLAG_ASK = 4
+
+# name: (base price, digits, spread points, contract size, stops level, base ccy, profit ccy, description)
+SYMBOL_TABLE = {
+    'EURUSD': (1.08500, 5, 12, 100000, 10, 'EUR', 'USD', 'Euro vs US Dollar'),
+    'GBPUSD': (1.27000, 5, 15, 100000, 10, 'GBP', 'USD', 'Great Britain Pound vs US Dollar'),
+    'AUDUSD': (0.66000, 5, 14, 100000, 10, 'AUD', 'USD', 'Australian Dollar vs US Dollar'),
+    'NZDUSD': (0.61000, 5, 18, 100000, 10, 'NZD', 'USD', 'New Zealand Dollar vs US Dollar'),
+    'USDJPY': (150.000, 3, 14, 100000, 10, 'USD', 'JPY', 'US Dollar vs Japanese Yen'),
+    'USDCHF': (0.88000, 5, 16, 100000, 10, 'USD', 'CHF', 'US Dollar vs Swiss Franc'),
+    'USDCAD': (1.36000, 5, 18, 100000, 10, 'USD', 'CAD', 'US Dollar vs Canadian Dollar'),
+    'XAUUSD': (2000.00, 2, 25, 100, 50, 'XAU', 'USD', 'Gold vs US Dollar'),
+    'BTCUSD': (60000.0, 2, 3000, 1, 100, 'BTC', 'USD', 'Bitcoin vs US Dollar'),
+}
+
+def make_spec(name, base, digits, spread, contract_size, stops_level, ccy_base, ccy_profit, description):
+    return {
+        'name': name,
+        'base': base,
+        'digits': digits,
+        'point': 10.0 ** -digits,
+        'spread': spread,
+        'contract_size': float(contract_size),
+        'stops_level': stops_level,
+        'currency_base': ccy_base,
+        'currency_profit': ccy_profit,
+        'description': description,
+        'volume_min': 0.01,
+        'volume_max': 100.0,
+        'volume_step': 0.01,
+        'filling_mode': 3,          # SYMBOL_FILLING_FOK | SYMBOL_FILLING_IOC
+        'trade_mode': 4,            # SYMBOL_TRADE_MODE_FULL
+        'hash': zlib.crc32(name.encode()),
+    }
+
+DEFAULT_SYMBOLS = {name: make_spec(name, *row) for name, row in SYMBOL_TABLE.items()}
+
+_GOLDEN = np.uint64(0x9E3779B97F4A7C15)
+_MIX1 = np.uint64(0xBF58476D1CE4E5B9)
+_MIX2 = np.uint64(0x94D049BB133111EB)
+
+def _uniform(keys):
+    """splitmix64 over uint64 keys -> floats in [-1, 1)."""
+    with np.errstate(over='ignore'):
+        z = keys * _GOLDEN
+        z = (z ^ (z >> np.uint64(30))) * _MIX1
+        z = (z ^ (z >> np.uint64(27))) * _MIX2
+        z = z ^ (z >> np.uint64(31))
+    return (z >> np.uint64(11)).astype(np.float64) / float(1 << 52) - 1.0
+
+def to_seconds(value):
+    """Accept datetime (naive = UTC, like the real terminal) or epoch seconds."""
+    if isinstance(value, datetime):
+        if value.tzinfo is None:
+            value = value.replace(tzinfo=timezone.utc)
+        return value.timestamp()
+    return float(value)
+
+
+class SimClock:
+    """
+    Simulated time. Runs at `speed` x wall clock from `start` (default: now).
+    With manual=True time only moves when advance() is called, which makes
+    whole sessions reproducible.
+    """
+
+    def __init__(self, start=None, speed=1.0, manual=False):
+        self.start = time.time() if start is None else float(start)
+        self.speed = float(speed)
+        self.manual = manual
+        self._t0 = time.monotonic()
+        self._offset = 0.0
+
+    def now(self):
+        if self.manual:
+            return self.start + self._offset
+        return self.start + self._offset + (time.monotonic() - self._t0) * self.speed
+
+    def advance(self, seconds):
+        self._offset += float(seconds)
+
+
+class Market:
+    def __init__(self, seed=0, tick_interval_ms=250, clock=None, symbols=None):
+        self.seed = int(seed)
+        self.tick_interval_ms = int(tick_interval_ms)
+        self.clock = clock or SimClock()
+        self.symbols = dict(symbols or DEFAULT_SYMBOLS)
+
+    def now_msc(self):
+        return int(self.clock.now() * 1000)
+
+    def last_tick_msc(self):
+        """Time of the most recent tick on the grid."""
+        now = self.now_msc()
+        return now - now % self.tick_interval_ms
+
+    def mid(self, spec, t_msc):
+        """Mid price for an int64 array of millisecond timestamps."""
+        t_msc = np.asarray(t_msc, dtype=np.int64)
+        t = t_msc / 1000.0
+        phase = (spec['hash'] % 1000) / 1000.0 * 2 * math.pi
+        wave = (0.0040 * np.sin(2 * math.pi * t / 86400 + phase)
+                + 0.0015 * np.sin(2 * math.pi * t / 3600 + 2 * phase)
+                + 0.0005 * np.sin(2 * math.pi * t / 300 + 3 * phase))
+        keys = (t_msc // self.tick_interval_ms).astype(np.uint64) ^ np.uint64((self.seed << 32) ^ spec['hash'])
+        noise = 0.0002 * _uniform(keys)
+        return spec['base'] * (1.0 + wave + noise)
+
+    def quotes(self, spec, t_msc):
+        """(bid, ask) arrays for the given tick times, rounded to the symbol's digits."""
+        mid = self.mid(spec, t_msc)
+        half = spec['spread'] * spec['point'] / 2
+        return np.round(mid - half, spec['digits']), np.round(mid + half, spec['digits'])
+
+    def ticks(self, spec, from_msc, to_msc, limit=None):
+        """Structured tick array for grid times in [from_msc, to_msc], oldest first."""
+        step = self.tick_interval_ms
+        first = -(-int(from_msc) // step) * step
+        last = min(int(to_msc), self.last_tick_msc())
+        if last < first:
+            return np.zeros(0, dtype=TICK_DTYPE)
+        count = (last - first) // step + 1
+        if limit is not None:
+            count = min(count, int(limit))
+        t_msc = first + np.arange(count, dtype=np.int64) * step
+        bid, ask = self.quotes(spec, t_msc)
+        out = np.zeros(count, dtype=TICK_DTYPE)
+        out['time'] = t_msc // 1000
+        out['time_msc'] = t_msc
+        out['bid'] = bid
+        out['ask'] = ask
+        out['flags'] = TICK_FLAG_BID | TICK_FLAG_ASK
+        return out
+
+    def tick_at(self, spec, t_msc):
+        bid, ask = self.quotes(spec, [t_msc])
+        return float(bid[0]), float(ask[0])
+
+    def bars(self, spec, bar_times, tf_seconds, samples=16):
+        """
+        Structured rates array for bars opening at `bar_times` (epoch seconds).
+        `tf_seconds` is the bar length, scalar or per bar (months vary).
+        The still-forming bar only uses prices up to now.
+        """
+        bar_times = np.asarray(bar_times, dtype=np.int64)
+        out = np.zeros(len(bar_times), dtype=RATES_DTYPE)
+        if not len(bar_times):
+            return out
+        lengths = np.broadcast_to(np.asarray(tf_seconds, dtype=np.int64) * 1000, bar_times.shape)
+        offsets = np.linspace(0.0, 1.0, samples, endpoint=False)
+        grid = bar_times[:, None] * 1000 + (offsets[None, :] * lengths[:, None]).astype(np.int64)
+        grid = np.minimum(grid - grid % self.tick_interval_ms, self.last_tick_msc())
+        bid = np.round(self.mid(spec, grid) - spec['spread'] * spec['point'] / 2, spec['digits'])
+        out['time'] = bar_times
+        out['open'] = bid[:, 0]
+        out['close'] = bid[:, -1]
+        out['high'] = bid.max(axis=1)
+        out['low'] = bid.min(axis=1)
+        out['tick_volume'] = lengths // self.tick_interval_ms
+        out['spread'] = spec['spread']
+        return out
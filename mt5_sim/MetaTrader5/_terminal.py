@@ -0,0 +1,500 @@
+"""
+Simulated trading terminal: one hedging demo account on top of _market.
+
+Holds positions, pending orders and deal/order history as plain dicts; the
+package __init__ turns them into the namedtuples the real module returns.
+Execution is "market" mode: the requested price/deviation are not checked,
+fills happen at the current bid/ask plus configurable adverse slippage.
+Profit is converted to the account currency only for USD-based pairs
+(e.g. USDJPY); other crosses are treated as if quoted in USD.
+"""
+import random
+import threading
+import time
+from collections.abc import Mapping
+from datetime import datetime, timezone
+
+import numpy as np
+
+from . import _constants as c
+from ._market import Market, SimClock
+
+PENDING_TYPES = (c.ORDER_TYPE_BUY_LIMIT, c.ORDER_TYPE_SELL_LIMIT, c.ORDER_TYPE_BUY_STOP,
+                 c.ORDER_TYPE_SELL_STOP, c.ORDER_TYPE_BUY_STOP_LIMIT, c.ORDER_TYPE_SELL_STOP_LIMIT)
+BUY_TYPES = (c.ORDER_TYPE_BUY, c.ORDER_TYPE_BUY_LIMIT, c.ORDER_TYPE_BUY_STOP, c.ORDER_TYPE_BUY_STOP_LIMIT)
+
+RETCODE_COMMENTS = {
+    c.TRADE_RETCODE_DONE: 'Request executed',
+    c.TRADE_RETCODE_REQUOTE: 'Requote',
+    c.TRADE_RETCODE_REJECT: 'Request rejected',
+    c.TRADE_RETCODE_INVALID: 'Invalid request',
+    c.TRADE_RETCODE_INVALID_VOLUME: 'Invalid volume',
+    c.TRADE_RETCODE_INVALID_PRICE: 'Invalid price',
+    c.TRADE_RETCODE_INVALID_STOPS: 'Invalid stops',
+    c.TRADE_RETCODE_TRADE_DISABLED: 'Trade disabled',
+    c.TRADE_RETCODE_NO_MONEY: 'No money',
+    c.TRADE_RETCODE_INVALID_EXPIRATION: 'Invalid expiration',
+    c.TRADE_RETCODE_NO_CHANGES: 'No changes',
+    c.TRADE_RETCODE_INVALID_FILL: 'Unsupported filling mode',
+    c.TRADE_RETCODE_INVALID_ORDER: 'Invalid order',
+    c.TRADE_RETCODE_POSITION_CLOSED: 'Position doesn\'t exist',
+    c.TRADE_RETCODE_INVALID_CLOSE_VOLUME: 'Invalid close volume',
+}
+
+def timeframe_seconds(timeframe):
+    """Bar length in seconds (months approximated only for alignment, see _bar_times)."""
+    if timeframe & 0xC000 == 0xC000:
+        return 30 * 86400
+    if timeframe & 0x8000:
+        return 7 * 86400 * (timeframe & 0xFF)
+    if timeframe & 0x4000:
+        return 3600 * (timeframe & 0xFF)
+    return 60 * timeframe
+
+class TradeError(Exception):
+    def __init__(self, retcode, comment=None):
+        super().__init__(comment or RETCODE_COMMENTS.get(retcode, 'Error'))
+        self.retcode = retcode
+
+
+class SimTerminal:
+    """
+    Behaviour knobs (also settable through configure()):
+      fill_latency_ms   - sleep inside order_send, simulating the broker round trip
+      slippage_points   - max adverse slippage per fill (seeded, reproducible)
+      force_retcode     - if set, every order_send returns this retcode unexecuted
+      reject_rate       - fraction of orders rejected with TRADE_RETCODE_REJECT
+      commission_per_lot- charged on every deal (negative commission)
+    """
+
+    def __init__(self, seed=0, balance=10000.0, leverage=100, tick_interval_ms=250,
+                 clock=None, fill_latency_ms=0.0, slippage_points=0, force_retcode=None,
+                 reject_rate=0.0, commission_per_lot=0.0, login=10000001):
+        self.lock = threading.RLock()
+        self.market = Market(seed=seed, tick_interval_ms=tick_interval_ms, clock=clock or SimClock())
+        self.rng = random.Random(seed)
+        self.fill_latency_ms = fill_latency_ms
+        self.slippage_points = slippage_points
+        self.force_retcode = force_retcode
+        self.reject_rate = reject_rate
+        self.commission_per_lot = commission_per_lot
+        self.initialized = False
+        self.error = (c.RES_S_OK, 'Success')
+        self.selected = {'EURUSD', 'GBPUSD', 'USDJPY'}
+        self.account = {
+            'login': int(login),
+            'balance': float(balance),
+            'leverage': int(leverage),
+            'currency': 'USD',
+            'server': 'OpenClaw-Sim',
+            'company': 'OpenClaw Simulator',
+            'name': 'Simulator',
+        }
+        self.positions = {}
+        self.orders = {}
+        self.history_orders = []
+        self.history_deals = []
+        self._next_ticket = 1000000
+        self.calls = 0
+
+    def configure(self, **kwargs):
+        for key, value in kwargs.items():
+            if key == 'seed':
+                self.market.seed = int(value)
+                self.rng.seed(value)
+            elif hasattr(self, key) and not key.startswith('_'):
+                setattr(self, key, value)
+            else:
+                raise AttributeError(f"Unknown simulator option {key!r}")
+
+    # --- helpers ---
+
+    def ticket(self):
+        self._next_ticket += 1
+        return self._next_ticket
+
+    def now(self):
+        return self.market.clock.now()
+
+    def spec(self, symbol):
+        return self.market.symbols.get(symbol)
+
+    def quote(self, spec):
+        """(bid, ask, time_msc) of the latest tick."""
+        t_msc = self.market.last_tick_msc()
+        bid, ask = self.market.tick_at(spec, t_msc)
+        return bid, ask, t_msc
+
+    def fail(self, code, message):
+        self.error = (code, message)
+        return None
+
+    def ok(self):
+        self.error = (c.RES_S_OK, 'Success')
+
+    def require_init(self):
+        if not self.initialized:
+            self.error = (-10004, 'No IPC connection')
+            return False
+        self.calls += 1
+        self.ok()
+        self.update()
+        return True
+
+    def to_account_ccy(self, spec, amount, price):
+        if spec['currency_profit'] == self.account['currency']:
+            return amount
+        if spec['currency_base'] == self.account['currency'] and price:
+            return amount / price
+        return amount
+
+    def position_profit(self, pos, spec, bid, ask):
+        current = bid if pos['type'] == c.POSITION_TYPE_BUY else ask
+        sign = 1 if pos['type'] == c.POSITION_TYPE_BUY else -1
+        raw = (current - pos['price_open']) * sign * pos['volume'] * spec['contract_size']
+        return current, round(self.to_account_ccy(spec, raw, current), 2)
+
+    def margin_for(self, spec, volume, price):
+        notional = volume * spec['contract_size']
+        if spec['currency_base'] == self.account['currency']:
+            return notional / self.account['leverage']
+        return self.to_account_ccy(spec, notional * price, price) / self.account['leverage']
+
+    # --- state updates ---
+
+    def update(self):
+        """Mark positions to market, fire SL/TP, trigger/expire pending orders."""
+        now = self.now()
+        quotes = {}
+        for sym in {p['symbol'] for p in self.positions.values()} | {o['symbol'] for o in self.orders.values()}:
+            quotes[sym] = self.quote(self.spec(sym))
+
+        for order in list(self.orders.values()):
+            bid, ask, t_msc = quotes[order['symbol']]
+            if order['type_time'] == c.ORDER_TIME_SPECIFIED and order['time_expiration'] and now >= order['time_expiration']:
+                self._archive_order(order, c.ORDER_STATE_EXPIRED)
+                continue
+            price, otype = order['price_open'], order['type']
+            hit = ((otype == c.ORDER_TYPE_BUY_LIMIT and ask <= price)
+                   or (otype == c.ORDER_TYPE_SELL_LIMIT and bid >= price)
+                   or (otype in (c.ORDER_TYPE_BUY_STOP, c.ORDER_TYPE_BUY_STOP_LIMIT) and ask >= price)
+                   or (otype in (c.ORDER_TYPE_SELL_STOP, c.ORDER_TYPE_SELL_STOP_LIMIT) and bid <= price))
+            if hit:
+                fill = price if otype in (c.ORDER_TYPE_BUY_LIMIT, c.ORDER_TYPE_SELL_LIMIT) else (ask if otype in BUY_TYPES else bid)
+                del self.orders[order['ticket']]
+                self._open_position(order, fill, t_msc)
+
+        for pos in list(self.positions.values()):
+            spec = self.spec(pos['symbol'])
+            bid, ask, t_msc = quotes[pos['symbol']]
+            pos['price_current'], pos['profit'] = self.position_profit(pos, spec, bid, ask)
+            current = pos['price_current']
+            is_buy = pos['type'] == c.POSITION_TYPE_BUY
+            if pos['sl'] and ((is_buy and current <= pos['sl']) or (not is_buy and current >= pos['sl'])):
+                self._close(pos, pos['volume'], pos['sl'], t_msc, c.DEAL_REASON_SL, 'sl')
+            elif pos['tp'] and ((is_buy and current >= pos['tp']) or (not is_buy and current <= pos['tp'])):
+                self._close(pos, pos['volume'], pos['tp'], t_msc, c.DEAL_REASON_TP, 'tp')
+
+    def account_state(self):
+        profit = sum(p['profit'] + p['swap'] for p in self.positions.values())
+        margin = sum(self.margin_for(self.spec(p['symbol']), p['volume'], p['price_open'])
+                     for p in self.positions.values())
+        equity = self.account['balance'] + profit
+        return {
+            **self.account,
+            'profit': round(profit, 2),
+            'equity': round(equity, 2),
+            'margin': round(margin, 2),
+            'margin_free': round(equity - margin, 2),
+            'margin_level': round(equity / margin * 100, 2) if margin else 0.0,
+        }
+
+    # --- order execution ---
+
+    def _deal(self, order_ticket, pos_id, symbol, deal_type, entry, volume, price, t_msc, magic,
+              comment, profit=0.0, reason=c.DEAL_REASON_EXPERT):
+        commission = round(0.0 - self.commission_per_lot * volume, 2)
+        deal = {
+            'ticket': self.ticket(), 'order': order_ticket, 'time': t_msc // 1000, 'time_msc': t_msc,
+            'type': deal_type, 'entry': entry, 'magic': magic, 'position_id': pos_id, 'reason': reason,
+            'volume': volume, 'price': price, 'commission': commission, 'swap': 0.0,
+            'profit': round(profit, 2), 'fee': 0.0, 'symbol': symbol, 'comment': comment, 'external_id': '',
+        }
+        self.history_deals.append(deal)
+        self.account['balance'] = round(self.account['balance'] + deal['profit'] + commission, 2)
+        return deal
+
+    def _archive_order(self, order, state, t_msc=None):
+        t_msc = t_msc if t_msc is not None else self.market.last_tick_msc()
+        order.update(state=state, time_done=t_msc // 1000, time_done_msc=t_msc)
+        if state == c.ORDER_STATE_FILLED:
+            order['volume_current'] = 0.0
+        self.orders.pop(order['ticket'], None)
+        self.history_orders.append(order)
+
+    def _new_order(self, req, otype, price, state, t_msc):
+        ticket = self.ticket()
+        return {
+            'ticket': ticket, 'time_setup': t_msc // 1000, 'time_setup_msc': t_msc,
+            'time_done': 0, 'time_done_msc': 0, 'time_expiration': int(req.get('expiration', 0) or 0),
+            'type': otype, 'type_time': int(req.get('type_time', c.ORDER_TIME_GTC) or 0),
+            'type_filling': int(req.get('type_filling', c.ORDER_FILLING_FOK) or 0), 'state': state,
+            'magic': int(req.get('magic', 0) or 0), 'position_id': int(req.get('position', 0) or 0),
+            'position_by_id': int(req.get('position_by', 0) or 0), 'reason': c.ORDER_REASON_EXPERT,
+            'volume_initial': float(req['volume']), 'volume_current': float(req['volume']),
+            'price_open': float(price), 'sl': float(req.get('sl', 0) or 0), 'tp': float(req.get('tp', 0) or 0),
+            'price_current': float(price), 'price_stoplimit': float(req.get('stoplimit', 0) or 0),
+            'symbol': req['symbol'], 'comment': str(req.get('comment', '') or ''), 'external_id': '',
+        }
+
+    def _open_position(self, order, price, t_msc):
+        is_buy = order['type'] in BUY_TYPES
+        ticket = order['ticket']
+        self.positions[ticket] = {
+            'ticket': ticket, 'time': t_msc // 1000, 'time_msc': t_msc, 'time_update': t_msc // 1000,
+            'time_update_msc': t_msc, 'type': c.POSITION_TYPE_BUY if is_buy else c.POSITION_TYPE_SELL,
+            'magic': order['magic'], 'identifier': ticket, 'reason': c.POSITION_REASON_EXPERT,
+            'volume': order['volume_initial'], 'price_open': price, 'sl': order['sl'], 'tp': order['tp'],
+            'price_current': price, 'swap': 0.0, 'profit': 0.0, 'symbol': order['symbol'],
+            'comment': order['comment'], 'external_id': '',
+        }
+        order['position_id'] = ticket
+        self._archive_order(order, c.ORDER_STATE_FILLED, t_msc)
+        return self._deal(ticket, ticket, order['symbol'], c.DEAL_TYPE_BUY if is_buy else c.DEAL_TYPE_SELL,
+                          c.DEAL_ENTRY_IN, order['volume_initial'], price, t_msc, order['magic'], order['comment'])
+
+    def _close(self, pos, volume, price, t_msc, reason=c.DEAL_REASON_EXPERT, comment='', order_ticket=None,
+               entry=c.DEAL_ENTRY_OUT):
+        spec = self.spec(pos['symbol'])
+        sign = 1 if pos['type'] == c.POSITION_TYPE_BUY else -1
+        raw = (price - pos['price_open']) * sign * volume * spec['contract_size']
+        if order_ticket is None:
+            order_ticket = self.ticket()
+        deal = self._deal(order_ticket, pos['ticket'], pos['symbol'],
+                          c.DEAL_TYPE_SELL if sign > 0 else c.DEAL_TYPE_BUY, entry, volume, price,
+                          t_msc, pos['magic'], comment, self.to_account_ccy(spec, raw, price), reason)
+        pos['volume'] = round(pos['volume'] - volume, 8)
+        if pos['volume'] <= 1e-9:
+            del self.positions[pos['ticket']]
+        return deal
+
+    def check_volume(self, spec, volume):
+        steps = volume / spec['volume_step']
+        if volume < spec['volume_min'] or volume > spec['volume_max'] or abs(steps - round(steps)) > 1e-6:
+            raise TradeError(c.TRADE_RETCODE_INVALID_VOLUME)
+
+    def check_stops(self, spec, is_buy, ref_price, sl, tp):
+        """Real-terminal rule: stops must sit at least stops_level points from the reference price."""
+        gap = spec['stops_level'] * spec['point']
+        if is_buy:
+            bad = (sl and sl > ref_price - gap) or (tp and tp < ref_price + gap)
+        else:
+            bad = (sl and sl < ref_price + gap) or (tp and tp > ref_price - gap)
+        if bad:
+            raise TradeError(c.TRADE_RETCODE_INVALID_STOPS)
+
+    def check_filling(self, spec, req, pending):
+        filling = int(req.get('type_filling', c.ORDER_FILLING_FOK) or 0)
+        if filling == c.ORDER_FILLING_FOK and spec['filling_mode'] & c.SYMBOL_FILLING_FOK:
+            return
+        if filling == c.ORDER_FILLING_IOC and spec['filling_mode'] & c.SYMBOL_FILLING_IOC:
+            return
+        # Simulated symbols use Market execution, where RETURN is valid for market orders too
+        if filling == c.ORDER_FILLING_RETURN:
+            return
+        raise TradeError(c.TRADE_RETCODE_INVALID_FILL)
+
+    def execute(self, req, dry_run=False):
+        """Run one trade request. Returns (retcode, deal, order, volume, price). Raises TradeError."""
+        action = req.get('action')
+        if action == c.TRADE_ACTION_DEAL:
+            return self._market_order(req, dry_run)
+        if action == c.TRADE_ACTION_PENDING:
+            return self._pending_order(req, dry_run)
+        if action == c.TRADE_ACTION_SLTP:
+            return self._modify_position(req, dry_run)
+        if action == c.TRADE_ACTION_MODIFY:
+            return self._modify_order(req, dry_run)
+        if action == c.TRADE_ACTION_REMOVE:
+            return self._remove_order(req, dry_run)
+        if action == c.TRADE_ACTION_CLOSE_BY:
+            return self._close_by(req, dry_run)
+        raise TradeError(c.TRADE_RETCODE_INVALID)
+
+    def _symbol_spec(self, req):
+        spec = self.spec(req.get('symbol'))
+        if spec is None:
+            raise TradeError(c.TRADE_RETCODE_INVALID, 'Unknown symbol')
+        if spec['trade_mode'] == c.SYMBOL_TRADE_MODE_DISABLED:
+            raise TradeError(c.TRADE_RETCODE_TRADE_DISABLED)
+        return spec
+
+    def _market_order(self, req, dry_run):
+        spec = self._symbol_spec(req)
+        volume = float(req.get('volume', 0) or 0)
+        otype = req.get('type')
+        if otype not in (c.ORDER_TYPE_BUY, c.ORDER_TYPE_SELL):
+            raise TradeError(c.TRADE_RETCODE_INVALID)
+        self.check_volume(spec, volume)
+        self.check_filling(spec, req, pending=False)
+        is_buy = otype == c.ORDER_TYPE_BUY
+        bid, ask, t_msc = self.quote(spec)
+        slip = self.rng.randint(0, int(self.slippage_points)) * spec['point'] if self.slippage_points else 0.0
+        price = round(ask + slip if is_buy else bid - slip, spec['digits'])
+
+        position_ticket = int(req.get('position', 0) or 0)
+        if position_ticket:
+            pos = self.positions.get(position_ticket)
+            if pos is None:
+                raise TradeError(c.TRADE_RETCODE_POSITION_CLOSED)
+            if (pos['type'] == c.POSITION_TYPE_BUY) == is_buy or volume > pos['volume'] + 1e-9:
+                raise TradeError(c.TRADE_RETCODE_INVALID_CLOSE_VOLUME)
+            if dry_run:
+                return c.TRADE_RETCODE_DONE, 0, 0, volume, price
+            order = self._new_order(req, otype, price, c.ORDER_STATE_STARTED, t_msc)
+            deal = self._close(pos, volume, price, t_msc, comment=order['comment'], order_ticket=order['ticket'])
+            self._archive_order(order, c.ORDER_STATE_FILLED, t_msc)
+            return c.TRADE_RETCODE_DONE, deal['ticket'], order['ticket'], volume, price
+
+        self.check_stops(spec, is_buy, bid if is_buy else ask, req.get('sl'), req.get('tp'))
+        if self.margin_for(spec, volume, price) > self.account_state()['margin_free']:
+            raise TradeError(c.TRADE_RETCODE_NO_MONEY)
+        if dry_run:
+            return c.TRADE_RETCODE_DONE, 0, 0, volume, price
+        order = self._new_order(req, otype, price, c.ORDER_STATE_STARTED, t_msc)
+        deal = self._open_position(order, price, t_msc)
+        return c.TRADE_RETCODE_DONE, deal['ticket'], order['ticket'], volume, price
+
+    def _check_pending_price(self, spec, otype, price):
+        bid, ask, _ = self.quote(spec)
+        gap = spec['stops_level'] * spec['point']
+        valid = ((otype == c.ORDER_TYPE_BUY_LIMIT and price <= ask - gap)
+                 or (otype == c.ORDER_TYPE_SELL_LIMIT and price >= bid + gap)
+                 or (otype in (c.ORDER_TYPE_BUY_STOP, c.ORDER_TYPE_BUY_STOP_LIMIT) and price >= ask + gap)
+                 or (otype in (c.ORDER_TYPE_SELL_STOP, c.ORDER_TYPE_SELL_STOP_LIMIT) and price <= bid - gap))
+        if not valid or price <= 0:
+            raise TradeError(c.TRADE_RETCODE_INVALID_PRICE)
+
+    def _pending_order(self, req, dry_run):
+        spec = self._symbol_spec(req)
+        otype = req.get('type')
+        if otype not in PENDING_TYPES:
+            raise TradeError(c.TRADE_RETCODE_INVALID)
+        volume = float(req.get('volume', 0) or 0)
+        price = round(float(req.get('price', 0) or 0), spec['digits'])
+        self.check_volume(spec, volume)
+        self.check_filling(spec, req, pending=True)
+        self._check_pending_price(spec, otype, price)
+        self.check_stops(spec, otype in BUY_TYPES, price, req.get('sl'), req.get('tp'))
+        if int(req.get('type_time', 0) or 0) == c.ORDER_TIME_SPECIFIED and int(req.get('expiration', 0) or 0) <= self.now():
+            raise TradeError(c.TRADE_RETCODE_INVALID_EXPIRATION)
+        if dry_run:
+            return c.TRADE_RETCODE_DONE, 0, 0, volume, price
+        order = self._new_order(req, otype, price, c.ORDER_STATE_PLACED, self.market.last_tick_msc())
+        self.orders[order['ticket']] = order
+        return c.TRADE_RETCODE_DONE, 0, order['ticket'], volume, price
+
+    def _modify_position(self, req, dry_run):
+        pos = self.positions.get(int(req.get('position', 0) or 0))
+        if pos is None:
+            raise TradeError(c.TRADE_RETCODE_POSITION_CLOSED)
+        spec = self.spec(pos['symbol'])
+        sl, tp = float(req.get('sl', 0) or 0), float(req.get('tp', 0) or 0)
+        if (sl, tp) == (pos['sl'], pos['tp']):
+            raise TradeError(c.TRADE_RETCODE_NO_CHANGES)
+        bid, ask, _ = self.quote(spec)
+        is_buy = pos['type'] == c.POSITION_TYPE_BUY
+        self.check_stops(spec, is_buy, bid if is_buy else ask, sl, tp)
+        if not dry_run:
+            pos['sl'], pos['tp'] = sl, tp
+        return c.TRADE_RETCODE_DONE, 0, 0, pos['volume'], 0.0
+
+    def _modify_order(self, req, dry_run):
+        order = self.orders.get(int(req.get('order', 0) or 0))
+        if order is None:
+            raise TradeError(c.TRADE_RETCODE_INVALID_ORDER)
+        spec = self.spec(order['symbol'])
+        price = round(float(req.get('price', order['price_open']) or order['price_open']), spec['digits'])
+        sl, tp = float(req.get('sl', 0) or 0), float(req.get('tp', 0) or 0)
+        self._check_pending_price(spec, order['type'], price)
+        self.check_stops(spec, order['type'] in BUY_TYPES, price, sl, tp)
+        if not dry_run:
+            order.update(price_open=price, sl=sl, tp=tp)
+            if req.get('expiration'):
+                order['time_expiration'] = int(req['expiration'])
+        return c.TRADE_RETCODE_DONE, 0, order['ticket'], order['volume_current'], price
+
+    def _remove_order(self, req, dry_run):
+        order = self.orders.get(int(req.get('order', 0) or 0))
+        if order is None:
+            raise TradeError(c.TRADE_RETCODE_INVALID_ORDER)
+        if not dry_run:
+            self._archive_order(order, c.ORDER_STATE_CANCELED)
+        return c.TRADE_RETCODE_DONE, 0, order['ticket'], 0.0, 0.0
+
+    def _close_by(self, req, dry_run):
+        pos = self.positions.get(int(req.get('position', 0) or 0))
+        other = self.positions.get(int(req.get('position_by', 0) or 0))
+        if pos is None or other is None:
+            raise TradeError(c.TRADE_RETCODE_POSITION_CLOSED)
+        if pos['symbol'] != other['symbol'] or pos['type'] == other['type']:
+            raise TradeError(c.TRADE_RETCODE_INVALID)
+        volume = min(pos['volume'], other['volume'])
+        if dry_run:
+            return c.TRADE_RETCODE_DONE, 0, 0, volume, 0.0
+        t_msc = self.market.last_tick_msc()
+        order_ticket = self.ticket()
+        # Each side is closed at the other's open price, as the terminal does
+        deal = self._close(pos, volume, other['price_open'], t_msc, order_ticket=order_ticket,
+                           entry=c.DEAL_ENTRY_OUT_BY)
+        self._close(other, volume, pos['price_open'], t_msc, order_ticket=order_ticket, entry=c.DEAL_ENTRY_OUT_BY)
+        return c.TRADE_RETCODE_DONE, deal['ticket'], order_ticket, volume, 0.0
+
+    def order_send(self, request):
+        """Returns (retcode, deal, order, volume, price, bid, ask, comment) or None on bad arguments."""
+        if not isinstance(request, Mapping):
+            return self.fail(c.RES_E_INVALID_PARAMS, 'Invalid arguments')
+        req = dict(request)
+        if self.fill_latency_ms:
+            time.sleep(self.fill_latency_ms / 1000.0)
+        with self.lock:
+            if not self.require_init():
+                return None
+            spec = self.spec(req.get('symbol')) or (
+                self.spec(self.orders[req['order']]['symbol']) if req.get('order') in self.orders else None)
+            bid, ask = (self.quote(spec)[:2] if spec else (0.0, 0.0))
+            if self.force_retcode is not None:
+                code = int(self.force_retcode)
+                return code, 0, 0, 0.0, 0.0, bid, ask, RETCODE_COMMENTS.get(code, 'Forced retcode')
+            if self.reject_rate and self.rng.random() < self.reject_rate:
+                code = c.TRADE_RETCODE_REJECT
+                return code, 0, 0, 0.0, 0.0, bid, ask, RETCODE_COMMENTS[code]
+            try:
+                retcode, deal, order, volume, price = self.execute(req)
+            except TradeError as e:
+                return e.retcode, 0, 0, 0.0, 0.0, bid, ask, str(e)
+            return retcode, deal, order, volume, price, bid, ask, RETCODE_COMMENTS[retcode]
+
+    # --- history/market data ---
+
+    def _bar_times(self, timeframe, end_time, count):
+        """Opening times of `count` bars, oldest first, the last one containing end_time."""
+        if timeframe & 0xC000 == 0xC000:
+            dt = datetime.fromtimestamp(end_time, timezone.utc)
+            months = []
+            year, month = dt.year, dt.month
+            for _ in range(count):
+                months.append(datetime(year, month, 1, tzinfo=timezone.utc))
+                year, month = (year, month - 1) if month > 1 else (year - 1, 12)
+            months.reverse()
+            starts = [int(m.timestamp()) for m in months]
+            nexts = starts[1:] + [int(datetime(dt.year + dt.month // 12, dt.month % 12 + 1, 1, tzinfo=timezone.utc).timestamp())]
+            return np.array(starts, dtype=np.int64), np.array(nexts, dtype=np.int64) - np.array(starts, dtype=np.int64)
+        tf = timeframe_seconds(timeframe)
+        align = 345600 if timeframe & 0x8000 else 0   # weeks open on Monday
+        last = int(end_time) - (int(end_time) - align) % tf
+        return last - tf * np.arange(count - 1, -1, -1, dtype=np.int64), tf
+
+    def rates(self, spec, timeframe, end_time, count):
+        times, lengths = self._bar_times(timeframe, min(end_time, self.now()), count)
+        return self.market.bars(spec, times, lengths)
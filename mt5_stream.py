@@ -0,0 +1,215 @@
+"""
+Server-side tick streaming for the MT5 RPyC bridge.
+
+One poller thread watches the union of all subscribed symbols and pushes
+only changed ticks to each subscriber. Delivery runs on a per-subscription
+thread so a slow client never stalls the poller or other subscribers.
+
+Back-pressure: pending ticks are kept per symbol. In coalesced mode only the
+latest tick per symbol is kept (older ones are overwritten); in full mode at
+most `max_pending` ticks per symbol are queued and the oldest are dropped.
+Either way the subscriber's `dropped` counter records what was skipped.
+
+A new subscriber is sent the current tick of each of its symbols right
+away, so it does not wait for the next price change. A failing poll is
+logged and retried with backoff (up to `max_backoff` seconds); the poller
+keeps running.
+"""
+import threading
+import time
+from collections import deque
+
+from mt5_executor import mt5
+from mt5_log import logger
+
+# Tick tuple pushed to clients (by value):
+# (symbol, time, bid, ask, last, volume, time_msc, flags)
+TICK_FIELDS = ('symbol', 'time', 'bid', 'ask', 'last', 'volume', 'time_msc', 'flags')
+
+def tick_tuple(symbol, t):
+    return (symbol, int(t['time']), float(t['bid']), float(t['ask']), float(t['last']),
+            int(t['volume']), int(t['time_msc']), int(t['flags']))
+
+
+class Subscription:
+    """A client's registration for a set of symbols. Returned to the client as a netref."""
+
+    def __init__(self, streamer, symbols, callback, throttle_ms=0, coalesce=True, max_pending=1000):
+        self.streamer = streamer
+        self.symbols = frozenset(symbols)
+        self.callback = callback
+        self.throttle = max(0.0, throttle_ms / 1000.0)
+        self.coalesce = coalesce
+        self.max_pending = max(1, int(max_pending))
+        self.delivered = 0
+        self.dropped = 0
+        self.errors = 0
+        self._pending = {}
+        self._cond = threading.Condition()
+        self._closed = False
+        self._thread = threading.Thread(target=self._deliver_loop, daemon=True,
+                                        name=f"tick-sub-{id(self):x}")
+        self._thread.start()
+
+    def offer(self, symbol, ticks):
+        """Queue new ticks for a symbol (called from the poller thread)."""
+        with self._cond:
+            if self.coalesce:
+                if symbol in self._pending:
+                    self.dropped += len(self._pending[symbol])
+                self._pending[symbol] = [ticks[-1]]
+                self.dropped += len(ticks) - 1
+            else:
+                queue = self._pending.setdefault(symbol, deque(maxlen=self.max_pending))
+                overflow = len(queue) + len(ticks) - self.max_pending
+                if overflow > 0:
+                    self.dropped += overflow
+                queue.extend(ticks)
+            self._cond.notify()
+
+    def offer_current(self, symbol, tick, last_msc):
+        """
+        Queue `tick` as a new subscriber's first quote, unless the poller got
+        there first: something is already pending for the symbol, or
+        last_msc() (the poller's newest time_msc, read under the same lock
+        as offer) has moved past it.
+        """
+        with self._cond:
+            if symbol in self._pending or last_msc() != tick[6]:
+                return
+            self.offer(symbol, [tick])
+
+    def _deliver_loop(self):
+        last_push = 0.0
+        while True:
+            with self._cond:
+                while not self._pending and not self._closed:
+                    self._cond.wait()
+                if self._closed:
+                    return
+                wait = last_push + self.throttle - time.monotonic()
+                if wait > 0:
+                    # Keep coalescing until the throttle window has passed
+                    self._cond.wait(wait)
+                    if self._closed:
+                        return
+                batch = tuple(t for ticks in self._pending.values() for t in ticks)
+                self._pending = {}
+            try:
+                # Synchronous call: at most one batch in flight per subscriber
+                self.callback(batch)
+                self.delivered += len(batch)
+            except Exception:
+                self.errors += 1
+                if self.errors >= 3:
+                    # Client went away or its callback keeps failing
+                    self.close()
+                    return
+            last_push = time.monotonic()
+
+    def exposed_stats(self):
+        return {'symbols': sorted(self.symbols), 'delivered': self.delivered,
+                'dropped': self.dropped, 'errors': self.errors, 'closed': self._closed}
+
+    def exposed_close(self):
+        self.close()
+
+    def close(self):
+        with self._cond:
+            if self._closed:
+                return
+            self._closed = True
+            self._cond.notify_all()
+        self.streamer.unsubscribe(self)
+
+
+class TickStreamer:
+    """Polls MT5 for the subscribed symbols and fans changed ticks out to subscriptions."""
+
+    def __init__(self, poll_interval=0.02, max_batch=1000, max_backoff=5.0):
+        self.poll_interval = poll_interval
+        self.max_batch = max_batch
+        self.max_backoff = max_backoff
+        self._subs = []
+        self._lock = threading.Lock()
+        self._last_msc = {}
+        self._thread = None
+
+    def subscribe(self, symbols, callback, **kwargs):
+        symbols = [str(s) for s in symbols]
+        for symbol in symbols:
+            mt5.symbol_select(symbol, True)
+        sub = Subscription(self, symbols, callback, **kwargs)
+        with self._lock:
+            self._subs.append(sub)
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._poll_loop, daemon=True, name="tick-poller")
+                self._thread.start()
+        self._send_current(sub)
+        return sub
+
+    def _send_current(self, sub):
+        """
+        Offer a new subscriber the current tick of each symbol. Ticks the
+        poller has not seen yet are left to it, so they are not sent twice,
+        and a tick the poller has already superseded is not sent at all.
+        """
+        for symbol in sub.symbols:
+            tick = mt5.symbol_info_tick(symbol)
+            if tick is not None:
+                sub.offer_current(symbol, tick_tuple(symbol, tick._asdict()),
+                                  lambda: self._last_msc.get(symbol))
+
+    def unsubscribe(self, sub):
+        with self._lock:
+            if sub in self._subs:
+                self._subs.remove(sub)
+
+    def _poll_loop(self):
+        backoff = self.poll_interval
+        while True:
+            with self._lock:
+                subs = list(self._subs)
+                if not subs:
+                    self._thread = None
+                    self._last_msc.clear()
+                    return
+            try:
+                self._poll(subs)
+                backoff = self.poll_interval
+            except Exception as e:
+                # A dead poller would silently stop every subscription
+                backoff = min(self.max_backoff, backoff * 2)
+                logger.error('tick_poll_failed', error=str(e), retry_s=round(backoff, 3))
+            time.sleep(backoff)
+
+    def _poll(self, subs):
+        full = {s for sub in subs if not sub.coalesce for s in sub.symbols}
+        watched = {s for sub in subs for s in sub.symbols}
+
+        for symbol in watched:
+            ticks = self._new_ticks(symbol, symbol in full)
+            if not ticks:
+                continue
+            for sub in subs:
+                if symbol in sub.symbols:
+                    sub.offer(symbol, ticks)
+
+    def _new_ticks(self, symbol, full):
+        """Return ticks newer than the last one seen for `symbol`."""
+        last_msc = self._last_msc.get(symbol)
+        if full and last_msc is not None:
+            # Pull everything since the last tick so nothing between polls is missed
+            rows = mt5.copy_ticks_from(symbol, last_msc // 1000, self.max_batch, mt5.COPY_TICKS_ALL)
+            ticks = [tick_tuple(symbol, r) for r in rows if int(r['time_msc']) > last_msc] if rows is not None else []
+        else:
+            tick = mt5.symbol_info_tick(symbol)
+            if tick is None or (last_msc is not None and tick.time_msc <= last_msc):
+                return []
+            ticks = [tick_tuple(symbol, tick._asdict())]
+        if ticks:
+            self._last_msc[symbol] = ticks[-1][6]
+        return ticks
+
+
+streamer = TickStreamer()
@@ -0,0 +1,153 @@
+"""
+Rich TUI for mt5_server.py.
+
+Imported only when the server runs with the TUI (never in headless mode).
+The request path never touches this module: handlers append raw events to
+state.events and bump counters in mt5_metrics; everything here reads those
+from the draw loop, formats lazily and redraws only the panels whose inputs
+changed. The refresh rate adapts: fast while requests/events arrive, backing
+off to once per second when idle.
+"""
+import time
+from datetime import datetime
+
+from rich.box import ROUNDED
+from rich.layout import Layout
+from rich.live import Live
+from rich.panel import Panel
+from rich.table import Table
+from rich.text import Text
+
+FAST_REFRESH = 0.25
+SLOW_REFRESH = 1.0
+LOG_LINES = 20
+
+STATUS_COLORS = {"WARN": "yellow", "FAIL": "yellow", "ERR": "red", "REQ": "cyan"}
+
+
+def make_layout() -> Layout:
+    layout = Layout(name="root")
+    layout.split(
+        Layout(name="header", size=3),
+        Layout(name="main", ratio=1),
+        Layout(name="footer", size=3)
+    )
+    layout["main"].split_row(
+        Layout(name="left", ratio=2),
+        Layout(name="stats", ratio=1),
+    )
+    layout["left"].split(
+        Layout(name="logs", ratio=1),
+        Layout(name="endpoints", size=10),
+    )
+    return layout
+
+def render_header():
+    grid = Table.grid(expand=True)
+    grid.add_column(justify="left", ratio=1)
+    grid.add_column(justify="right")
+    grid.add_row(
+        Text("MT5 RPyC Bridge Server", style="bold white"),
+        datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+    )
+    return Panel(grid, style="white on blue")
+
+def render_stats(state, metrics, sampler):
+    table = Table(box=ROUNDED, expand=True)
+    table.add_column("Metric", style="dim")
+    table.add_column("Value", justify="right", style="bold")
+
+    status_style = "green" if state.mt5_connected else "red"
+    status_text = "CONNECTED" if state.mt5_connected else "DISCONNECTED"
+
+    table.add_row("MT5 Status", f"[{status_style}]{status_text}[/{status_style}]")
+    if state.mt5_login != "N/A":
+        table.add_row("Login", str(state.mt5_login))
+
+    totals = metrics.totals()
+    table.add_row("Active Connections", str(metrics.connections))
+    table.add_row("Total Requests", str(totals['calls']))
+    table.add_row("In Flight", str(totals['in_flight']))
+    table.add_row("Errors", f"[red]{totals['errors']}[/red]" if totals['errors'] > 0 else "0")
+    table.add_row("Req/s", f"{sampler.last_rate:.1f}")
+    table.add_row("", f"[green]{sampler.rate.render()}[/green]")
+    table.add_row("Mean ms", f"{sampler.last_latency_ms:.2f}")
+    table.add_row("", f"[cyan]{sampler.latency.render()}[/cyan]")
+
+    uptime = datetime.now() - state.server_start_time
+    table.add_row("Uptime", str(uptime).split('.')[0])
+
+    return Panel(table, title="Server Stats", border_style="blue")
+
+def render_logs(state):
+    table = Table(box=None, expand=True, show_header=False)
+    table.add_column("Time", width=10, style="dim")
+    table.add_column("Status", width=6)
+    table.add_column("Message")
+
+    # Formatting happens here, at draw time, not when the event was logged
+    for when, status, message in state.events.recent(LOG_LINES):
+        color = STATUS_COLORS.get(status, "green")
+        table.add_row(
+            time.strftime("%H:%M:%S", time.localtime(when)),
+            f"[{color}]{status}[/{color}]",
+            message
+        )
+
+    return Panel(table, title="Event Log", border_style="white")
+
+def render_endpoints(metrics):
+    """Per-endpoint latency from the metrics registry, busiest first."""
+    table = Table(box=None, expand=True)
+    table.add_column("Endpoint")
+    table.add_column("Calls", justify="right")
+    table.add_column("Err", justify="right")
+    table.add_column("p50 ms", justify="right")
+    table.add_column("p99 ms", justify="right")
+    table.add_column("MT5 ms", justify="right", style="cyan")
+    table.add_column("Marshal ms", justify="right", style="magenta")
+
+    snapshot = metrics.snapshot()
+    busiest = sorted((e for e in snapshot.items() if e[1]['calls']), key=lambda e: -e[1]['calls'])
+    for name, e in busiest[:6]:
+        table.add_row(
+            name, str(e['calls']),
+            f"[red]{e['errors']}[/red]" if e['errors'] else "0",
+            f"{e['request']['p50_ms']:.2f}", f"{e['request']['p99_ms']:.2f}",
+            f"{e['mt5']['mean_ms']:.2f}", f"{e['marshal']['mean_ms']:.2f}",
+        )
+    return Panel(table, title="Endpoints (mean MT5 vs marshalling time)", border_style="magenta")
+
+def run_tui(event_stop, state, metrics, sampler, footer):
+    layout = make_layout()
+    layout["footer"].update(Panel(footer, style="dim"))
+    last_event = last_calls = None
+    last_sample = 0.0
+    interval = FAST_REFRESH
+
+    with Live(layout, auto_refresh=False, screen=True) as live:
+        while not event_stop.is_set():
+            now = time.monotonic()
+            event_head = state.events.head
+            calls = metrics.totals()['calls']
+            busy = event_head != last_event or calls != last_calls
+            dirty = busy
+
+            if event_head != last_event:
+                layout["logs"].update(render_logs(state))
+                last_event = event_head
+            if calls != last_calls:
+                layout["endpoints"].update(render_endpoints(metrics))
+                last_calls = calls
+            if now - last_sample >= SLOW_REFRESH:
+                sampler.sample()
+                last_sample = now
+                layout["header"].update(render_header())
+                layout["stats"].update(render_stats(state, metrics, sampler))
+                dirty = True
+
+            if dirty:
+                live.refresh()
+            # Back off while idle, snap back to fast refresh on activity
+            interval = FAST_REFRESH if busy else min(interval * 2, SLOW_REFRESH)
+            event_stop.wait(interval)
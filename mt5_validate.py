@@ -0,0 +1,218 @@
+"""
+Pre-trade validation for the MT5 RPyC bridge.
+
+Orders that the trade server would reject on the spot (bad volume step,
+stops too close, unsupported filling mode, pending price on the wrong side
+of the market, trading disabled, ...) are caught here, in microseconds,
+from a cached symbol spec table and the cached tick, instead of costing a
+round trip to the broker. Rejections carry the retcode the terminal would
+have returned, so callers handle them the same way.
+
+Requests are also normalised on the way through: prices, stops and
+stoplimit are rounded to the symbol's digits, volume float noise is snapped
+to the volume step, and a filling mode the symbol supports is chosen when
+the request has none (or one the symbol does not support).
+
+Margin is left to the broker: order_calc_margin is itself a terminal call.
+"""
+from collections import namedtuple
+
+from mt5_executor import mt5
+
+# Not exported by every MetaTrader5 build
+TRADE_RETCODE_LONG_ONLY = getattr(mt5, 'TRADE_RETCODE_LONG_ONLY', 10042)
+TRADE_RETCODE_SHORT_ONLY = getattr(mt5, 'TRADE_RETCODE_SHORT_ONLY', 10043)
+TRADE_RETCODE_CLOSE_ONLY = getattr(mt5, 'TRADE_RETCODE_CLOSE_ONLY', 10044)
+
+# symbol_info().filling_mode bits
+SYMBOL_FILLING_FOK = 1
+SYMBOL_FILLING_IOC = 2
+
+BUY_TYPES = (mt5.ORDER_TYPE_BUY, mt5.ORDER_TYPE_BUY_LIMIT, mt5.ORDER_TYPE_BUY_STOP, mt5.ORDER_TYPE_BUY_STOP_LIMIT)
+PENDING_TYPES = (mt5.ORDER_TYPE_BUY_LIMIT, mt5.ORDER_TYPE_SELL_LIMIT, mt5.ORDER_TYPE_BUY_STOP,
+                 mt5.ORDER_TYPE_SELL_STOP, mt5.ORDER_TYPE_BUY_STOP_LIMIT, mt5.ORDER_TYPE_SELL_STOP_LIMIT)
+PRICE_FIELDS = ('price', 'sl', 'tp', 'stoplimit')
+
+# Fields each trade action cannot do without
+REQUIRED_FIELDS = {
+    mt5.TRADE_ACTION_DEAL: ('symbol', 'volume', 'type'),
+    mt5.TRADE_ACTION_PENDING: ('symbol', 'volume', 'type', 'price'),
+    mt5.TRADE_ACTION_SLTP: ('position',),
+    mt5.TRADE_ACTION_MODIFY: ('order',),
+    mt5.TRADE_ACTION_REMOVE: ('order',),
+    mt5.TRADE_ACTION_CLOSE_BY: ('position', 'position_by'),
+}
+
+SymbolSpec = namedtuple('SymbolSpec', [
+    'digits', 'point', 'volume_min', 'volume_max', 'volume_step',
+    'stops_level', 'freeze_level', 'filling_mode', 'trade_mode', 'execution_mode',
+])
+
+
+class Rejected(Exception):
+    """A request that would fail at the broker; retcode is what the terminal would return."""
+
+    def __init__(self, retcode, comment):
+        super().__init__(comment)
+        self.retcode = retcode
+        self.comment = comment
+
+
+def symbol_spec(info):
+    """The fields validation needs from a symbol_info() record (None stays None)."""
+    if info is None:
+        return None
+    return SymbolSpec(
+        digits=int(info.digits), point=float(info.point),
+        volume_min=float(info.volume_min), volume_max=float(info.volume_max),
+        volume_step=float(info.volume_step), stops_level=int(info.trade_stops_level),
+        freeze_level=int(info.trade_freeze_level), filling_mode=int(info.filling_mode),
+        trade_mode=int(info.trade_mode), execution_mode=int(info.trade_exemode),
+    )
+
+
+def _filling_supported(spec, mode, pending):
+    """
+    Symbol filling rules (MQL5 ENUM_ORDER_TYPE_FILLING): FOK/IOC need their
+    filling_mode bit; Request/Instant execution always fills market orders FOK;
+    RETURN is the pending-order default and, for market orders, needs Market or
+    Exchange execution.
+    """
+    instant = spec.execution_mode in (mt5.SYMBOL_TRADE_EXECUTION_REQUEST, mt5.SYMBOL_TRADE_EXECUTION_INSTANT)
+    if mode == mt5.ORDER_FILLING_FOK:
+        return bool(spec.filling_mode & SYMBOL_FILLING_FOK) or (instant and not pending)
+    if mode == mt5.ORDER_FILLING_IOC:
+        return bool(spec.filling_mode & SYMBOL_FILLING_IOC)
+    if mode == mt5.ORDER_FILLING_RETURN:
+        return pending or not instant
+    return False
+
+
+def pick_filling(spec, requested, pending):
+    """Keep the requested filling mode if the symbol supports it, otherwise choose one it does."""
+    if requested is not None and _filling_supported(spec, requested, pending):
+        return requested
+    if pending:
+        return mt5.ORDER_FILLING_RETURN
+    for mode in (mt5.ORDER_FILLING_FOK, mt5.ORDER_FILLING_IOC, mt5.ORDER_FILLING_RETURN):
+        if _filling_supported(spec, mode, pending):
+            return mode
+    return mt5.ORDER_FILLING_FOK
+
+
+def _check_trade_mode(spec, is_buy, opening):
+    if spec.trade_mode == mt5.SYMBOL_TRADE_MODE_DISABLED:
+        raise Rejected(mt5.TRADE_RETCODE_TRADE_DISABLED, 'Trade disabled for symbol')
+    if not opening:
+        return
+    if spec.trade_mode == mt5.SYMBOL_TRADE_MODE_CLOSEONLY:
+        raise Rejected(TRADE_RETCODE_CLOSE_ONLY, 'Symbol is close-only')
+    if spec.trade_mode == mt5.SYMBOL_TRADE_MODE_LONGONLY and not is_buy:
+        raise Rejected(TRADE_RETCODE_LONG_ONLY, 'Symbol is long-only')
+    if spec.trade_mode == mt5.SYMBOL_TRADE_MODE_SHORTONLY and is_buy:
+        raise Rejected(TRADE_RETCODE_SHORT_ONLY, 'Symbol is short-only')
+
+
+def _normalise_volume(spec, volume):
+    steps = round(volume / spec.volume_step)
+    if abs(volume / spec.volume_step - steps) > 1e-6:
+        raise Rejected(mt5.TRADE_RETCODE_INVALID_VOLUME,
+                       f'Volume {volume} is not a multiple of step {spec.volume_step}')
+    volume = round(steps * spec.volume_step, 8)
+    if volume < spec.volume_min or volume > spec.volume_max:
+        raise Rejected(mt5.TRADE_RETCODE_INVALID_VOLUME,
+                       f'Volume {volume} outside [{spec.volume_min}, {spec.volume_max}]')
+    return volume
+
+
+def _check_stops(spec, is_buy, ref_price, sl, tp):
+    """Stops must sit on the right side of ref_price, at least stops_level points away."""
+    gap = spec.stops_level * spec.point
+    if is_buy:
+        bad_sl, bad_tp = sl and sl > ref_price - gap, tp and tp < ref_price + gap
+    else:
+        bad_sl, bad_tp = sl and sl < ref_price + gap, tp and tp > ref_price - gap
+    if bad_sl or bad_tp:
+        which = 'SL' if bad_sl else 'TP'
+        raise Rejected(mt5.TRADE_RETCODE_INVALID_STOPS,
+                       f'Invalid stops: {which} within {spec.stops_level} points of {ref_price} or on the wrong side')
+
+
+def _check_pending_price(spec, otype, price, bid, ask):
+    gap = spec.stops_level * spec.point
+    valid = ((otype == mt5.ORDER_TYPE_BUY_LIMIT and price <= ask - gap)
+             or (otype == mt5.ORDER_TYPE_SELL_LIMIT and price >= bid + gap)
+             or (otype in (mt5.ORDER_TYPE_BUY_STOP, mt5.ORDER_TYPE_BUY_STOP_LIMIT) and price >= ask + gap)
+             or (otype in (mt5.ORDER_TYPE_SELL_STOP, mt5.ORDER_TYPE_SELL_STOP_LIMIT) and price <= bid - gap))
+    if not valid or price <= 0:
+        raise Rejected(mt5.TRADE_RETCODE_INVALID_PRICE,
+                       f'Invalid price {price} for order type {otype} (bid {bid}, ask {ask}, '
+                       f'stops level {spec.stops_level})')
+
+
+def validate(request, get_spec, get_tick, get_position=None):
+    """
+    Check and normalise one native request dict in place. Returns it, or
+    raises Rejected. get_spec(symbol) -> SymbolSpec or None; get_tick(symbol)
+    -> tick or None; get_position(ticket) -> position or None (used to check
+    SL/TP modifications). Actions without a symbol (remove, modify, close by)
+    pass through untouched, as do requests whose tick is unavailable.
+    """
+    action = request.get('action')
+    if action not in REQUIRED_FIELDS:
+        raise Rejected(mt5.TRADE_RETCODE_INVALID, f'Unknown action {action}')
+    missing = [f for f in REQUIRED_FIELDS[action] if f not in request]
+    if missing:
+        raise Rejected(mt5.TRADE_RETCODE_INVALID, f'Missing field(s) {missing}')
+    if action == mt5.TRADE_ACTION_SLTP:
+        position = get_position(request.get('position')) if get_position else None
+        if position is None:
+            return request
+        symbol = request.setdefault('symbol', str(position.symbol))
+        spec = get_spec(symbol)
+        if spec is None:
+            return request
+        for field in ('sl', 'tp'):
+            if field in request:
+                request[field] = round(request[field], spec.digits)
+        tick = get_tick(symbol)
+        if tick is not None:
+            is_buy = position.type == mt5.POSITION_TYPE_BUY
+            _check_stops(spec, is_buy, tick.bid if is_buy else tick.ask, request.get('sl'), request.get('tp'))
+        return request
+    if action not in (mt5.TRADE_ACTION_DEAL, mt5.TRADE_ACTION_PENDING):
+        return request
+
+    symbol = request['symbol']
+    spec = get_spec(symbol)
+    if spec is None:
+        raise Rejected(mt5.TRADE_RETCODE_INVALID, f'Unknown symbol {symbol}')
+    otype = request['type']
+    pending = action == mt5.TRADE_ACTION_PENDING
+    if pending and otype not in PENDING_TYPES or not pending and otype not in (mt5.ORDER_TYPE_BUY, mt5.ORDER_TYPE_SELL):
+        raise Rejected(mt5.TRADE_RETCODE_INVALID, f'Order type {otype} does not match action {action}')
+    is_buy = otype in BUY_TYPES
+    opening = not request.get('position')
+
+    _check_trade_mode(spec, is_buy, opening)
+    request['volume'] = _normalise_volume(spec, request['volume'])
+    for field in PRICE_FIELDS:
+        if field in request:
+            request[field] = round(request[field], spec.digits)
+    request['type_filling'] = pick_filling(spec, request.get('type_filling'), pending)
+
+    tick = get_tick(symbol)
+    if tick is None:
+        return request
+    if pending:
+        _check_pending_price(spec, otype, request['price'], tick.bid, tick.ask)
+        # A stop-limit order opens at its stoplimit price, so that is where stops are measured from
+        ref_price = request['price']
+        if otype in (mt5.ORDER_TYPE_BUY_STOP_LIMIT, mt5.ORDER_TYPE_SELL_STOP_LIMIT) and request.get('stoplimit'):
+            ref_price = request['stoplimit']
+        _check_stops(spec, is_buy, ref_price, request.get('sl'), request.get('tp'))
+        if request.get('type_time') == mt5.ORDER_TIME_SPECIFIED and request.get('expiration', 0) <= tick.time:
+            raise Rejected(mt5.TRADE_RETCODE_INVALID_EXPIRATION, 'Expiration is in the past')
+    elif opening:
+        _check_stops(spec, is_buy, tick.bid if is_buy else tick.ask, request.get('sl'), request.get('tp'))
+    return request
@@ -0,0 +1,98 @@
+"""
+Binary wire protocol listener for the MT5 bridge (see openclaw_skill/mt5_wire.py).
+
+Started by mt5_server_fixed.py next to the RPyC server. Terminal access goes
+through the same executor, cache and trade lock as the RPyC endpoints; they
+are passed in by the caller so both front-ends share one instance of each.
+"""
+import socket
+import socketserver
+import struct
+
+from mt5_executor import mt5
+from mt5_metrics import metrics
+from openclaw_skill.mt5_wire import (
+    BOOL, MSG_ORDER_SEND, MSG_PING, MSG_POSITIONS, MSG_RATES, MSG_TICK, MSG_TICKS,
+    STATUS_ERROR, U32, Reader, WireError, encode_frame, pack_bar, pack_order_result,
+    pack_position, pack_str, pack_tick, read_frame, unpack_order_request
+)
+
+RATES_REQUEST = struct.Struct("<III")
+
+def _tick_body(tick):
+    return BOOL.pack(False) if tick is None else BOOL.pack(True) + pack_tick(tick)
+
+class WireHandler(socketserver.BaseRequestHandler):
+    def setup(self):
+        self.request.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def handle(self):
+        server = self.server
+        while True:
+            try:
+                msg_type, status, request_id, payload = read_frame(self.request)
+            except (EOFError, OSError, WireError):
+                return
+            handler = server.handlers.get(msg_type)
+            try:
+                if handler is None:
+                    raise ValueError(f"Unknown message type {msg_type}")
+                frame = encode_frame(msg_type, request_id, handler(Reader(payload)))
+            except Exception as e:
+                frame = encode_frame(msg_type, request_id, str(e).encode("utf-8"), STATUS_ERROR)
+            try:
+                self.request.sendall(frame)
+            except OSError:
+                return
+
+
+class WireServer(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, port, get_tick, get_positions, send_order, host="0.0.0.0"):
+        """
+        get_tick(symbol) -> tick namedtuple or None
+        get_positions() -> tuple of position namedtuples
+        send_order(request_dict) -> result dict (as returned by result_to_dict)
+        """
+        self.get_tick = get_tick
+        self.get_positions = get_positions
+        self.send_order = send_order
+        handlers = {
+            MSG_PING: ("ping", lambda reader: b""),
+            MSG_TICK: ("tick", self._tick),
+            MSG_TICKS: ("ticks", self._ticks),
+            MSG_RATES: ("rates", self._rates),
+            MSG_POSITIONS: ("positions", self._positions),
+            MSG_ORDER_SEND: ("order_send", self._order_send),
+        }
+        # Same metrics as the RPyC endpoints, under a wire_ prefix
+        self.handlers = {msg_type: metrics.wrap(f"wire_{name}", fn) for msg_type, (name, fn) in handlers.items()}
+        super().__init__((host, port), WireHandler)
+
+    def _tick(self, reader):
+        return _tick_body(self.get_tick(reader.str()))
+
+    def _ticks(self, reader):
+        symbols = [reader.str() for _ in range(reader.u32())]
+        parts = [U32.pack(len(symbols))]
+        for symbol in symbols:
+            parts.append(pack_str(symbol) + _tick_body(self.get_tick(symbol)))
+        return b"".join(parts)
+
+    def _rates(self, reader):
+        symbol = reader.str()
+        timeframe, start_pos, count = reader.take(RATES_REQUEST)
+        rates = mt5.copy_rates_from_pos(symbol, timeframe, start_pos, count)
+        if rates is None:
+            rates = ()
+        return U32.pack(len(rates)) + b"".join(pack_bar(r) for r in rates)
+
+    def _positions(self, reader):
+        symbol = reader.str()
+        positions = [p for p in (self.get_positions() or ()) if not symbol or p.symbol == symbol]
+        return U32.pack(len(positions)) + b"".join(pack_position(p) for p in positions)
+
+    def _order_send(self, reader):
+        return pack_order_result(self.send_order(unpack_order_request(reader)))
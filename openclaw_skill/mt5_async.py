@@ -0,0 +1,161 @@
+"""
+Asyncio client for the MT5 bridge.
+
+All requests share one RPyC connection and are sent with `rpyc.async_`, so
+many calls can be outstanding at once: their network round trips overlap and
+a multi-symbol scan costs roughly one RTT instead of one per symbol.
+A background serving thread receives the replies and resolves asyncio futures.
+
+Usage:
+    async with AsyncMT5Client() as client:
+        ticks = await client.ticks(["EURUSD", "GBPUSD", "USDJPY"])
+"""
+import asyncio
+import json
+
+import rpyc
+
+from mt5_client import (
+    HISTORY_DEAL_FIELDS, HISTORY_ORDER_FIELDS,
+    columns_to_records, pool_address, _history_window
+)
+
+class AsyncMT5Client:
+    """
+    Pipelined asyncio client over a single RPyC connection (requires mt5_server_fixed.py).
+    host and port default to those of the current pool, so a client created
+    under mt5_router's terminal() talks to that terminal.
+    """
+
+    def __init__(self, host=None, port=None, timeout=10.0):
+        self.host, self.port = pool_address(host, port)
+        self.timeout = timeout
+        self._conn = None
+        self._bg = None
+        self._methods = {}
+
+    async def connect(self):
+        loop = asyncio.get_running_loop()
+        self._conn = await loop.run_in_executor(
+            None, lambda: rpyc.connect(self.host, self.port, config={"allow_pickle": True})
+        )
+        # Block in serve() instead of sleeping between polls so replies are handled immediately
+        self._bg = rpyc.BgServingThread(self._conn, serve_interval=0.1, sleep_interval=0)
+        return self
+
+    async def close(self):
+        if self._conn is None:
+            return
+        try:
+            self._bg.stop()
+            self._conn.close()
+        finally:
+            self._conn = None
+            self._methods.clear()
+
+    async def __aenter__(self):
+        return await self.connect()
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    def _method(self, name):
+        # Resolving conn.root.<name> is itself a round trip, so do it once per name
+        method = self._methods.get(name)
+        if method is None:
+            method = rpyc.async_(getattr(self._conn.root, name))
+            self._methods[name] = method
+        return method
+
+    async def call(self, name, *args, timeout=None):
+        """
+        Call `exposed_<name>` on the server without blocking the event loop.
+        Raises asyncio.TimeoutError after `timeout` seconds (default: client timeout).
+        Cancelling the awaiting task abandons the reply.
+        """
+        if self._conn is None:
+            raise ConnectionError("AsyncMT5Client is not connected")
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+
+        def settle(result):
+            # Runs on the serving thread
+            try:
+                value = result.value
+            except Exception as e:
+                loop.call_soon_threadsafe(_set_exception, future, e)
+            else:
+                loop.call_soon_threadsafe(_set_result, future, value)
+
+        self._method(name)(*args).add_callback(settle)
+        return await asyncio.wait_for(future, timeout or self.timeout)
+
+    async def gather(self, *calls, return_exceptions=False):
+        """Run several (name, *args) calls concurrently over the one connection."""
+        return await asyncio.gather(
+            *(self.call(name, *args) for name, *args in calls),
+            return_exceptions=return_exceptions
+        )
+
+    async def snapshot(self, symbols=None, include=None, timeout=None):
+        payload = await self.call(
+            "get_snapshot",
+            tuple(symbols) if symbols else None,
+            tuple(include) if include else None,
+            timeout=timeout
+        )
+        return json.loads(payload)
+
+    async def tick(self, symbol, timeout=None):
+        """Latest tick for one symbol as a dict, or None if unknown."""
+        snap = await self.snapshot((symbol,), ("ticks",), timeout=timeout)
+        return snap["ticks"].get(symbol)
+
+    async def ticks(self, symbols, timeout=None):
+        """
+        Latest ticks for many symbols, fetched concurrently. Returns
+        {symbol: tick or None}; a failing symbol does not fail the others.
+        """
+        results = await asyncio.gather(
+            *(self.tick(s, timeout=timeout) for s in symbols), return_exceptions=True
+        )
+        return {
+            s: (None if isinstance(r, BaseException) else r)
+            for s, r in zip(symbols, results)
+        }
+
+    async def account(self, timeout=None):
+        snap = await self.snapshot(include=("account",), timeout=timeout)
+        return snap.get("account") or {}
+
+    async def positions(self, timeout=None):
+        snap = await self.snapshot(include=("positions",), timeout=timeout)
+        return snap.get("positions", [])
+
+    async def orders(self, timeout=None):
+        snap = await self.snapshot(include=("orders",), timeout=timeout)
+        return snap.get("orders", [])
+
+    async def history_deals(self, hours=168, timeout=None):
+        from_ts, to_ts = _history_window(hours)
+        payload = await self.call("history_deals_columns", from_ts, to_ts, HISTORY_DEAL_FIELDS, timeout=timeout)
+        return columns_to_records(payload)
+
+    async def history_orders(self, hours=168, timeout=None):
+        from_ts, to_ts = _history_window(hours)
+        payload = await self.call("history_orders_columns", from_ts, to_ts, HISTORY_ORDER_FIELDS, timeout=timeout)
+        return columns_to_records(payload)
+
+def _set_result(future, value):
+    if not future.done():
+        future.set_result(value)
+
+def _set_exception(future, exc):
+    if not future.done():
+        future.set_exception(exc)
+
+if __name__ == "__main__":
+    async def main():
+        async with AsyncMT5Client() as client:
+            print(await client.ticks(["EURUSD", "GBPUSD", "USDJPY"]))
+    asyncio.run(main())
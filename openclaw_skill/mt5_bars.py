@@ -0,0 +1,220 @@
+"""
+Local bar (OHLC) store with incremental sync.
+
+Bars are kept per (symbol, timeframe) in a flat binary file of the
+terminal's rates records, read through np.memmap, so repeat requests for
+thousands of candles are served from local memory/page cache. A sync only
+asks the server for bars from the last stored bar onwards (copy_rates_range);
+the last stored bar may still have been forming, so it is replaced rather
+than duplicated. Older history is fetched once (copy_rates_from_pos) when a
+request needs more bars than the store holds.
+
+The store does not talk to the bridge itself: it is given two fetchers,
+which mt5_client.get_rates() wires to the server:
+    fetch_from_pos(symbol, timeframe, start_pos, count) -> structured array or None
+    fetch_range(symbol, timeframe, from_ts, to_ts)      -> structured array or None
+
+Default location: ~/.cache/openclaw-mt5/bars (override with MT5_BAR_CACHE).
+"""
+import json
+import os
+import threading
+import time
+
+import numpy as np
+
+DEFAULT_CACHE_DIR = os.environ.get(
+    "MT5_BAR_CACHE", os.path.join(os.path.expanduser("~"), ".cache", "openclaw-mt5", "bars"))
+
+# Same values as the MetaTrader5 TIMEFRAME_* constants
+TIMEFRAMES = {
+    "M1": 1, "M2": 2, "M3": 3, "M4": 4, "M5": 5, "M6": 6, "M10": 10, "M12": 12,
+    "M15": 15, "M20": 20, "M30": 30,
+    "H1": 0x4001, "H2": 0x4002, "H3": 0x4003, "H4": 0x4004, "H6": 0x4006,
+    "H8": 0x4008, "H12": 0x400C, "D1": 0x4018, "W1": 0x8001, "MN1": 0xC001,
+}
+TIMEFRAME_NAMES = {value: name for name, value in TIMEFRAMES.items()}
+
+# Future buffer on range requests, to cover broker server-time offsets
+FUTURE_BUFFER = 86400
+
+
+def timeframe_value(timeframe):
+    """Accept 'H1' or mt5.TIMEFRAME_H1."""
+    if isinstance(timeframe, str):
+        try:
+            return TIMEFRAMES[timeframe.upper()]
+        except KeyError:
+            raise ValueError(f"Unknown timeframe {timeframe!r}") from None
+    return int(timeframe)
+
+
+class BarSeries:
+    """One (symbol, timeframe): <name>.bin holds the records, <name>.json the dtype."""
+
+    def __init__(self, directory, symbol, timeframe):
+        name = f"{symbol}_{TIMEFRAME_NAMES.get(timeframe, timeframe)}"
+        self.symbol = symbol
+        self.timeframe = timeframe
+        self.path = os.path.join(directory, name + ".bin")
+        self.meta_path = os.path.join(directory, name + ".json")
+        self.lock = threading.Lock()
+        self.dtype = None
+        self.bars = None           # np.memmap (or empty array)
+        self.last_sync = 0.0
+        self.complete = False      # server had no older bars last time we asked
+        self._load()
+
+    def _load(self):
+        if not os.path.exists(self.meta_path) or not os.path.exists(self.path):
+            return
+        with open(self.meta_path) as f:
+            meta = json.load(f)
+        self.dtype = np.dtype([tuple(field) for field in meta["dtype"]])
+        self.complete = meta.get("complete", False)
+        self._remap()
+
+    def _remap(self):
+        size = os.path.getsize(self.path) if os.path.exists(self.path) else 0
+        count = size // self.dtype.itemsize
+        if count:
+            self.bars = np.memmap(self.path, dtype=self.dtype, mode="r", shape=(count,))
+        else:
+            self.bars = np.zeros(0, dtype=self.dtype)
+
+    def _write_meta(self):
+        tmp = self.meta_path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump({"symbol": self.symbol, "timeframe": self.timeframe,
+                       "dtype": self.dtype.descr, "complete": self.complete}, f)
+        os.replace(tmp, self.meta_path)
+
+    def __len__(self):
+        return 0 if self.bars is None else len(self.bars)
+
+    def last_time(self):
+        return int(self.bars["time"][-1]) if len(self) else None
+
+    def replace(self, rates):
+        """Rewrite the whole series (initial load or backfill)."""
+        self.dtype = rates.dtype
+        self.bars = None           # release the old mapping before replacing the file
+        tmp = self.path + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(rates.tobytes())
+        os.replace(tmp, self.path)
+        self._write_meta()
+        self._remap()
+
+    def merge_tail(self, rates):
+        """
+        Append bars newer than the store, replacing any stored bar at or after
+        rates[0]. The file never shrinks in place: a mapping of it that is
+        still alive must not lose pages (SIGBUS). If the merge would shorten
+        the series, the file is rewritten and swapped in with os.replace.
+        """
+        if not len(rates):
+            return
+        if self.dtype is None or not len(self):
+            self.replace(rates)
+            return
+        keep = int(np.searchsorted(self.bars["time"], rates["time"][0], side="left"))
+        rates = rates.astype(self.dtype, copy=False)
+        if keep + len(rates) < len(self):
+            self.replace(np.concatenate([np.asarray(self.bars[:keep]), rates]))
+            return
+        self.bars = None
+        with open(self.path, "r+b") as f:
+            f.seek(keep * self.dtype.itemsize)
+            f.write(rates.tobytes())
+        self._remap()
+
+
+class BarStore:
+    """
+    get(symbol, timeframe, count) returns the newest `count` bars as a
+    structured array (a copy, so later syncs never change or unmap it).
+    max_age: skip the server entirely if this series was synced less than
+    max_age seconds ago (0 = always do the incremental sync, usually 1-2 bars).
+    """
+
+    def __init__(self, fetch_from_pos, fetch_range, directory=DEFAULT_CACHE_DIR, max_age=0.0):
+        self.fetch_from_pos = fetch_from_pos
+        self.fetch_range = fetch_range
+        self.directory = directory
+        self.max_age = max_age
+        self._series = {}
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "syncs": 0, "backfills": 0, "bars_fetched": 0}
+        os.makedirs(directory, exist_ok=True)
+
+    def series(self, symbol, timeframe):
+        key = (symbol, timeframe_value(timeframe))
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = BarSeries(self.directory, *key)
+            return series
+
+    def get(self, symbol, timeframe, count, sync=True):
+        series = self.series(symbol, timeframe)
+        with series.lock:
+            backfilled = False
+            if sync and time.monotonic() - series.last_sync >= self.max_age:
+                backfilled = self._sync(series, count)
+            if not backfilled and len(series) >= count:
+                self.stats["hits"] += 1
+            if series.bars is None:
+                return None
+            return np.array(series.bars[-count:] if count else series.bars[:0])
+
+    def _fetched(self, rates):
+        if rates is not None:
+            self.stats["bars_fetched"] += len(rates)
+        return rates
+
+    def _sync(self, series, count):
+        """Bring the series up to date; True if it needed a full (backfill) pull."""
+        if not len(series) or (len(series) < count and not series.complete):
+            # Not enough history locally: one full pull, then incremental from there on
+            rates = self._fetched(self.fetch_from_pos(series.symbol, series.timeframe, 0, count))
+            self.stats["backfills"] += 1
+            if rates is None:
+                return True
+            series.complete = len(rates) < count
+            series.replace(rates)
+            series.last_sync = time.monotonic()
+            return True
+        else:
+            last = series.last_time()
+            rates = self._fetched(self.fetch_range(series.symbol, series.timeframe, last,
+                                                   int(time.time()) + FUTURE_BUFFER))
+            self.stats["syncs"] += 1
+            if rates is None:
+                return False
+            series.merge_tail(rates)
+            series.last_sync = time.monotonic()
+            return False
+
+    def clear(self, symbol=None, timeframe=None):
+        """Forget stored bars (all, one symbol, or one series)."""
+        tf = timeframe_value(timeframe) if timeframe is not None else None
+        with self._lock:
+            for key in list(self._series):
+                if (symbol is None or key[0] == symbol) and (tf is None or key[1] == tf):
+                    del self._series[key]
+        for name in os.listdir(self.directory):
+            stem, ext = os.path.splitext(name)
+            if ext not in (".bin", ".json"):
+                continue
+            sym, _, tf_name = stem.rpartition("_")
+            if (symbol is None or sym == symbol) and (tf is None or tf_name == TIMEFRAME_NAMES.get(tf, str(tf))):
+                os.remove(os.path.join(self.directory, name))
+
+
+def to_frame(rates):
+    """Structured rates array -> pandas DataFrame indexed by UTC bar time."""
+    import pandas as pd
+    frame = pd.DataFrame(np.asarray(rates))
+    frame["time"] = pd.to_datetime(frame["time"], unit="s", utc=True)
+    return frame.set_index("time")
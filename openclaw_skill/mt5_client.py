@@ -1,27 +1,54 @@
 import rpyc
-import sys
+from rpyc.utils.classic import obtain
 import sys
 import os
+import json
+import asyncio
+import itertools
+import queue
+import threading
+import time
+from array import array
+from collections import deque
+from contextlib import contextmanager
 from datetime import datetime, timezone, timedelta
 
-def get_windows_host_ip():
+DEFAULT_PORT = int(os.environ.get("MT5_BRIDGE_PORT", 18812))
+POOL_SIZE = int(os.environ.get("MT5_POOL_SIZE", 4))
+
+_host_ip = None
+_host_ip_lock = threading.Lock()
+
+def get_windows_host_ip(refresh=False):
     """
     Try to detect the Windows host IP address from WSL 2.
     It usually appears as the default gateway in 'ip route'.
+    The result is cached for the life of the process; pass refresh=True
+    to shell out again (e.g. after the WSL network was restarted).
     """
-    try:
-        # Use ip route to find the default gateway
-        with os.popen("ip route show | grep default") as f:
-            line = f.read().strip()
-            if "default via" in line:
-                return line.split()[2]
-    except Exception:
-        pass
-    
-    # Fallback to localhost if not found
-    return "127.0.0.1"
+    global _host_ip
+    override = os.environ.get("MT5_BRIDGE_HOST")
+    if override:
+        return override
+
+    with _host_ip_lock:
+        if _host_ip is not None and not refresh:
+            return _host_ip
 
-def connect_to_mt5(host=None, port=18812):
+        ip = "127.0.0.1"  # Fallback to localhost if not found
+        try:
+            # Use ip route to find the default gateway
+            with os.popen("ip route show | grep default") as f:
+                line = f.read().strip()
+                if "default via" in line:
+                    ip = line.split()[2]
+        except Exception:
+            pass
+
+        _host_ip = ip
+        return _host_ip
+
+def connect_to_mt5(host=None, port=DEFAULT_PORT):
     if host is None:
         host = get_windows_host_ip()
     
@@ -32,69 +59,347 @@ def connect_to_mt5(host=None, port=18812):
         print(f"Failed to connect to {host}:{port}. Error: {e}")
         return None
 
+# Errors that mean the socket itself is gone and the connection must be dropped.
+# Anything else raised while using a connection (remote AttributeError, MT5
+# errors, ...) leaves the link healthy, so it goes back into the pool.
+_LINK_ERRORS = (EOFError, OSError)
+
+class ConnectionPool:
+    """
+    Process-wide pool of long-lived RPyC connections to the bridge server.
+
+    Connections are opened lazily (up to `size`), checked against the
+    server's terminal session once, and reused by every helper. Idle connections are pinged
+    before reuse when they have been unused for `health_interval` seconds.
+    Failed connects back off exponentially up to `max_backoff` seconds.
+    """
+
+    def __init__(self, host=None, port=DEFAULT_PORT, size=POOL_SIZE,
+                 health_interval=5.0, max_backoff=30.0):
+        self.host = host
+        self.port = port
+        self.size = max(1, int(size))
+        self.health_interval = health_interval
+        self.max_backoff = max_backoff
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(self.size)
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._retry_at = 0.0
+        self._closed = False
+
+    def _open(self):
+        with self._lock:
+            wait = self._retry_at - time.monotonic()
+        if wait > 0:
+            raise ConnectionError(f"MT5 bridge unreachable, retrying in {wait:.1f}s")
+
+        host = self.host or get_windows_host_ip()
+        conn = None
+        try:
+            conn = rpyc.connect(host, self.port, config={"allow_pickle": True})
+            conn._mt5 = conn.root.get_mt5()
+            self._check_ready(conn)
+        except Exception:
+            if conn is not None:
+                self._discard(conn)
+            with self._lock:
+                self._failures += 1
+                backoff = min(self.max_backoff, 0.5 * (2 ** (self._failures - 1)))
+                self._retry_at = time.monotonic() + backoff
+            if self.host is None:
+                # The WSL gateway may have moved; re-detect it on the next attempt.
+                get_windows_host_ip(refresh=True)
+            raise
+
+        with self._lock:
+            self._failures = 0
+            self._retry_at = 0.0
+        conn._last_used = time.monotonic()
+        return conn
+
+    @property
+    def endpoint(self):
+        """(host, port) this pool connects to; host None means the auto-detected Windows host."""
+        return (self.host, self.port)
+
+    @staticmethod
+    def _check_ready(conn):
+        """
+        The server owns the terminal session (mt5_session.py); one status call
+        replaces initialize(). Servers without it are initialised as before.
+        """
+        try:
+            status = json.loads(conn.root.session_status())
+        except AttributeError:
+            if not conn._mt5.initialize():
+                raise ConnectionError(f"MT5 initialize failed: {conn._mt5.last_error()}")
+            return
+        if not status["connected"]:
+            raise ConnectionError(f"MT5 terminal not ready ({status['state']}): {status['last_error']}")
+
+    def _healthy(self, conn):
+        if conn.closed:
+            return False
+        if time.monotonic() - conn._last_used < self.health_interval:
+            return True
+        try:
+            conn.ping(timeout=2)
+            return True
+        except Exception:
+            return False
+
+    def _checkout(self):
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                return self._open()
+            if self._healthy(conn):
+                return conn
+            self._discard(conn)
+
+    def _discard(self, conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def acquire(self):
+        """Borrow a connection. Blocks while all `size` connections are in use."""
+        if self._closed:
+            raise ConnectionError("Connection pool is closed")
+        self._slots.acquire()
+        try:
+            return self._checkout()
+        except BaseException:
+            self._slots.release()
+            raise
+
+    def release(self, conn, broken=False):
+        """Return a borrowed connection; broken links are closed instead of reused."""
+        try:
+            if broken or self._closed or conn.closed:
+                self._discard(conn)
+            else:
+                conn._last_used = time.monotonic()
+                self._idle.put(conn)
+        finally:
+            self._slots.release()
+
+    @contextmanager
+    def connection(self):
+        """Borrow a connection; it is returned to the pool unless the link broke."""
+        conn = self.acquire()
+        broken = False
+        try:
+            yield conn
+        except _LINK_ERRORS:
+            broken = True
+            raise
+        finally:
+            self.release(conn, broken=broken)
+
+    def close(self):
+        """Close all idle connections and refuse further checkouts."""
+        self._closed = True
+        while True:
+            try:
+                self._discard(self._idle.get_nowait())
+            except queue.Empty:
+                break
+
+_pool = None
+_pool_lock = threading.Lock()
+
+_routing = threading.local()
+
+def get_pool():
+    """
+    Return the connection pool helpers use: the one selected on this thread
+    with using_pool() (see mt5_router), else the process-wide pool, created
+    on first use.
+    """
+    global _pool
+    pool = getattr(_routing, "pool", None)
+    if pool is not None:
+        return pool
+    with _pool_lock:
+        if _pool is None or _pool._closed:
+            _pool = ConnectionPool()
+        return _pool
+
+def configure_pool(host=None, port=DEFAULT_PORT, size=POOL_SIZE, **kwargs):
+    """Replace the process-wide pool, e.g. to raise `size` for multi-threaded agents."""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close()
+        _pool = ConnectionPool(host=host, port=port, size=size, **kwargs)
+        return _pool
+
+def pool_address(host=None, port=None):
+    """(host, port) for a dedicated connection: explicit values, else the current pool's."""
+    pool = get_pool()
+    host = host or pool.host or get_windows_host_ip()
+    return host, port or pool.port
+
+@contextmanager
+def using_pool(pool):
+    """Route every helper called on this thread through `pool` (e.g. another terminal's)."""
+    previous = getattr(_routing, "pool", None)
+    _routing.pool = pool
+    try:
+        yield pool
+    finally:
+        _routing.pool = previous
+
+@contextmanager
+def mt5_session():
+    """
+    Yield (conn, mt5) from the pool, where mt5 is the remote MetaTrader5 module.
+    Yields (None, None) if the bridge cannot be reached, so helpers can return
+    their empty value instead of raising.
+    """
+    pool = get_pool()
+    try:
+        conn = pool.acquire()
+    except Exception as e:
+        print(f"Failed to connect to MT5 bridge. Error: {e}")
+        yield None, None
+        return
+    broken = False
+    try:
+        yield conn, conn._mt5
+    except _LINK_ERRORS:
+        broken = True
+        raise
+    finally:
+        pool.release(conn, broken=broken)
+
+def get_session_status():
+    """
+    Server-side terminal session: {"state", "ready", "connected", "login",
+    "reconnects", "check_ms", "last_error", ...}, or {} if unreachable.
+    """
+    with mt5_session() as (conn, mt5):
+        if not conn: return {}
+        return json.loads(conn.root.session_status())
+
 def get_account_dict():
     """Returns account info as a clean dictionary."""
-    conn = connect_to_mt5()
-    if not conn: return {}
-    mt5 = conn.root.get_mt5()
-    if not mt5.initialize(): return {}
-    acct = mt5.account_info()
-    if acct is None: return {}
+    with mt5_session() as (conn, mt5):
+        if not conn: return {}
+        acct = mt5.account_info()
+        if acct is None: return {}
     
-    # Manually extract fields to avoid RPyC/Pickle issues
-    return {
-        "login": int(acct.login),
-        "balance": float(acct.balance),
-        "equity": float(acct.equity),
-        "profit": float(acct.profit),
-        "margin": float(acct.margin),
-        "margin_free": float(acct.margin_free),
-        "leverage": int(acct.leverage),
-        "currency": str(acct.currency),
-        "server": str(acct.server),
-        "company": str(acct.company),
-        "trade_allowed": bool(acct.trade_allowed)
-    }
+        # Manually extract fields to avoid RPyC/Pickle issues
+        return {
+            "login": int(acct.login),
+            "balance": float(acct.balance),
+            "equity": float(acct.equity),
+            "profit": float(acct.profit),
+            "margin": float(acct.margin),
+            "margin_free": float(acct.margin_free),
+            "leverage": int(acct.leverage),
+            "currency": str(acct.currency),
+            "server": str(acct.server),
+            "company": str(acct.company),
+            "trade_allowed": bool(acct.trade_allowed)
+        }
 
 def get_positions_list():
     """Returns open positions as a list of dicts."""
-    conn = connect_to_mt5()
-    if not conn: return []
-    mt5 = conn.root.get_mt5()
-    if not mt5.initialize(): return []
-    positions = mt5.positions_get()
-    if positions is None: return []
+    with mt5_session() as (conn, mt5):
+        if not conn: return []
+        positions = mt5.positions_get()
+        if positions is None: return []
     
-    result = []
-    for p in positions:
-        result.append({
-            "ticket": int(p.ticket),
-            "symbol": str(p.symbol),
-            "type": int(p.type),  # 0=Buy, 1=Sell
-            "volume": float(p.volume),
-            "price_open": float(p.price_open),
-            "price_current": float(p.price_current),
-            "sl": float(p.sl),
-            "tp": float(p.tp),
-            "profit": float(p.profit),
-            "swap": float(p.swap),
-            "comment": str(p.comment),
-            "time": int(p.time)
-        })
-    return result
+        result = []
+        for p in positions:
+            result.append({
+                "ticket": int(p.ticket),
+                "symbol": str(p.symbol),
+                "type": int(p.type),  # 0=Buy, 1=Sell
+                "volume": float(p.volume),
+                "price_open": float(p.price_open),
+                "price_current": float(p.price_current),
+                "sl": float(p.sl),
+                "tp": float(p.tp),
+                "profit": float(p.profit),
+                "swap": float(p.swap),
+                "comment": str(p.comment),
+                "time": int(p.time)
+            })
+        return result
 
-def get_history_orders(hours=168):
-    """Returns history orders from last N hours (default 1 week) as list of dicts."""
-    conn = connect_to_mt5()
-    if not conn: return []
-    mt5 = conn.root.get_mt5()
-    if not mt5.initialize(): return []
-    
+# Fields returned by get_history_orders / get_history_deals
+HISTORY_ORDER_FIELDS = (
+    "ticket", "symbol", "type", "state", "volume_initial", "volume_current",
+    "price_open", "sl", "tp", "price_current", "time_setup", "time_done",
+    "comment"
+)
+HISTORY_DEAL_FIELDS = (
+    "ticket", "order", "symbol", "type", "entry", "volume", "price",
+    "profit", "swap", "commission", "time", "comment"
+)
+
+def _history_window(hours):
     # Use timezone-aware UTC time
     now_utc = datetime.now(timezone.utc)
     from_ts = int(now_utc.timestamp()) - (hours * 3600)
     to_ts = int(now_utc.timestamp()) + 86400 # Future buffer (24h) to cover Server Time offsets
-    
+    return from_ts, to_ts
+
+def _unpack_columns(payload):
+    """Yield (field, values) from a to_columns() payload without per-field RPCs."""
+    byteorder, count, columns = payload
+    for name, typecode, data in columns:
+        if typecode == 's':
+            yield name, list(data)
+        else:
+            values = array(typecode)
+            values.frombytes(data)
+            if byteorder != sys.byteorder:
+                values.byteswap()
+            yield name, values
+
+def columns_to_records(payload):
+    """Convert a columnar history payload into a list of dicts."""
+    columns = dict(_unpack_columns(payload))
+    names = list(columns)
+    return [dict(zip(names, row)) for row in zip(*columns.values())]
+
+def columns_to_frame(payload):
+    """Convert a columnar history payload into a pandas DataFrame (zero-copy for numeric columns)."""
+    import numpy as np
+    import pandas as pd
+
+    byteorder, count, columns = payload
+    prefix = "<" if byteorder == "little" else ">"
+    data = {}
+    for name, typecode, raw in columns:
+        if typecode == 's':
+            data[name] = list(raw)
+        else:
+            dtype = prefix + ("i8" if typecode == 'q' else "f8")
+            data[name] = np.frombuffer(raw, dtype=dtype)
+    return pd.DataFrame(data)
+
+def get_history_orders(hours=168, as_frame=False):
+    """Returns history orders from last N hours (default 1 week) as list of dicts (or a DataFrame)."""
+    from_ts, to_ts = _history_window(hours)
+
+    with mt5_session() as (conn, mt5):
+        if not conn: return []
+        try:
+            payload = conn.root.history_orders_columns(from_ts, to_ts, HISTORY_ORDER_FIELDS)
+        except AttributeError:
+            # Server predates columnar export; fall back to per-record netrefs
+            return _history_orders_netref(mt5, from_ts, to_ts)
+        return columns_to_frame(payload) if as_frame else columns_to_records(payload)
+
+def _history_orders_netref(mt5, from_ts, to_ts):
     # Use simple timestamps to avoid RPyC datetime issues
     orders = mt5.history_orders_get(from_ts, to_ts)
     if orders is None: return []
@@ -121,17 +426,20 @@ def get_history_orders(hours=168):
              continue # Skip bad records
     return result
 
-def get_history_deals(hours=168):
-    """Returns history deals from last N hours (default 1 week) as list of dicts."""
-    conn = connect_to_mt5()
-    if not conn: return []
-    mt5 = conn.root.get_mt5()
-    if not mt5.initialize(): return []
-    
-    now_utc = datetime.now(timezone.utc)
-    from_ts = int(now_utc.timestamp()) - (hours * 3600)
-    to_ts = int(now_utc.timestamp()) + 86400 # Future buffer (24h)
-    
+def get_history_deals(hours=168, as_frame=False):
+    """Returns history deals from last N hours (default 1 week) as list of dicts (or a DataFrame)."""
+    from_ts, to_ts = _history_window(hours)
+
+    with mt5_session() as (conn, mt5):
+        if not conn: return []
+        try:
+            payload = conn.root.history_deals_columns(from_ts, to_ts, HISTORY_DEAL_FIELDS)
+        except AttributeError:
+            # Server predates columnar export; fall back to per-record netrefs
+            return _history_deals_netref(mt5, from_ts, to_ts)
+        return columns_to_frame(payload) if as_frame else columns_to_records(payload)
+
+def _history_deals_netref(mt5, from_ts, to_ts):
     deals = mt5.history_deals_get(from_ts, to_ts)
     if deals is None: return []
 
@@ -156,6 +464,571 @@ def get_history_deals(hours=168):
              continue
     return result
 
+_END = object()
+
+def iter_cursor(kind, args, chunk=5000, prefetch=2, retries=5):
+    """
+    Yield the raw chunks of a server-side cursor (requires mt5_server_fixed.py).
+    A background thread fetches up to `prefetch` chunks ahead of the consumer,
+    so at most prefetch + 1 chunks are in memory. If the link drops, it
+    reconnects and resumes at the next chunk (reopening the cursor if the
+    server let it expire), giving up after `retries` consecutive failures.
+    """
+    chunks_queue = queue.Queue(maxsize=max(1, prefetch))
+    stop = threading.Event()
+    # Routing is per thread: the producer must use the caller's pool
+    pool = get_pool()
+
+    def put(item):
+        while not stop.is_set():
+            try:
+                chunks_queue.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def produce():
+        cursor_id, chunks, index, failures = None, None, 0, 0
+        try:
+            while not stop.is_set():
+                try:
+                    with mt5_session() as (conn, mt5):
+                        if not conn:
+                            raise ConnectionError("MT5 bridge unreachable")
+                        if cursor_id is None:
+                            cursor_id, _, chunks = conn.root.open_cursor(kind, json.dumps(args), chunk)
+                        if index >= chunks:
+                            break
+                        payload = conn.root.cursor_fetch(cursor_id, index)
+                    failures = 0
+                except _LINK_ERRORS + (ConnectionError,) as e:
+                    failures += 1
+                    if failures > retries:
+                        put(e)
+                        return
+                    time.sleep(min(5.0, 0.25 * 2 ** failures))
+                    continue
+                if payload is None:
+                    # Cursor expired on the server: reopen and resume at the same index
+                    cursor_id = None
+                    continue
+                if not put(payload):
+                    break
+                index += 1
+        except Exception as e:
+            put(e)
+            return
+        finally:
+            if cursor_id is not None:
+                try:
+                    with mt5_session() as (conn, mt5):
+                        if conn: conn.root.close_cursor(cursor_id)
+                except Exception:
+                    pass
+        put(_END)
+
+    def run():
+        with using_pool(pool):
+            produce()
+
+    threading.Thread(target=run, daemon=True, name=f"mt5-cursor-{kind}").start()
+    try:
+        while True:
+            item = chunks_queue.get()
+            if item is _END:
+                return
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        stop.set()
+
+def iter_history_deals(from_ts, to_ts, chunk=5000, fields=HISTORY_DEAL_FIELDS, prefetch=2):
+    """Yield history deals in [from_ts, to_ts] as dicts, `chunk` at a time from a resumable server cursor."""
+    args = {"from_ts": _timestamp(from_ts), "to_ts": _timestamp(to_ts), "fields": list(fields)}
+    for payload in iter_cursor("deals", args, chunk, prefetch):
+        yield from columns_to_records(payload)
+
+def iter_history_orders(from_ts, to_ts, chunk=5000, fields=HISTORY_ORDER_FIELDS, prefetch=2):
+    """Yield history orders in [from_ts, to_ts] as dicts (see iter_history_deals)."""
+    args = {"from_ts": _timestamp(from_ts), "to_ts": _timestamp(to_ts), "fields": list(fields)}
+    for payload in iter_cursor("orders", args, chunk, prefetch):
+        yield from columns_to_records(payload)
+
+def iter_rates_range(symbol, timeframe, from_ts, to_ts, chunk=50000, prefetch=2):
+    """Yield bars opening in [from_ts, to_ts] as numpy structured arrays of up to `chunk` bars."""
+    from mt5_bars import timeframe_value
+    args = {"symbol": symbol, "timeframe": timeframe_value(timeframe),
+            "from_ts": _timestamp(from_ts), "to_ts": _timestamp(to_ts)}
+    for payload in iter_cursor("rates", args, chunk, prefetch):
+        yield payload_to_array(payload)
+
+def _fetch_history(kind, from_ts, to_ts, fields):
+    """{field: values} for history deals/orders in [from_ts, to_ts], None if unreachable."""
+    with mt5_session() as (conn, mt5):
+        if not conn: return None
+        try:
+            payload = getattr(conn.root, f"history_{kind}_columns")(from_ts, to_ts, tuple(fields))
+        except AttributeError:
+            # Server predates columnar export; pull the records by pickle
+            records = obtain(getattr(mt5, f"history_{kind}_get")(from_ts, to_ts)) or ()
+            return {f: [getattr(r, f) for r in records] for f in fields}
+        return dict(_unpack_columns(payload))
+
+def fetch_history_deals(from_ts, to_ts, fields=HISTORY_DEAL_FIELDS):
+    return _fetch_history("deals", from_ts, to_ts, fields)
+
+def fetch_history_orders(from_ts, to_ts, fields=HISTORY_ORDER_FIELDS):
+    return _fetch_history("orders", from_ts, to_ts, fields)
+
+def fetch_open_order_setups():
+    """time_setup of every open (pending) order, None if the bridge cannot be reached."""
+    snapshot = get_snapshot(include=("orders",))
+    if not snapshot:
+        return None
+    return [o["time_setup"] for o in snapshot["orders"]]
+
+_journals = {}
+_journals_lock = threading.Lock()
+
+def _on_pool(pool, fn):
+    """fn, always called through `pool` whichever terminal the calling thread is routed to."""
+    def call(*args):
+        with using_pool(pool):
+            return fn(*args)
+    return call
+
+def get_journal(login=None, sync=False):
+    """
+    Return the local deal/order journal (see mt5_journal.py) for `login`
+    (default: the connected account). It is synced on first use, and on
+    every call with sync=True. A journal is bound to the pool it was opened
+    through, and only if that terminal is logged in to `login`, so a sync
+    never writes another account's history into it (see mt5_router).
+    Returns None if no reachable terminal has the account.
+    """
+    if login is None:
+        login = get_account_dict().get("login")
+        if login is None:
+            return None
+    login = int(login)
+    with _journals_lock:
+        journal = _journals.get(login)
+    if journal is None or journal.pool._closed:
+        pool = get_pool()
+        if get_account_dict().get("login") != login:
+            print(f"MT5 journal: the current terminal is not account {login}")
+            return journal
+        from mt5_journal import Journal, journal_path
+        with _journals_lock:
+            fetchers = (_on_pool(pool, fetch_history_deals), _on_pool(pool, fetch_history_orders),
+                        _on_pool(pool, fetch_open_order_setups))
+            journal = _journals.get(login)
+            if journal is None:
+                journal = _journals[login] = Journal(journal_path(login), *fetchers)
+            else:
+                journal.fetch_deals, journal.fetch_orders, journal.fetch_open_setups = fetchers
+            journal.pool = pool
+        sync = True
+    if sync:
+        journal.sync()
+    return journal
+
+def sync_journal(login=None):
+    """Pull deals/orders newer than the journal; returns the journal (None if unreachable)."""
+    return get_journal(login, sync=True)
+
+# {pool endpoint: {symbol: contract size}}; brokers size the same symbol differently
+_contract_sizes = {}
+
+def get_contract_sizes(symbols):
+    """{symbol: trade_contract_size}; symbol specs are static, so each is fetched once per terminal."""
+    sizes = _contract_sizes.setdefault(get_pool().endpoint, {})
+    missing = [s for s in set(symbols) if s and s not in sizes]
+    if missing:
+        with mt5_session() as (conn, mt5):
+            if conn:
+                for symbol in missing:
+                    info = mt5.symbol_info(symbol)
+                    if info is not None:
+                        sizes[symbol] = float(info.trade_contract_size)
+    return {s: sizes[s] for s in symbols if s in sizes}
+
+def get_portfolio(since=None, sync=True):
+    """
+    One refresh for analytics: positions + account from a snapshot and
+    trade deals from the local journal (synced incrementally), as an
+    mt5_analytics.Portfolio. `since` limits deals to those at or after
+    that unix time. Returns None if the bridge cannot be reached.
+    """
+    from mt5_analytics import DEAL_FIELDS, Portfolio
+
+    snapshot = get_snapshot(include=("account", "positions"))
+    if not snapshot:
+        return None
+    journal = get_journal(sync=sync)
+    deals = journal.columns(DEAL_FIELDS, since=since, trades_only=True) if journal else None
+    symbols = {p["symbol"] for p in snapshot["positions"]} | set(deals["symbol"] if deals else ())
+    return Portfolio(snapshot["positions"], deals, get_contract_sizes(symbols), snapshot["account"])
+
+def payload_to_array(payload):
+    """Rebuild a structured numpy array from an array payload (dtype_descr_json, raw_bytes)."""
+    import numpy as np
+
+    if payload is None:
+        return None
+    descr, raw = payload
+    dtype = np.dtype([tuple(field) for field in json.loads(descr)])
+    return np.frombuffer(raw, dtype=dtype)
+
+def fetch_rates_from_pos(symbol, timeframe, start_pos, count):
+    """copy_rates_from_pos through the bridge, as a structured numpy array (None on failure)."""
+    with mt5_session() as (conn, mt5):
+        if not conn: return None
+        try:
+            payload = conn.root.rates_from_pos(symbol, timeframe, start_pos, count)
+        except AttributeError:
+            # Server predates array payloads; pull the array by pickle
+            return obtain(mt5.copy_rates_from_pos(symbol, timeframe, start_pos, count))
+        return payload_to_array(payload)
+
+def fetch_rates_range(symbol, timeframe, from_ts, to_ts):
+    """copy_rates_range through the bridge, as a structured numpy array (None on failure)."""
+    with mt5_session() as (conn, mt5):
+        if not conn: return None
+        try:
+            payload = conn.root.rates_range(symbol, timeframe, from_ts, to_ts)
+        except AttributeError:
+            return obtain(mt5.copy_rates_range(symbol, timeframe, from_ts, to_ts))
+        return payload_to_array(payload)
+
+TICK_FLAGS = {"ALL": -1, "INFO": 1, "TRADE": 2}
+
+def _timestamp(value):
+    return int(value.timestamp()) if isinstance(value, datetime) else int(value)
+
+def get_ticks_range(symbol, from_ts, to_ts, flags="ALL", chunk_bytes=4 << 20, inflight=2):
+    """
+    Tick history in [from_ts, to_ts] (unix seconds or aware datetimes) as a
+    numpy structured array (time, bid, ask, last, volume, time_msc, flags,
+    volume_real). `flags`: "ALL", "INFO", "TRADE" or a COPY_TICKS_* value.
+    The server sends raw bytes in `chunk_bytes` chunks, `inflight` requests
+    ahead, copied straight into the result (requires mt5_server_fixed.py).
+    Returns None if the terminal has no ticks for the request.
+    """
+    import numpy as np
+
+    flags = TICK_FLAGS[flags.upper()] if isinstance(flags, str) else int(flags)
+    with mt5_session() as (conn, mt5):
+        if not conn: return None
+        header = conn.root.copy_ticks_range(symbol, _timestamp(from_ts), _timestamp(to_ts), flags, chunk_bytes)
+        if header is None:
+            return None
+        descr, count, chunk_rows, chunks, export = header
+        ticks = np.empty(count, dtype=np.dtype([tuple(f) for f in json.loads(descr)]))
+        raw = ticks.view(np.uint8)
+        read = rpyc.async_(export.read)
+        pending = [read(i) for i in range(min(max(1, inflight), chunks))]
+        requested, offset = len(pending), 0
+        while pending:
+            data = pending.pop(0).value
+            if requested < chunks:
+                pending.append(read(requested))
+                requested += 1
+            raw[offset:offset + len(data)] = np.frombuffer(data, dtype=np.uint8)
+            offset += len(data)
+        export.close()
+        return ticks
+
+_bar_stores = {}
+_bar_store_lock = threading.Lock()
+
+def get_bar_store():
+    """
+    Return the local bar store (see mt5_bars.py) of the current pool's
+    terminal, creating it on first use. Brokers differ in server time and
+    history, so each routed terminal (see mt5_router) keeps its bars in a
+    "<host>_<port>" subdirectory; the default terminal uses the top level.
+    """
+    endpoint = get_pool().endpoint
+    with _bar_store_lock:
+        store = _bar_stores.get(endpoint)
+        if store is None:
+            from mt5_bars import BarStore, DEFAULT_CACHE_DIR
+            directory = DEFAULT_CACHE_DIR
+            if endpoint != (None, DEFAULT_PORT):
+                directory = os.path.join(directory, "{}_{}".format(*endpoint))
+            store = _bar_stores[endpoint] = BarStore(fetch_rates_from_pos, fetch_rates_range, directory)
+        return store
+
+def get_rates(symbol, timeframe="H1", count=100, as_frame=False, sync=True):
+    """
+    Returns the newest `count` bars of symbol/timeframe ('H1' or mt5.TIMEFRAME_H1)
+    as a numpy structured array (time, open, high, low, close, tick_volume,
+    spread, real_volume), or a DataFrame indexed by UTC time.
+    Bars come from the local bar store; only bars newer than the last stored
+    one are fetched from the terminal. sync=False skips the server entirely.
+    """
+    rates = get_bar_store().get(symbol, timeframe, count, sync=sync)
+    if rates is None:
+        return None
+    if as_frame:
+        from mt5_bars import to_frame
+        return to_frame(rates)
+    return rates
+
+def calculate_indicator(symbol, indicator, timeframe="H1", **params):
+    """
+    Current value of an indicator computed on the server (requires
+    mt5_server_fixed.py): "rsi", "ema", "sma", "atr" (length=...) or
+    "bbands" (length=..., mult=...). Bollinger returns {"middle", "upper",
+    "lower"}; the rest a float. The value includes the forming bar.
+    Returns None if unavailable.
+    """
+    with mt5_session() as (conn, mt5):
+        if not conn: return None
+        result = json.loads(conn.root.indicator(symbol, timeframe, indicator, json.dumps(params)))
+        return result.get("value")
+
+def calculate_indicators(queries):
+    """
+    Batch of indicator queries in one round trip: a list of
+    {"symbol", "timeframe", "indicator", "params"} dicts. Returns a list of
+    {"value", "closed", "time", "closed_time"} (or {"error"}) in order.
+    """
+    with mt5_session() as (conn, mt5):
+        if not conn: return []
+        return json.loads(conn.root.indicators(json.dumps(list(queries))))
+
+def get_snapshot(symbols=None, include=None):
+    """
+    Returns account, positions, pending orders and ticks in one round trip.
+    `symbols`: symbols to quote (default: every symbol with a position/order).
+    `include`: subset of ("account", "positions", "orders", "ticks").
+    Requires mt5_server_fixed.py (exposed_get_snapshot).
+    """
+    with mt5_session() as (conn, mt5):
+        if not conn: return {}
+        payload = conn.root.get_snapshot(
+            tuple(symbols) if symbols else None,
+            tuple(include) if include else None
+        )
+        return json.loads(payload)
+
+# Round-trip samples of the orders sent from this process, per (pool endpoint,
+# symbol); everything else is aggregated by the server (see get_execution_stats)
+_round_trips = {}
+_round_trips_lock = threading.Lock()
+ROUND_TRIP_WINDOW = 1000
+_request_ids = itertools.count(1)
+
+def _trace(results, client_send, client_recv):
+    """Add the client stamps, round trip ("total") and "transport" to traced results and keep them."""
+    endpoint = get_pool().endpoint
+    total = (client_recv - client_send) / 1e6
+    for res in results:
+        timing = res.get("timing")
+        if timing is None:
+            continue
+        timing.update(client_send=client_send, client_recv=client_recv)
+        latency = res.setdefault("latency_ms", {})
+        latency["total"] = total
+        if "server" in latency:
+            # Both network legs plus marshalling
+            latency["transport"] = total - latency["server"]
+        if not res.get("symbol"):
+            continue
+        with _round_trips_lock:
+            stages = _round_trips.setdefault((endpoint, res["symbol"]), {})
+            for stage in ("total", "transport"):
+                if stage in latency:
+                    stages.setdefault(stage, deque(maxlen=ROUND_TRIP_WINDOW)).append(latency[stage])
+
+def _latency_summary(samples):
+    values = sorted(samples)
+    pick = lambda q: values[min(len(values) - 1, int(q * len(values)))]
+    return {"mean": sum(values) / len(values), "p50": pick(0.5), "p95": pick(0.95), "max": values[-1]}
+
+def order_send(request, request_id=None):
+    """
+    Sends one order with latency tracing (requires mt5_server_fixed.py). The
+    result carries `request_id` (generated unless given; also the server's log
+    rid), `timing` (perf_counter_ns stamps per stage: client_send, server_recv,
+    validated, mt5_start, mt5_end, server_send, client_recv), `latency_ms`
+    (stage durations, incl. "transport"), and for market orders `requested_price`
+    (the server's ask/bid at submit time), `client_price` (the price sent, if
+    any) and `slippage_points` (positive is adverse). See get_execution_stats().
+    """
+    rid = request_id or f"c{os.getpid():x}-{next(_request_ids):x}"
+    with mt5_session() as (conn, mt5):
+        if not conn: return {}
+        client_send = time.perf_counter_ns()
+        payload = conn.root.order_send_traced(json.dumps(request), rid)
+        res = json.loads(payload)
+        _trace([res], client_send, time.perf_counter_ns())
+        return res
+
+def order_send_many(requests, all_or_nothing=False):
+    """
+    Sends a list of order request dicts in one round trip (requires mt5_server_fixed.py).
+    The server validates all requests first, fills missing DEAL prices from one
+    tick per symbol, and executes them back to back. Returns
+    {"results": [...], "sent", "succeeded", "failed", "total_ms"}; each result
+    is traced like order_send().
+    """
+    with mt5_session() as (conn, mt5):
+        if not conn: return {}
+        client_send = time.perf_counter_ns()
+        payload = conn.root.order_send_many(json.dumps(list(requests)), all_or_nothing)
+        report = json.loads(payload)
+        _trace(report["results"], client_send, time.perf_counter_ns())
+        return report
+
+def get_execution_stats(symbol=None):
+    """
+    Per-symbol execution quality from the server (every client's orders on
+    the current terminal): orders, fill rate, rejects, slippage vs the
+    requested price (points) and p50/p95 latency per server stage. Symbols
+    this process traded also get "total" and "transport" latency from its
+    own round trips.
+    """
+    with mt5_session() as (conn, mt5):
+        if not conn: return {}
+        stats = json.loads(conn.root.execution_stats(symbol))
+    endpoint = get_pool().endpoint
+    with _round_trips_lock:
+        for (where, name), stages in _round_trips.items():
+            if where == endpoint and name in stats:
+                for stage, samples in stages.items():
+                    stats[name]["latency_ms"][stage] = _latency_summary(samples)
+    return stats
+
+def _filter(symbol=None, magic=None, type=None, comment=None, ticket=None):
+    flt = {"symbol": symbol, "magic": magic, "type": type, "comment": comment, "ticket": ticket}
+    return {k: (list(v) if isinstance(v, (tuple, set)) else v) for k, v in flt.items() if v is not None}
+
+def close_positions(symbol=None, magic=None, type=None, comment=None, ticket=None, deviation=10):
+    """
+    Closes all open positions matching the filter in one round trip (requires mt5_server_fixed.py).
+    Each argument takes a value or a list; `comment` matches as a prefix.
+    With no filter at all, EVERY open position is closed.
+    Returns {"matched", "succeeded", "failed", "results", "total_ms"}.
+    """
+    with mt5_session() as (conn, mt5):
+        if not conn: return {}
+        flt = _filter(symbol, magic, type, comment, ticket)
+        return json.loads(conn.root.close_positions(json.dumps(flt), deviation))
+
+def cancel_orders(symbol=None, magic=None, type=None, comment=None, ticket=None):
+    """
+    Deletes all pending orders matching the filter in one round trip (see close_positions).
+    With no filter at all, EVERY pending order is cancelled.
+    """
+    with mt5_session() as (conn, mt5):
+        if not conn: return {}
+        flt = _filter(symbol, magic, type, comment, ticket)
+        return json.loads(conn.root.cancel_orders(json.dumps(flt)))
+
+# Field order of the tick tuples pushed by exposed_subscribe_ticks
+TICK_FIELDS = ("symbol", "time", "bid", "ask", "last", "volume", "time_msc", "flags")
+
+_CLOSED = object()
+
+class TickSubscription:
+    """
+    Push-based tick feed for a set of symbols (requires mt5_server_fixed.py).
+
+    Either pass `callback(tick)` or iterate the subscription (`for tick in sub`
+    or `async for tick in sub`); ticks are dicts keyed by TICK_FIELDS.
+    coalesce=True delivers only the latest tick per symbol; throttle_ms sets
+    the minimum gap between server pushes. Uses a dedicated (unpooled)
+    connection, because the server calls back into this process; host and
+    port default to those of the current pool, so it follows mt5_router.
+    """
+
+    def __init__(self, symbols, callback=None, throttle_ms=0, coalesce=True,
+                 max_pending=1000, queue_size=10000, host=None, port=None):
+        self.symbols = tuple(symbols)
+        self.dropped = 0
+        self._callback = callback
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._closed = False
+        host, port = pool_address(host, port)
+        self._conn = rpyc.connect(host, port, config={"allow_pickle": True})
+        # Block in serve() instead of sleeping between polls so replies are handled immediately
+        self._bg = rpyc.BgServingThread(self._conn, serve_interval=0.1, sleep_interval=0)
+        self._handle = self._conn.root.subscribe_ticks(
+            self.symbols, self._on_batch, throttle_ms, coalesce, max_pending
+        )
+
+    def _on_batch(self, batch):
+        # Runs on the background serving thread; keep it cheap.
+        for t in batch:
+            tick = dict(zip(TICK_FIELDS, t))
+            if self._callback is not None:
+                self._callback(tick)
+                continue
+            try:
+                self._queue.put_nowait(tick)
+            except queue.Full:
+                self.dropped += 1
+
+    def get(self, timeout=None):
+        """Return the next tick, or None on timeout / after close()."""
+        try:
+            tick = self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+        if tick is _CLOSED:
+            self._queue.put_nowait(_CLOSED)  # Wake any other consumer too
+            return None
+        return tick
+
+    def __iter__(self):
+        while not self._closed:
+            tick = self.get(timeout=0.5)
+            if tick is not None:
+                yield tick
+
+    async def __aiter__(self):
+        loop = asyncio.get_running_loop()
+        while not self._closed:
+            tick = await loop.run_in_executor(None, self.get, 0.5)
+            if tick is not None:
+                yield tick
+
+    def stats(self):
+        """Server-side delivery counters plus client-side drops."""
+        stats = obtain(self._handle.stats())
+        stats["client_dropped"] = self.dropped
+        return stats
+
+    def close(self):
+        if self._closed:
+            return
+        self._closed = True
+        try:
+            self._handle.close()
+            self._bg.stop()
+            self._conn.close()
+        except Exception:
+            pass
+        try:
+            self._queue.put_nowait(_CLOSED)
+        except queue.Full:
+            pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def subscribe_ticks(symbols, callback=None, **kwargs):
+    """Subscribe to pushed ticks for `symbols`. See TickSubscription."""
+    return TickSubscription(symbols, callback=callback, **kwargs)
+
 if __name__ == "__main__":
     # Test the helpers
     print("--- Account ---")
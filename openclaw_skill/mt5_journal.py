@@ -0,0 +1,246 @@
+"""
+Local deal/order journal (SQLite) with incremental sync.
+
+The account history is pulled from the bridge once and then kept up to date
+by asking only for deals/orders newer than the newest one already stored
+(minus a small overlap, so nothing recorded late in the same second is
+missed; rows are upserted by ticket, so the overlap never duplicates).
+Queries - PnL by magic, swap/commission totals, deals of a position - run
+against indexed local tables and don't touch the terminal at all.
+
+History orders are selected by setup time, so a pending order that fills
+or is cancelled long after it was placed would fall before the order
+window. Each sync therefore records the setup time of the oldest order
+still open, and the next sync reaches back at least that far.
+
+Like mt5_bars.BarStore, the journal does not talk to the bridge itself. It
+is given fetchers, which mt5_client.get_journal() wires to the server:
+    fetch_deals(from_ts, to_ts, fields)  -> {field: sequence of values}
+    fetch_orders(from_ts, to_ts, fields) -> {field: sequence of values}
+    fetch_open_setups()                  -> [time_setup of each open order]
+(None if the bridge cannot be reached.)
+
+Default location: ~/.cache/openclaw-mt5/journal_<login>.sqlite
+(override the directory with MT5_JOURNAL_DIR).
+"""
+import os
+import sqlite3
+import threading
+import time
+
+DEFAULT_JOURNAL_DIR = os.environ.get(
+    "MT5_JOURNAL_DIR", os.path.join(os.path.expanduser("~"), ".cache", "openclaw-mt5"))
+
+# (field, SQL type) - names match the server's DEAL_COLUMNS / ORDER_COLUMNS
+DEAL_SCHEMA = (
+    ("ticket", "INTEGER PRIMARY KEY"), ("order", "INTEGER"), ("time", "INTEGER"),
+    ("time_msc", "INTEGER"), ("type", "INTEGER"), ("entry", "INTEGER"),
+    ("magic", "INTEGER"), ("position_id", "INTEGER"), ("reason", "INTEGER"),
+    ("volume", "REAL"), ("price", "REAL"), ("commission", "REAL"), ("swap", "REAL"),
+    ("profit", "REAL"), ("fee", "REAL"), ("symbol", "TEXT"), ("comment", "TEXT"),
+    ("external_id", "TEXT"),
+)
+ORDER_SCHEMA = (
+    ("ticket", "INTEGER PRIMARY KEY"), ("time_setup", "INTEGER"), ("time_setup_msc", "INTEGER"),
+    ("time_done", "INTEGER"), ("time_done_msc", "INTEGER"), ("time_expiration", "INTEGER"),
+    ("type", "INTEGER"), ("type_time", "INTEGER"), ("type_filling", "INTEGER"),
+    ("state", "INTEGER"), ("magic", "INTEGER"), ("position_id", "INTEGER"),
+    ("position_by_id", "INTEGER"), ("reason", "INTEGER"), ("volume_initial", "REAL"),
+    ("volume_current", "REAL"), ("price_open", "REAL"), ("sl", "REAL"), ("tp", "REAL"),
+    ("price_current", "REAL"), ("price_stoplimit", "REAL"), ("symbol", "TEXT"),
+    ("comment", "TEXT"), ("external_id", "TEXT"),
+)
+DEAL_FIELDS = tuple(name for name, _ in DEAL_SCHEMA)
+ORDER_FIELDS = tuple(name for name, _ in ORDER_SCHEMA)
+
+INDEXES = (
+    ("deals", "magic"), ("deals", "symbol"), ("deals", "position_id"), ("deals", "time"),
+    ("orders", "magic"), ("orders", "symbol"), ("orders", "position_id"), ("orders", "time_setup"),
+)
+
+# Deal types that are trades (DEAL_TYPE_BUY / DEAL_TYPE_SELL); the rest are
+# balance, credit, bonus, ... operations
+TRADE_DEAL_TYPES = (0, 1)
+
+# Re-pull this many seconds before the newest stored deal on each sync
+DEAL_OVERLAP = 60
+# Re-pull orders set up this many seconds before the newest stored one (on
+# top of the oldest open order, see sync()), for orders recorded late
+ORDER_LOOKBACK = 86400
+# Future buffer on sync windows, to cover broker server-time offsets
+FUTURE_BUFFER = 86400
+
+
+def _quote(name):
+    # "order" is an SQL keyword
+    return f'"{name}"'
+
+
+class Journal:
+    def __init__(self, path, fetch_deals, fetch_orders, fetch_open_setups=None, since=0):
+        """
+        `since`: oldest history (unix seconds) pulled on the first sync;
+        the default 0 pulls the whole account history once.
+        `fetch_open_setups`: without it, pending orders open longer than
+        ORDER_LOOKBACK are not journaled when they fill or are cancelled.
+        """
+        self.path = path
+        self.fetch_deals = fetch_deals
+        self.fetch_orders = fetch_orders
+        self.fetch_open_setups = fetch_open_setups
+        self.since = int(since)
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.row_factory = sqlite3.Row
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._create()
+
+    def _create(self):
+        with self._db:
+            for table, schema in (("deals", DEAL_SCHEMA), ("orders", ORDER_SCHEMA)):
+                columns = ", ".join(f"{_quote(name)} {kind}" for name, kind in schema)
+                self._db.execute(f"CREATE TABLE IF NOT EXISTS {table} ({columns})")
+            for table, column in INDEXES:
+                self._db.execute(f"CREATE INDEX IF NOT EXISTS {table}_{column} ON {table} ({_quote(column)})")
+            self._db.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value)")
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    # --- Sync ---
+
+    def _cursor(self, table, column, lookback):
+        newest = self._db.execute(f"SELECT MAX({_quote(column)}) FROM {table}").fetchone()[0]
+        return self.since if newest is None else max(self.since, newest - lookback)
+
+    def _meta(self, key):
+        row = self._db.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return None if row is None else row[0]
+
+    def _upsert(self, table, fields, columns):
+        names = ", ".join(_quote(f) for f in fields)
+        marks = ", ".join("?" for _ in fields)
+        rows = list(zip(*(columns[f] for f in fields)))
+        self._db.executemany(f"INSERT OR REPLACE INTO {table} ({names}) VALUES ({marks})", rows)
+        return len(rows)
+
+    def sync(self):
+        """
+        Fetch deals/orders newer than the journal and upsert them.
+        Returns {"deals": n, "orders": n, "ms": elapsed} (counts fetched),
+        or None if the bridge could not be reached.
+        """
+        start = time.perf_counter()
+        to_ts = int(time.time()) + FUTURE_BUFFER
+        with self._lock:
+            deal_from = self._cursor("deals", "time", DEAL_OVERLAP)
+            order_from = self._cursor("orders", "time_setup", ORDER_LOOKBACK)
+            # Orders open at the last sync may have been closed since, however old
+            oldest_open = self._meta("oldest_open_setup")
+            if oldest_open is not None:
+                order_from = min(order_from, int(oldest_open))
+            # Before the history pull: an order closing in between is then still covered next time
+            setups = self.fetch_open_setups() if self.fetch_open_setups else []
+            deals = self.fetch_deals(deal_from, to_ts, DEAL_FIELDS)
+            orders = self.fetch_orders(order_from, to_ts, ORDER_FIELDS)
+            if deals is None or orders is None or setups is None:
+                return None
+            with self._db:
+                counts = {"deals": self._upsert("deals", DEAL_FIELDS, deals),
+                          "orders": self._upsert("orders", ORDER_FIELDS, orders)}
+                self._db.execute("INSERT OR REPLACE INTO meta VALUES ('synced_at', ?)", (time.time(),))
+                self._db.execute("INSERT OR REPLACE INTO meta VALUES ('oldest_open_setup', ?)",
+                                 (min(setups) if setups else None,))
+        counts["ms"] = round((time.perf_counter() - start) * 1000, 2)
+        return counts
+
+    # --- Queries ---
+
+    def query(self, sql, params=()):
+        """Run a read query against the journal; rows as dicts."""
+        with self._lock:
+            return [dict(row) for row in self._db.execute(sql, params)]
+
+    @staticmethod
+    def _where(magic=None, symbol=None, position=None, since=None, until=None,
+               trades_only=False, time_column="time"):
+        clauses, params = [], []
+        for column, value in (("magic", magic), ("symbol", symbol), ("position_id", position)):
+            if value is None:
+                continue
+            if isinstance(value, (list, tuple, set)):
+                clauses.append(f"{column} IN ({', '.join('?' for _ in value)})")
+                params.extend(value)
+            else:
+                clauses.append(f"{column} = ?")
+                params.append(value)
+        if since is not None:
+            clauses.append(f"{time_column} >= ?")
+            params.append(int(since))
+        if until is not None:
+            clauses.append(f"{time_column} <= ?")
+            params.append(int(until))
+        if trades_only:
+            clauses.append(f"type IN {TRADE_DEAL_TYPES}")
+        return (" WHERE " + " AND ".join(clauses) if clauses else ""), params
+
+    def deals(self, magic=None, symbol=None, position=None, since=None, until=None):
+        """Deals matching the filter (each argument takes a value or a list), oldest first."""
+        where, params = self._where(magic, symbol, position, since, until)
+        return self.query(f"SELECT * FROM deals{where} ORDER BY time, ticket", params)
+
+    def orders(self, magic=None, symbol=None, position=None, since=None, until=None):
+        """History orders matching the filter, by setup time."""
+        where, params = self._where(magic, symbol, position, since, until, time_column="time_setup")
+        return self.query(f"SELECT * FROM orders{where} ORDER BY time_setup, ticket", params)
+
+    def columns(self, fields=DEAL_FIELDS, magic=None, symbol=None, since=None, until=None, trades_only=False):
+        """Deals as {field: list} in time order, ready for np.asarray (see mt5_analytics)."""
+        where, params = self._where(magic, symbol, None, since, until, trades_only=trades_only)
+        names = ", ".join(_quote(f) for f in fields)
+        with self._lock:
+            rows = self._db.execute(f"SELECT {names} FROM deals{where} ORDER BY time, ticket", params).fetchall()
+        values = list(zip(*rows)) if rows else [()] * len(fields)
+        return dict(zip(fields, (list(v) for v in values)))
+
+    def totals(self, group_by="magic", magic=None, symbol=None, since=None, until=None):
+        """
+        Trade deal aggregates per `group_by` ("magic", "symbol", "position_id"
+        or None for one overall row): deals, volume, profit, swap, commission,
+        fee and net (the sum of the four). Balance operations are excluded.
+        """
+        if group_by not in (None, "magic", "symbol", "position_id"):
+            raise ValueError(f"Cannot group by {group_by!r}")
+        where, params = self._where(magic, symbol, None, since, until, trades_only=True)
+        key = f"{group_by} AS {group_by}, " if group_by else ""
+        group = f" GROUP BY {group_by} ORDER BY {group_by}" if group_by else ""
+        return self.query(
+            f"SELECT {key}COUNT(*) AS deals, TOTAL(volume) AS volume, TOTAL(profit) AS profit, "
+            f"TOTAL(swap) AS swap, TOTAL(commission) AS commission, TOTAL(fee) AS fee, "
+            f"TOTAL(profit) + TOTAL(swap) + TOTAL(commission) + TOTAL(fee) AS net "
+            f"FROM deals{where}{group}", params)
+
+    def pnl_by_magic(self, since=None, until=None, symbol=None):
+        """{magic: {deals, volume, profit, swap, commission, fee, net}}."""
+        return {row.pop("magic"): row for row in self.totals("magic", symbol=symbol, since=since, until=until)}
+
+    def costs(self, group_by="symbol", since=None, until=None):
+        """Swap/commission/fee totals per symbol (or magic)."""
+        return {row[group_by]: {"swap": row["swap"], "commission": row["commission"], "fee": row["fee"]}
+                for row in self.totals(group_by, since=since, until=until)}
+
+    def stats(self):
+        with self._lock:
+            deals = self._db.execute("SELECT COUNT(*), MAX(time) FROM deals").fetchone()
+            orders = self._db.execute("SELECT COUNT(*) FROM orders").fetchone()[0]
+            synced = self._db.execute("SELECT value FROM meta WHERE key = 'synced_at'").fetchone()
+        return {"deals": deals[0], "orders": orders, "newest_deal": deals[1],
+                "synced_at": synced[0] if synced else None, "path": self.path}
+
+
+def journal_path(login, directory=DEFAULT_JOURNAL_DIR):
+    """One file per account, so demo and live history never mix."""
+    return os.path.join(directory, f"journal_{login}.sqlite")
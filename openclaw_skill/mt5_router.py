@@ -0,0 +1,190 @@
+"""
+Multi-terminal routing: one client in front of several bridge servers.
+
+A MetaTrader5 Python process drives exactly one terminal, so a desk with
+several accounts runs one mt5_server_fixed.py per terminal (each on its own
+MT5_BRIDGE_PORT, or on its own host). TerminalRouter keeps a connection
+pool per server, keyed by account login, and
+
+    - routes a call to one account:   router.call(login, get_positions_list)
+                                      with router.terminal(login): ...
+    - fans a call out to every account in parallel and merges the answers:
+                                      router.map(get_account_dict)   -> {login: result}
+                                      router.gather(get_positions_list) -> one list,
+                                      each record tagged with its "login"
+
+The mt5_client helpers work unchanged under routing: the router selects
+the terminal's pool for the calling thread (mt5_client.using_pool) and
+mt5_session() picks it up. Per-terminal state follows the pool too:
+iter_cursor's prefetch thread inherits the caller's pool, contract sizes
+and the bar store are kept per terminal endpoint, TickSubscription /
+AsyncMT5Client connect to the current pool's host and port unless given
+one, and get_execution_stats() reports the routed terminal's orders. Fan-out
+calls run on a thread pool; they spend their time waiting on sockets, so N
+terminals answer in roughly the time of the slowest one rather than the sum.
+
+Terminals come from the constructor, add(), or MT5_TERMINALS
+("host:port,host:port,..."). The login of each is read from the terminal
+itself unless given.
+"""
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+from mt5_client import (ConnectionPool, DEFAULT_PORT, POOL_SIZE, get_account_dict,
+                        get_positions_list, get_snapshot, using_pool)
+
+
+def parse_terminals(spec):
+    """Parse "host:port,host" into [(host, port), ...]; port defaults to MT5_BRIDGE_PORT."""
+    terminals = []
+    for item in (spec or "").split(","):
+        item = item.strip()
+        if not item:
+            continue
+        host, _, port = item.rpartition(":") if ":" in item else (item, "", "")
+        terminals.append((host, int(port) if port else DEFAULT_PORT))
+    return terminals
+
+
+class TerminalRouter:
+    def __init__(self, terminals=(), pool_size=POOL_SIZE, max_workers=16):
+        """
+        terminals: (host, port) / (host, port, login) tuples or "host:port" strings.
+        pool_size: connections per terminal.
+        """
+        self.pool_size = pool_size
+        self._lock = threading.Lock()
+        self._pools = {}
+        self._fanout = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="mt5-router")
+        for terminal in terminals:
+            if isinstance(terminal, str):
+                terminal = parse_terminals(terminal)[0]
+            self.add(*terminal)
+
+    @classmethod
+    def from_env(cls, **kwargs):
+        """Router over the servers listed in MT5_TERMINALS."""
+        return cls(parse_terminals(os.environ.get("MT5_TERMINALS")), **kwargs)
+
+    def add(self, host, port=DEFAULT_PORT, login=None):
+        """
+        Register a bridge server and return its login. Without `login` the
+        terminal is asked for it, so the server must be reachable.
+        """
+        pool = ConnectionPool(host=host, port=port, size=self.pool_size)
+        if login is None:
+            with using_pool(pool):
+                login = get_account_dict().get("login")
+            if login is None:
+                pool.close()
+                raise ConnectionError(f"No account on MT5 bridge {host}:{port}")
+        login = int(login)
+        with self._lock:
+            previous = self._pools.get(login)
+            self._pools[login] = pool
+        if previous is not None:
+            previous.close()
+        return login
+
+    def remove(self, login):
+        with self._lock:
+            pool = self._pools.pop(int(login), None)
+        if pool is not None:
+            pool.close()
+
+    def logins(self):
+        with self._lock:
+            return sorted(self._pools)
+
+    def pool(self, login):
+        with self._lock:
+            pool = self._pools.get(int(login))
+        if pool is None:
+            raise KeyError(f"Unknown account {login} (have {self.logins()})")
+        return pool
+
+    @contextmanager
+    def terminal(self, login):
+        """Route every mt5_client helper called in this block (on this thread) to `login`."""
+        with using_pool(self.pool(login)):
+            yield
+
+    def call(self, login, fn, *args, **kwargs):
+        """fn(*args, **kwargs) against one account."""
+        with self.terminal(login):
+            return fn(*args, **kwargs)
+
+    def map(self, fn, *args, logins=None, **kwargs):
+        """
+        fn(*args, **kwargs) on every account (or `logins`) in parallel.
+        Returns {login: result}; a call that raised gives its exception
+        as the result instead of failing the others.
+        """
+        targets = self.logins() if logins is None else [int(l) for l in logins]
+        futures = {login: self._fanout.submit(self.call, login, fn, *args, **kwargs)
+                   for login in targets}
+        results = {}
+        for login, future in futures.items():
+            try:
+                results[login] = future.result()
+            except Exception as e:
+                results[login] = e
+        return results
+
+    def gather(self, fn, *args, logins=None, **kwargs):
+        """
+        map() a list-returning helper and merge the lists, tagging each dict
+        with its "login". Accounts that failed are left out; see map() to
+        tell them apart.
+        """
+        merged = []
+        for login, result in self.map(fn, *args, logins=logins, **kwargs).items():
+            if isinstance(result, Exception):
+                print(f"MT5 account {login} failed: {result}")
+                continue
+            for record in result:
+                if isinstance(record, dict):
+                    record = dict(record, login=login)
+                merged.append(record)
+        return merged
+
+    def accounts(self, logins=None):
+        """{login: account dict} for every reachable account."""
+        return {login: acct for login, acct in self.map(get_account_dict, logins=logins).items()
+                if acct and not isinstance(acct, Exception)}
+
+    def positions(self, logins=None):
+        """Open positions across all accounts, each tagged with "login"."""
+        return self.gather(get_positions_list, logins=logins)
+
+    def snapshots(self, symbols=None, include=None, logins=None):
+        """{login: get_snapshot(...)} - one round trip per terminal, all in parallel."""
+        return {login: snap for login, snap in
+                self.map(get_snapshot, symbols, include, logins=logins).items()
+                if not isinstance(snap, Exception)}
+
+    def totals(self, logins=None):
+        """Balance, equity, profit and margin summed per account currency."""
+        totals = {}
+        for acct in self.accounts(logins).values():
+            row = totals.setdefault(acct["currency"], {"accounts": 0, "balance": 0.0, "equity": 0.0,
+                                                       "profit": 0.0, "margin": 0.0, "margin_free": 0.0})
+            row["accounts"] += 1
+            for field in ("balance", "equity", "profit", "margin", "margin_free"):
+                row[field] += acct[field]
+        return totals
+
+    def close(self):
+        with self._lock:
+            pools, self._pools = list(self._pools.values()), {}
+        for pool in pools:
+            pool.close()
+        self._fanout.shutdown(wait=False)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,254 @@
+"""
+Compact binary wire protocol for the MT5 bridge hot paths.
+
+Runs alongside RPyC on a second port (default 18813). Frames are
+length-prefixed and carry fixed struct-packed schemas for ticks, bars,
+positions and order requests/results, so the hot paths need no pickle,
+no netrefs and no matching RPyC versions on both ends. This module only
+depends on the standard library and is shared by the client (WSL) and
+mt5_server_fixed.py (Windows).
+
+Frame layout (little-endian):
+    header  = <I length> <B version> <B msg_type> <H status> <I request_id>
+    payload = `length` bytes
+status is 0 on success; otherwise the payload is a UTF-8 error message.
+Strings are <H length> + UTF-8 bytes.
+"""
+import os
+import socket
+import struct
+import threading
+
+VERSION = 1
+DEFAULT_WIRE_PORT = int(os.environ.get("MT5_WIRE_PORT", 18813))
+MAX_FRAME = 64 * 1024 * 1024
+
+HEADER = struct.Struct("<IBBHI")
+
+# Message types (a response reuses the request's type)
+MSG_PING = 1
+MSG_TICK = 2          # symbol -> tick
+MSG_TICKS = 3         # [symbol] -> [(symbol, tick or None)]
+MSG_RATES = 4         # symbol, timeframe, start_pos, count -> [bar]
+MSG_POSITIONS = 5     # symbol ('' = all) -> [position]
+MSG_ORDER_SEND = 6    # order request -> order result
+
+STATUS_OK = 0
+STATUS_ERROR = 1
+
+TICK = struct.Struct("<qddddqqI")       # time, bid, ask, last, volume_real, time_msc, volume, flags
+TICK_FIELDS = ("time", "bid", "ask", "last", "volume_real", "time_msc", "volume", "flags")
+
+BAR = struct.Struct("<qddddqiq")        # time, open, high, low, close, tick_volume, spread, real_volume
+BAR_FIELDS = ("time", "open", "high", "low", "close", "tick_volume", "spread", "real_volume")
+
+POSITION = struct.Struct("<qqiqdddddddd")
+POSITION_FIELDS = ("ticket", "time", "type", "magic", "volume", "price_open", "sl", "tp",
+                   "price_current", "swap", "profit", "commission")
+# followed by symbol, comment strings
+
+ORDER_REQUEST = struct.Struct("<iqqqqqdddddiiii")
+ORDER_REQUEST_FIELDS = ("action", "magic", "order", "position", "position_by", "expiration",
+                        "volume", "price", "stoplimit", "sl", "tp",
+                        "deviation", "type", "type_filling", "type_time")
+# followed by symbol, comment strings
+# Zero means "not set" for these, so they are left out of the decoded request
+OPTIONAL_ZERO_FIELDS = ("order", "position", "position_by", "expiration", "stoplimit")
+# 0 is a real value for these (FOK, GTC), so "not set" is sent as -1; the
+# server then picks a filling mode the symbol supports, as over RPyC
+OPTIONAL_ENUM_FIELDS = ("type_filling", "type_time")
+
+ORDER_RESULT = struct.Struct("<?iqqdd")  # success, retcode, deal, order, volume, price
+ORDER_RESULT_FIELDS = ("success", "retcode", "deal", "order", "volume", "price")
+# followed by comment string
+
+BOOL = struct.Struct("<?")
+U16 = struct.Struct("<H")
+U32 = struct.Struct("<I")
+
+
+class WireError(Exception):
+    """Raised on protocol errors or when the server returns an error status."""
+
+
+# --- Encoding helpers ---
+
+def pack_str(value):
+    data = str(value or "").encode("utf-8")[:0xFFFF]
+    return U16.pack(len(data)) + data
+
+class Reader:
+    """Sequential reader over a payload buffer."""
+
+    def __init__(self, data):
+        self.view = memoryview(data)
+        self.pos = 0
+
+    def take(self, st):
+        values = st.unpack_from(self.view, self.pos)
+        self.pos += st.size
+        return values
+
+    def str(self):
+        (n,) = self.take(U16)
+        value = bytes(self.view[self.pos:self.pos + n]).decode("utf-8")
+        self.pos += n
+        return value
+
+    def u32(self):
+        return self.take(U32)[0]
+
+def encode_frame(msg_type, request_id, payload=b"", status=STATUS_OK):
+    return HEADER.pack(len(payload), VERSION, msg_type, status, request_id) + payload
+
+def recv_exact(sock, n):
+    buf = bytearray(n)
+    view = memoryview(buf)
+    got = 0
+    while got < n:
+        k = sock.recv_into(view[got:], n - got)
+        if k == 0:
+            raise EOFError("wire connection closed")
+        got += k
+    return buf
+
+def read_frame(sock):
+    """Read one frame. Returns (msg_type, status, request_id, payload)."""
+    length, version, msg_type, status, request_id = HEADER.unpack(recv_exact(sock, HEADER.size))
+    if version != VERSION:
+        raise WireError(f"Unsupported wire version {version}")
+    if length > MAX_FRAME:
+        raise WireError(f"Frame too large ({length} bytes)")
+    payload = recv_exact(sock, length) if length else b""
+    return msg_type, status, request_id, payload
+
+def pack_tick(t):
+    return TICK.pack(int(t.time), float(t.bid), float(t.ask), float(t.last),
+                     float(t.volume_real), int(t.time_msc), int(t.volume), int(t.flags))
+
+def pack_bar(r):
+    return BAR.pack(int(r["time"]), float(r["open"]), float(r["high"]), float(r["low"]),
+                    float(r["close"]), int(r["tick_volume"]), int(r["spread"]), int(r["real_volume"]))
+
+def pack_position(p):
+    return POSITION.pack(int(p.ticket), int(p.time), int(p.type), int(p.magic), float(p.volume),
+                         float(p.price_open), float(p.sl), float(p.tp), float(p.price_current),
+                         float(p.swap), float(p.profit), float(getattr(p, "commission", 0.0))
+                         ) + pack_str(p.symbol) + pack_str(p.comment)
+
+def pack_order_request(request):
+    def get(field):
+        return request.get(field) or 0
+
+    def enum(field):
+        value = request.get(field)
+        return -1 if value is None else int(value)
+    return (ORDER_REQUEST.pack(
+                int(get("action")), int(get("magic")), int(get("order")), int(get("position")),
+                int(get("position_by")), int(get("expiration")),
+                float(get("volume")), float(get("price")), float(get("stoplimit")),
+                float(get("sl")), float(get("tp")),
+                int(get("deviation")), int(get("type")), enum("type_filling"), enum("type_time"))
+            + pack_str(request.get("symbol", "")) + pack_str(request.get("comment", "")))
+
+def unpack_order_request(reader):
+    """Decode an order request into a dict, leaving out unset optional fields."""
+    request = dict(zip(ORDER_REQUEST_FIELDS, reader.take(ORDER_REQUEST)))
+    for field in OPTIONAL_ZERO_FIELDS:
+        if not request[field]:
+            del request[field]
+    for field in OPTIONAL_ENUM_FIELDS:
+        if request[field] < 0:
+            del request[field]
+    for field in ("symbol", "comment"):
+        value = reader.str()
+        if value:
+            request[field] = value
+    return request
+
+def pack_order_result(res):
+    return ORDER_RESULT.pack(bool(res.get("success")), int(res.get("retcode", -1)), int(res.get("deal", 0) or 0),
+                             int(res.get("order", 0) or 0), float(res.get("volume", 0) or 0),
+                             float(res.get("price", 0) or 0)) + pack_str(res.get("comment", ""))
+
+
+class WireClient:
+    """
+    Blocking client for the binary protocol. Thread-safe: requests on one
+    client are serialised by a lock, so give each busy thread its own client.
+    """
+
+    def __init__(self, host=None, port=DEFAULT_WIRE_PORT, timeout=10.0):
+        if host is None:
+            from mt5_client import get_windows_host_ip
+            host = get_windows_host_ip()
+        self.sock = socket.create_connection((host, port), timeout=timeout)
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._lock = threading.Lock()
+        self._next_id = 0
+
+    def close(self):
+        self.sock.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def request(self, msg_type, payload=b""):
+        with self._lock:
+            self._next_id = (self._next_id + 1) & 0xFFFFFFFF
+            request_id = self._next_id
+            self.sock.sendall(encode_frame(msg_type, request_id, payload))
+            r_type, status, r_id, body = read_frame(self.sock)
+        if r_id != request_id or r_type != msg_type:
+            raise WireError(f"Out-of-order reply (type {r_type}, id {r_id})")
+        if status != STATUS_OK:
+            raise WireError(bytes(body).decode("utf-8", "replace"))
+        return Reader(body)
+
+    def ping(self):
+        self.request(MSG_PING)
+        return True
+
+    def tick(self, symbol):
+        """Latest tick as a dict, or None if the symbol has no tick."""
+        reader = self.request(MSG_TICK, pack_str(symbol))
+        if not reader.take(BOOL)[0]:
+            return None
+        return dict(zip(TICK_FIELDS, reader.take(TICK)))
+
+    def ticks(self, symbols):
+        """Latest ticks for many symbols in one frame: {symbol: tick or None}."""
+        payload = U32.pack(len(symbols)) + b"".join(pack_str(s) for s in symbols)
+        reader = self.request(MSG_TICKS, payload)
+        result = {}
+        for _ in range(reader.u32()):
+            symbol = reader.str()
+            present = reader.take(BOOL)[0]
+            result[symbol] = dict(zip(TICK_FIELDS, reader.take(TICK))) if present else None
+        return result
+
+    def rates(self, symbol, timeframe, start_pos=0, count=100):
+        """Bars via copy_rates_from_pos as a list of dicts."""
+        payload = pack_str(symbol) + struct.pack("<III", int(timeframe), int(start_pos), int(count))
+        reader = self.request(MSG_RATES, payload)
+        return [dict(zip(BAR_FIELDS, reader.take(BAR))) for _ in range(reader.u32())]
+
+    def positions(self, symbol=""):
+        reader = self.request(MSG_POSITIONS, pack_str(symbol))
+        result = []
+        for _ in range(reader.u32()):
+            pos = dict(zip(POSITION_FIELDS, reader.take(POSITION)))
+            pos["symbol"] = reader.str()
+            pos["comment"] = reader.str()
+            result.append(pos)
+        return result
+
+    def order_send(self, request):
+        """Send an order request dict; returns the result dict."""
+        reader = self.request(MSG_ORDER_SEND, pack_order_request(request))
+        result = dict(zip(ORDER_RESULT_FIELDS, reader.take(ORDER_RESULT)))
+        result["comment"] = reader.str()
+        return result
@@ -198,21 +198,17 @@ def run_test():
 
     # --- Part 21 & 22: Profit & Cost Reconciliation ---
     print_section("Part 21/22: Profit & Cost Analysis")
-    # Look at history for 18001
-    from_ts = int(datetime(2020, 1, 1).timestamp())
-    to_ts = int(datetime(2030, 1, 1).timestamp())
-    deals = mt5.history_deals_get(from_ts, to_ts)
-    
-    deals_18001 = [d for d in deals if d.magic == 18001] if deals else []
-    if deals_18001:
-        total_profit = sum(d.profit for d in deals_18001)
-        total_swaps = sum(d.swap for d in deals_18001)
-        total_comm = sum(d.commission for d in deals_18001)
-        print(f"✅ Magic 18001 Analysis ({len(deals_18001)} deals):")
-        print(f"   Net Profit: {total_profit:.2f}")
-        print(f"   Swaps: {total_swaps:.2f}")
-        print(f"   Commission: {total_comm:.2f}")
-        print(f"   Gross PnL: {total_profit + total_swaps + total_comm:.2f}")
+    # Aggregates come from the local deal journal (synced incrementally),
+    # not from re-pulling the whole account history
+    from mt5_client import sync_journal
+    journal = sync_journal()
+    stats_18001 = journal.pnl_by_magic().get(18001) if journal else None
+    if stats_18001:
+        print(f"✅ Magic 18001 Analysis ({stats_18001['deals']} deals):")
+        print(f"   Net Profit: {stats_18001['profit']:.2f}")
+        print(f"   Swaps: {stats_18001['swap']:.2f}")
+        print(f"   Commission: {stats_18001['commission']:.2f}")
+        print(f"   Gross PnL: {stats_18001['net']:.2f}")
     else:
         print("⚠️ No history for 18001 to analyze.")
 
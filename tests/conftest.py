@@ -0,0 +1,6 @@
+"""Run the server modules against the simulator (mt5_sim) instead of the real MetaTrader5 package."""
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [os.path.join(ROOT, "mt5_sim"), ROOT]
@@ -0,0 +1,171 @@
+"""mt5_validate: pure checks over a SymbolSpec and a tick, no terminal needed."""
+from collections import namedtuple
+
+import pytest
+
+from mt5_executor import mt5
+from mt5_validate import (
+    REQUIRED_FIELDS, SYMBOL_FILLING_FOK, SYMBOL_FILLING_IOC, Rejected, SymbolSpec,
+    _check_pending_price, _check_stops, pick_filling, validate,
+)
+
+Tick = namedtuple("Tick", "bid ask time")
+
+TICK = Tick(bid=1.10000, ask=1.10020, time=1_700_000_000)
+
+
+def make_spec(**overrides):
+    fields = dict(digits=5, point=0.00001, volume_min=0.01, volume_max=100.0, volume_step=0.01,
+                  stops_level=10, freeze_level=0, filling_mode=SYMBOL_FILLING_FOK | SYMBOL_FILLING_IOC,
+                  trade_mode=mt5.SYMBOL_TRADE_MODE_FULL, execution_mode=mt5.SYMBOL_TRADE_EXECUTION_MARKET)
+    fields.update(overrides)
+    return SymbolSpec(**fields)
+
+
+def run(request, spec=None):
+    spec = spec or make_spec()
+    return validate(dict(request), lambda symbol: spec, lambda symbol: TICK)
+
+
+def rejected(request, spec=None):
+    with pytest.raises(Rejected) as info:
+        run(request, spec)
+    return info.value
+
+
+MARKET_BUY = {"action": mt5.TRADE_ACTION_DEAL, "symbol": "EURUSD", "volume": 0.1, "type": mt5.ORDER_TYPE_BUY}
+
+
+# --- pick_filling ---
+
+def test_fok_only_symbol_gets_fok_for_market_orders():
+    spec = make_spec(filling_mode=SYMBOL_FILLING_FOK)
+    assert pick_filling(spec, None, pending=False) == mt5.ORDER_FILLING_FOK
+    assert pick_filling(spec, mt5.ORDER_FILLING_IOC, pending=False) == mt5.ORDER_FILLING_FOK
+
+
+def test_ioc_only_symbol_replaces_fok():
+    spec = make_spec(filling_mode=SYMBOL_FILLING_IOC)
+    assert pick_filling(spec, mt5.ORDER_FILLING_FOK, pending=False) == mt5.ORDER_FILLING_IOC
+
+
+def test_return_is_kept_under_market_execution():
+    spec = make_spec(filling_mode=SYMBOL_FILLING_FOK)
+    assert pick_filling(spec, mt5.ORDER_FILLING_RETURN, pending=False) == mt5.ORDER_FILLING_RETURN
+
+
+def test_return_is_replaced_under_instant_execution():
+    spec = make_spec(filling_mode=0, execution_mode=mt5.SYMBOL_TRADE_EXECUTION_INSTANT)
+    assert pick_filling(spec, mt5.ORDER_FILLING_RETURN, pending=False) == mt5.ORDER_FILLING_FOK
+
+
+def test_pending_orders_default_to_return():
+    spec = make_spec(filling_mode=SYMBOL_FILLING_FOK)
+    assert pick_filling(spec, None, pending=True) == mt5.ORDER_FILLING_RETURN
+
+
+def test_validate_sets_filling_for_fok_only_symbol():
+    spec = make_spec(filling_mode=SYMBOL_FILLING_FOK)
+    request = run(dict(MARKET_BUY, type_filling=mt5.ORDER_FILLING_IOC), spec)
+    assert request["type_filling"] == mt5.ORDER_FILLING_FOK
+
+
+# --- _check_stops ---
+
+def test_stops_outside_stops_level_pass():
+    _check_stops(make_spec(), True, 1.10020, sl=1.10000, tp=1.10040)
+    _check_stops(make_spec(), False, 1.10000, sl=1.10020, tp=1.09980)
+
+
+@pytest.mark.parametrize("is_buy, ref, sl, tp", [
+    (True, 1.10020, 1.10015, None),     # buy SL 5 points under the ask, level is 10
+    (True, 1.10020, None, 1.10025),     # buy TP 5 points over the ask
+    (False, 1.10000, 1.10005, None),    # sell SL 5 points over the bid
+    (True, 1.10020, 1.10030, None),     # buy SL above the price
+])
+def test_stops_inside_stops_level_are_rejected(is_buy, ref, sl, tp):
+    with pytest.raises(Rejected) as info:
+        _check_stops(make_spec(), is_buy, ref, sl, tp)
+    assert info.value.retcode == mt5.TRADE_RETCODE_INVALID_STOPS
+
+
+def test_market_order_with_close_sl_is_rejected():
+    error = rejected(dict(MARKET_BUY, sl=1.10015))
+    assert error.retcode == mt5.TRADE_RETCODE_INVALID_STOPS
+
+
+def test_stop_limit_stops_are_measured_from_stoplimit():
+    request = {"action": mt5.TRADE_ACTION_PENDING, "symbol": "EURUSD", "volume": 0.1,
+               "type": mt5.ORDER_TYPE_BUY_STOP_LIMIT, "price": 1.10200, "stoplimit": 1.10100}
+    run(dict(request, sl=1.10050))
+    # Valid against price (1.10200) but above the stoplimit the order opens at
+    error = rejected(dict(request, sl=1.10150))
+    assert error.retcode == mt5.TRADE_RETCODE_INVALID_STOPS
+
+
+# --- _check_pending_price ---
+
+@pytest.mark.parametrize("otype, price", [
+    (mt5.ORDER_TYPE_BUY_LIMIT, 1.10100),    # buy limit above the ask
+    (mt5.ORDER_TYPE_SELL_LIMIT, 1.09900),   # sell limit below the bid
+    (mt5.ORDER_TYPE_BUY_STOP, 1.09900),     # buy stop below the ask
+    (mt5.ORDER_TYPE_SELL_STOP, 1.10100),    # sell stop above the bid
+    (mt5.ORDER_TYPE_BUY_LIMIT, 1.10015),    # right side, but inside the stops level
+])
+def test_pending_price_on_wrong_side_is_rejected(otype, price):
+    with pytest.raises(Rejected) as info:
+        _check_pending_price(make_spec(), otype, price, TICK.bid, TICK.ask)
+    assert info.value.retcode == mt5.TRADE_RETCODE_INVALID_PRICE
+
+
+@pytest.mark.parametrize("otype, price", [
+    (mt5.ORDER_TYPE_BUY_LIMIT, 1.09900),
+    (mt5.ORDER_TYPE_SELL_LIMIT, 1.10100),
+    (mt5.ORDER_TYPE_BUY_STOP, 1.10100),
+    (mt5.ORDER_TYPE_SELL_STOP, 1.09900),
+])
+def test_pending_price_on_right_side_passes(otype, price):
+    _check_pending_price(make_spec(), otype, price, TICK.bid, TICK.ask)
+
+
+# --- validate ---
+
+FULL_REQUESTS = {
+    mt5.TRADE_ACTION_DEAL: MARKET_BUY,
+    mt5.TRADE_ACTION_PENDING: {"action": mt5.TRADE_ACTION_PENDING, "symbol": "EURUSD", "volume": 0.1,
+                               "type": mt5.ORDER_TYPE_BUY_LIMIT, "price": 1.09900},
+    mt5.TRADE_ACTION_SLTP: {"action": mt5.TRADE_ACTION_SLTP, "position": 1},
+    mt5.TRADE_ACTION_MODIFY: {"action": mt5.TRADE_ACTION_MODIFY, "order": 1},
+    mt5.TRADE_ACTION_REMOVE: {"action": mt5.TRADE_ACTION_REMOVE, "order": 1},
+    mt5.TRADE_ACTION_CLOSE_BY: {"action": mt5.TRADE_ACTION_CLOSE_BY, "position": 1, "position_by": 2},
+}
+
+
+def test_every_action_has_a_full_request():
+    assert set(FULL_REQUESTS) == set(REQUIRED_FIELDS)
+
+
+@pytest.mark.parametrize("action, field", [
+    (action, field) for action, fields in REQUIRED_FIELDS.items() for field in fields
+])
+def test_missing_field_is_rejected(action, field):
+    request = dict(FULL_REQUESTS[action])
+    run(request)
+    del request[field]
+    error = rejected(request)
+    assert error.retcode == mt5.TRADE_RETCODE_INVALID
+    assert field in error.comment
+
+
+def test_unknown_action_is_rejected():
+    assert rejected({"action": 99}).retcode == mt5.TRADE_RETCODE_INVALID
+
+
+def test_volume_off_step_is_rejected():
+    assert rejected(dict(MARKET_BUY, volume=0.015)).retcode == mt5.TRADE_RETCODE_INVALID_VOLUME
+
+
+def test_request_is_normalised():
+    request = run(dict(MARKET_BUY, volume=0.30000000000000004, sl=1.0990012345))
+    assert request["volume"] == 0.3
+    assert request["sl"] == 1.099